@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.backup import HotBackup
+from models.stores import store_data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental hot backup of a Smart Mart data directory.")
+    parser.add_argument('backup_dir', help="backup directory")
+    parser.add_argument('command', choices=['base', 'ship', 'follow', 'verify', 'restore', 'prune'],
+                        help="base: take a new base copy; ship: copy new journal entries once; "
+                             "follow: keep shipping; verify: test-restore and check; "
+                             "restore: rebuild into TARGET; prune: delete shipped live journal segments")
+    parser.add_argument('target', nargs='?', help="empty directory to restore into")
+    parser.add_argument('--store', help="store to back up, from <data root>/stores/<store>")
+    parser.add_argument('--data-dir', help="data directory to back up (overrides --store)")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between ships with follow")
+    args = parser.parse_args()
+
+    backup = HotBackup(args.data_dir or store_data_dir(args.store), args.backup_dir)
+    try:
+        if args.command == 'base':
+            state = backup.take_base()
+            print(f"Base copy taken at journal position {state['base_position']}")
+        elif args.command == 'ship':
+            print(f"Shipped {backup.ship()} bytes")
+        elif args.command == 'follow':
+            print(f"Shipping every {args.interval}s, press Ctrl+C to stop")
+            backup.follow(args.interval)
+        elif args.command == 'verify':
+            report = backup.verify()
+            print(json.dumps(report, indent=2))
+            sys.exit(0 if report['ok'] else 1)
+        elif args.command == 'restore':
+            if not args.target:
+                parser.error("restore needs a TARGET directory")
+            report = backup.restore(args.target)
+            print(f"Restored {report['products']} products and {report['bills']} bills "
+                  f"({report['entries']} journal entries replayed) into {args.target}")
+            for error in report['errors']:
+                print(f"  {error}")
+        else:
+            print(f"Removed {backup.prune_live_journal()} journal segments")
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.cashier_model import Cashier
+from models.repository import DataRepository
+
+
+def prepare_data_dir(source_dir: str, stock: int) -> str:
+    """Copy the data directory to a scratch folder, reset stock and clear bills."""
+    target_dir = tempfile.mkdtemp(prefix='smart_mart_load_')
+    for filename in os.listdir(source_dir):
+        path = os.path.join(source_dir, filename)
+        if os.path.isfile(path) and filename.endswith('.txt') and filename != 'reservations.txt':
+            shutil.copy2(path, target_dir)
+    # Catalog partitioned by category
+    if os.path.isdir(os.path.join(source_dir, 'products')):
+        shutil.copytree(os.path.join(source_dir, 'products'), os.path.join(target_dir, 'products'))
+
+    open(os.path.join(target_dir, 'bills.txt'), 'w').close()
+    if stock >= 0:
+        repository = DataRepository(target_dir)
+        with repository.products_lock:
+            products = repository.load_products()
+            repository.write_products({product_id: product[:4] + (stock,)
+                                       for product_id, product in products.items()})
+    return target_dir
+
+
+def read_stock(data_dir: str) -> Dict[str, int]:
+    """Read the stock level of every product."""
+    # A fresh repository, so the catalog is read from disk rather than a cache
+    products = DataRepository(data_dir).load_products()
+    return {product_id: product[4] for product_id, product in products.items()}
+
+
+def run_till(args) -> Dict:
+    """Act as one till: build random carts and check them out (runs in a worker process)."""
+    data_dir, till_number, sales, max_lines, max_quantity, seed = args
+    rng = random.Random(seed + till_number)
+    cashier = Cashier(data_dir)
+    product_ids = [product[0] for product in cashier.list_products()]
+
+    latencies: List[float] = []
+    sold: Dict[str, int] = {}
+    committed = failed_checkout = rejected_add = 0
+
+    for _ in range(sales):
+        # Build a random cart; adds can be refused when other tills hold the stock
+        for product_id in rng.sample(product_ids, rng.randint(1, min(max_lines, len(product_ids)))):
+            if not cashier.add_to_cart(product_id, rng.randint(1, max_quantity)):
+                rejected_add += 1
+        if not cashier.cart:
+            continue
+
+        cart = cashier.cart.quantities()
+        started = time.perf_counter()
+        if rng.random() < 0.5:
+            ok = cashier.process_payment(rng.choice(['cash', 'card']))
+        else:
+            items = [{'id': item[0], 'name': item[1], 'price': item[3], 'quantity': item[4]}
+                     for item in cashier.get_cart_items()]
+            ok = cashier.process_sale(items)
+        latencies.append(time.perf_counter() - started)
+
+        if ok:
+            committed += 1
+            for product_id, quantity in cart.items():
+                sold[product_id] = sold.get(product_id, 0) + quantity
+        else:
+            failed_checkout += 1
+        cashier.clear_cart()
+
+    return {
+        'latencies': latencies,
+        'sold': sold,
+        'committed': committed,
+        'failed_checkout': failed_checkout,
+        'rejected_add': rejected_add,
+    }
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Get the p-th percentile (0-100) of sorted samples, in milliseconds."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))
+    return samples[index] * 1000
+
+
+def run_load_test(processes: int, sales: int, stock: int, max_lines: int,
+                  max_quantity: int, seed: int, source_dir: str, keep: bool) -> bool:
+    """Run the load test and print throughput, latency and the stock audit."""
+    data_dir = prepare_data_dir(source_dir, stock)
+    initial_stock = read_stock(data_dir)
+    print(f"Data copied to {data_dir}")
+    print(f"Starting {processes} tills x {sales} sales over {len(initial_stock)} products...")
+
+    jobs = [(data_dir, till, sales, max_lines, max_quantity, seed) for till in range(processes)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(run_till, jobs)
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for result in results for latency in result['latencies'])
+    committed = sum(result['committed'] for result in results)
+    failed = sum(result['failed_checkout'] for result in results)
+    rejected = sum(result['rejected_add'] for result in results)
+    sold: Dict[str, int] = {}
+    for result in results:
+        for product_id, quantity in result['sold'].items():
+            sold[product_id] = sold.get(product_id, 0) + quantity
+
+    print()
+    print(f"Elapsed:            {elapsed:.2f}s")
+    print(f"Committed sales:    {committed}")
+    print(f"Failed checkouts:   {failed}")
+    print(f"Refused cart adds:  {rejected}")
+    print(f"Throughput:         {committed / elapsed:.1f} sales/sec")
+    print(f"Checkout latency:   p50 {percentile(latencies, 50):.1f}ms  "
+          f"p90 {percentile(latencies, 90):.1f}ms  "
+          f"p99 {percentile(latencies, 99):.1f}ms  "
+          f"max {percentile(latencies, 100):.1f}ms")
+
+    # Audit: every committed unit must be gone from disk, and nothing else
+    final_stock = read_stock(data_dir)
+    mismatches = []
+    for product_id, quantity in initial_stock.items():
+        expected = quantity - sold.get(product_id, 0)
+        actual = final_stock.get(product_id)
+        if actual != expected:
+            mismatches.append((product_id, expected, actual))
+
+    # Count through the repository so bills rotated into ledger/ are included
+    bill_count = DataRepository(data_dir).bill_count()
+
+    print()
+    if mismatches:
+        print(f"STOCK AUDIT FAILED: {len(mismatches)} products disagree (lost or phantom updates)")
+        for product_id, expected, actual in mismatches:
+            print(f"  {product_id}: expected {expected}, found {actual}")
+    else:
+        print("Stock audit passed: final stock matches initial stock minus committed sales")
+    if bill_count != committed:
+        print(f"BILL AUDIT FAILED: {bill_count} bills written for {committed} committed sales")
+    else:
+        print(f"Bill audit passed: {bill_count} bills")
+
+    if not keep:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return not mismatches and bill_count == committed
+
+
+def main():
+    default_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    parser = argparse.ArgumentParser(description="Concurrent checkout load test for Smart Mart.")
+    parser.add_argument('-p', '--processes', type=int, default=4, help="number of simulated tills")
+    parser.add_argument('-n', '--sales', type=int, default=200, help="checkouts attempted per till")
+    parser.add_argument('--stock', type=int, default=100000,
+                        help="reset every product to this stock first (-1 keeps current stock)")
+    parser.add_argument('--max-lines', type=int, default=5, help="maximum distinct products per cart")
+    parser.add_argument('--max-quantity', type=int, default=3, help="maximum quantity per cart line")
+    parser.add_argument('--seed', type=int, default=1, help="random seed")
+    parser.add_argument('--data-dir', default=default_data_dir, help="data directory to copy")
+    parser.add_argument('--keep', action='store_true', help="keep the scratch data directory")
+    args = parser.parse_args()
+
+    ok = run_load_test(args.processes, args.sales, args.stock, args.max_lines,
+                       args.max_quantity, args.seed, args.data_dir, args.keep)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
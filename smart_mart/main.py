@@ -1,42 +1,72 @@
 import tkinter as tk
-from views.login_gui import LoginGUI
-from views.admin_gui import AdminGUI
-from views.cashier_gui import CashierGUI
+import atexit
+import argparse
+import multiprocessing
+from typing import Optional
+from models.stores import store_data_dir
+from models.metrics import REGISTRY
 
 class SmartMart:
-    def __init__(self):
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = data_dir
         self.current_window = None
         self.show_login()
 
     def show_login(self):
         """Show the login screen."""
+        from views.login_gui import LoginGUI
         if self.current_window:
             self.current_window.close()
             
         self.current_window = LoginGUI(
             on_admin_login=self.show_admin_panel,
-            on_cashier_login=self.show_cashier_panel
+            on_cashier_login=self.show_cashier_panel,
+            data_dir=self.data_dir
         )
         self.current_window.run()
 
     def show_admin_panel(self, username: str, password: str):
         """Show the admin panel."""
+        from views.admin_gui import AdminGUI
         if self.current_window:
             self.current_window.close()
             
-        self.current_window = AdminGUI(on_logout=self.show_login)
+        self.current_window = AdminGUI(on_logout=self.show_login, data_dir=self.data_dir,
+                                       username=username)
         self.current_window.run()
 
     def show_cashier_panel(self, username: str, password: str):
         """Show the cashier panel."""
+        from views.cashier_gui import CashierGUI
         if self.current_window:
             self.current_window.close()
             
-        self.current_window = CashierGUI(username, on_logout=self.show_login)
+        self.current_window = CashierGUI(username, on_logout=self.show_login, data_dir=self.data_dir)
         self.current_window.run()
 
 def main():
-    app = SmartMart()
+    parser = argparse.ArgumentParser(description="Smart Mart point of sale.")
+    parser.add_argument('--store', help="store to open, from <data root>/stores/<store>")
+    parser.add_argument('--data-root', help="data root (default: $SMART_MART_DATA or the data folder)")
+    parser.add_argument('--kiosk', action='store_true',
+                        help="open the read-only price-check screen instead of the login")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus metrics on localhost:PORT/metrics")
+    parser.add_argument('--metrics-file', help="write Prometheus metrics to this file on exit")
+    args = parser.parse_args()
+    
+    if args.metrics_port:
+        REGISTRY.serve(args.metrics_port)
+    if args.metrics_file:
+        atexit.register(REGISTRY.dump, args.metrics_file)
+    
+    data_dir = store_data_dir(args.store, args.data_root)
+    # Each screen is imported where it opens, so a kiosk never loads the till or admin code
+    if args.kiosk:
+        from views.kiosk_gui import KioskGUI
+        KioskGUI(data_dir).run()
+    else:
+        app = SmartMart(data_dir)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # product imports use worker processes
     main() 
\ No newline at end of file
@@ -1,215 +1,246 @@
-import os
 from typing import List, Tuple, Optional, Dict
 from datetime import datetime
+from .repository import DataRepository
+from .shift_totals import ShiftTotals
+from .product_import import ProductImporter
+from .stores import store_data_dir
+from .audit_log import AuditLog
+from .ledger import valid_product_id
+from .stock_take import StockTake, parse_count_file
+from .forecast import ReplenishmentForecast, export_report
+from .order_import import OrderImporter
+from .refunds import BillRefunds
+from .product_query import ProductQuery
 
 class Admin:
-    def __init__(self):
-        self.data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-        self.ensure_data_files_exist()
-        self.categories = ['Electronics', 'Groceries', 'Clothing', 'Home & Kitchen', 'Sports']
-        
+    def __init__(self, data_dir: Optional[str] = None, store: Optional[str] = None,
+                 username: Optional[str] = None):
+        # An explicit data_dir wins; otherwise the store's folder under the data root
+        self.data_dir = data_dir or store_data_dir(store)
+        self.username = username  # recorded as the actor of audit entries
+        # Parsing, caching and writes are shared with every Cashier in this process
+        self.repository = DataRepository.for_data_dir(self.data_dir)
+        self.shift_totals = ShiftTotals.for_data_dir(self.data_dir)
+        # Every change made through this class is recorded with its before and after values
+        self.audit_log = AuditLog.for_data_dir(self.data_dir)
+
     def ensure_data_files_exist(self):
         """Create necessary data files if they don't exist."""
-        # Create data directory if it doesn't exist
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-            
-        # Create admin.txt with default credentials if it doesn't exist
-        admin_file = os.path.join(self.data_dir, 'admin.txt')
-        if not os.path.exists(admin_file):
-            with open(admin_file, 'w') as f:
-                f.write('admin,admin123\n')
-                
-        # Create other required files
-        required_files = ['cashiers.txt', 'products.txt', 'bills.txt']
-        for filename in required_files:
-            filepath = os.path.join(self.data_dir, filename)
-            if not os.path.exists(filepath):
-                open(filepath, 'a').close()
+        self.repository.ensure_data_files_exist()
 
     def login(self, username: str, password: str) -> bool:
         """Verify admin login credentials."""
-        admin_file = os.path.join(self.data_dir, 'admin.txt')
-        try:
-            with open(admin_file, 'r') as f:
-                stored_creds = f.readline().strip().split(',')
-                return username == stored_creds[0] and password == stored_creds[1]
-        except:
-            return False
+        stored_creds = self.repository.get_admin_credentials()
+        if stored_creds is not None and username == stored_creds[0] and password == stored_creds[1]:
+            self.username = username
+            return True
+        return False
 
     def add_cashier(self, username: str, password: str) -> bool:
         """Add a new cashier to the system."""
         if not username or not password:
             return False
-            
-        cashiers_file = os.path.join(self.data_dir, 'cashiers.txt')
-        try:
-            # Check if cashier already exists
-            with open(cashiers_file, 'r') as f:
-                for line in f:
-                    if line.strip().split(',')[0] == username:
-                        return False
-                        
-            # Add new cashier
-            with open(cashiers_file, 'a') as f:
-                f.write(f"{username},{password}\n")
-            return True
-        except:
+        if ',' in username or ',' in password:
             return False
 
+        if not self.repository.add_cashier(username, password):
+            return False
+        self._audit('cashier_added', f"cashier:{username}", after=username)
+        return True
+
     def remove_cashier(self, username: str) -> bool:
         """Remove a cashier from the system."""
-        cashiers_file = os.path.join(self.data_dir, 'cashiers.txt')
-        temp_file = os.path.join(self.data_dir, 'cashiers_temp.txt')
-        
-        try:
-            found = False
-            with open(cashiers_file, 'r') as f, open(temp_file, 'w') as temp:
-                for line in f:
-                    if line.strip().split(',')[0] != username:
-                        temp.write(line)
-                    else:
-                        found = True
-                        
-            if found:
-                os.replace(temp_file, cashiers_file)
-                return True
-            else:
-                os.remove(temp_file)
-                return False
-        except:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        if not self.repository.remove_cashier(username):
             return False
+        self._audit('cashier_removed', f"cashier:{username}", before=username)
+        return True
 
     def list_cashiers(self) -> List[str]:
         """Get a list of all cashiers."""
-        cashiers_file = os.path.join(self.data_dir, 'cashiers.txt')
-        cashiers = []
-        try:
-            with open(cashiers_file, 'r') as f:
-                for line in f:
-                    username = line.strip().split(',')[0]
-                    cashiers.append(username)
-            return cashiers
-        except:
-            return []
+        return self.repository.list_cashiers()
 
     def add_product(self, product_id: str, name: str, category: str, price: float, quantity: int) -> bool:
         """Add a new product or update existing product."""
         if not all([product_id, name, category, price >= 0, quantity >= 0]):
             return False
-        
-        if category not in self.categories:
+        if not valid_product_id(product_id):
+            return False  # the bill line would not parse back
+
+        if not self.repository.has_category(category):
             return False
-            
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        temp_file = os.path.join(self.data_dir, 'products_temp.txt')
-        
-        try:
-            updated = False
-            with open(products_file, 'r') as f, open(temp_file, 'w') as temp:
-                for line in f:
-                    curr_id = line.strip().split(',')[0]
-                    if curr_id == product_id:
-                        temp.write(f"{product_id},{name},{category},{price},{quantity}\n")
-                        updated = True
-                    else:
-                        temp.write(line)
-                        
-                if not updated:
-                    temp.write(f"{product_id},{name},{category},{price},{quantity}\n")
-                    
-            os.replace(temp_file, products_file)
-            return True
-        except:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+
+        before = self.get_product(product_id)
+        product = (product_id, name, category, float(price), int(quantity))
+        if not self.repository.save_product(product):
             return False
+        if product != before:
+            self._audit('product_updated' if before else 'product_added', f"product:{product_id}",
+                        before, product)
+        return True
 
     def remove_product(self, product_id: str) -> bool:
         """Remove a product from the system."""
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        temp_file = os.path.join(self.data_dir, 'products_temp.txt')
-        
-        try:
-            found = False
-            with open(products_file, 'r') as f, open(temp_file, 'w') as temp:
-                for line in f:
-                    if line.strip().split(',')[0] != product_id:
-                        temp.write(line)
-                    else:
-                        found = True
-                        
-            if found:
-                os.replace(temp_file, products_file)
-                return True
-            else:
-                os.remove(temp_file)
-                return False
-        except:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        before = self.get_product(product_id)
+        if not self.repository.delete_product(product_id):
             return False
+        self._audit('product_removed', f"product:{product_id}", before=before)
+        return True
 
     def get_product(self, product_id: str) -> Optional[Tuple[str, str, str, float, int]]:
         """Get product details by ID."""
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        try:
-            with open(products_file, 'r') as f:
-                for line in f:
-                    data = line.strip().split(',')
-                    if data[0] == product_id:
-                        return (data[0], data[1], data[2], float(data[3]), int(data[4]))
-            return None
-        except:
-            return None
+        return self.repository.get_product(product_id)
 
     def list_products(self, category: Optional[str] = None) -> List[Tuple[str, str, str, float, int]]:
         """Get a list of all products, optionally filtered by category."""
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        products = []
-        try:
-            with open(products_file, 'r') as f:
-                for line in f:
-                    data = line.strip().split(',')
-                    if category is None or data[2] == category:
-                        products.append((data[0], data[1], data[2], float(data[3]), int(data[4])))
-            return products
-        except:
-            return []
+        return self.repository.list_products(category)
+
+    def category_sizes(self) -> Dict[str, int]:
+        """Get the number of products in each category; empty categories are left out."""
+        return self.repository.category_sizes()
+
+    def query_products(self, query: ProductQuery) -> List[Tuple[str, str, str, float, int]]:
+        """Get the products matching every condition of a query, e.g. a category, price and stock range."""
+        return self.repository.query_products(query)
 
     def get_categories(self) -> List[str]:
         """Get list of product categories."""
-        return self.categories.copy()
+        return self.repository.list_categories()
+
+    def add_category(self, category: str) -> bool:
+        """Add a new product category."""
+        if not self.repository.add_category(category):
+            return False
+        self._audit('category_added', f"category:{category.strip()}", after=category.strip())
+        return True
+
+    def remove_category(self, category: str) -> bool:
+        """Remove a product category that has no products."""
+        if not self.repository.remove_category(category):
+            return False
+        self._audit('category_removed', f"category:{category}", before=category)
+        return True
 
     def update_product_quantity(self, product_id: str, quantity: int) -> bool:
         """Update the quantity of a product."""
         if quantity < 0:
             return False
-            
+
         product = self.get_product(product_id)
         if not product:
             return False
-            
+
         return self.add_product(product_id, product[1], product[2], product[3], quantity)
 
     def change_admin_password(self, old_password: str, new_password: str) -> bool:
         """Change the admin password."""
         if not old_password or not new_password:
             return False
-            
-        admin_file = os.path.join(self.data_dir, 'admin.txt')
+
+        # Verify old password
+        stored_creds = self.repository.get_admin_credentials()
+        if stored_creds is None or stored_creds[1] != old_password:
+            return False
+
+        if not self.repository.set_admin_password(new_password):
+            return False
+        # Passwords themselves are never written to the audit log
+        self._audit('admin_password_changed', f"admin:{stored_creds[0]}")
+        return True
+
+    def get_x_report(self) -> Dict:
+        """Get the running totals of the open business day."""
+        return self.shift_totals.x_report()
+
+    def close_day(self) -> Dict:
+        """Close the business day: save a Z-report of its totals and reset them."""
+        return self.shift_totals.close_day(self.repository.products_lock)
+
+    def list_z_reports(self) -> List[str]:
+        """Get the file names of saved Z-reports."""
+        return self.shift_totals.list_z_reports()
+
+    def get_bills_between(self, start: datetime, end: datetime) -> List[Dict]:
+        """Get the bills with start <= timestamp < end, without scanning the whole ledger."""
+        return self.repository.bills_between(start, end)
+
+    def get_revenue_between(self, start: datetime, end: datetime) -> Dict:
+        """Get bill count and revenue between two times."""
+        return self.repository.revenue_between(start, end)
+
+    def import_products(self, path: str, commit: bool = True) -> Dict:
+        """Validate a bulk product file on all cores and commit it in one write if it has no errors."""
+        before = self.repository.catalog()
+        report = ProductImporter(self.repository).import_file(path, commit)
+        if report['committed']:
+            for product_id, product in report['rows'].items():
+                old = before.get(product_id)
+                if product != old:
+                    self._audit('product_imported', f"product:{product_id}", old, product)
+        return report
+
+    def import_orders(self, path: str, channel: str = 'online') -> Dict:
+        """Commit a file of online orders in one write; orders that don't fit are reported, not committed."""
+        return OrderImporter(self.repository, channel).import_file(path)
+
+    def get_refundable_bill(self, bill_number: int) -> Optional[Dict]:
+        """Get a sale with what is left to refund of each product, or None if it can't be refunded."""
+        return BillRefunds(self.repository, self.username).refundable(bill_number)
+
+    def refund_bill(self, bill_number: int, quantities: Dict[str, int]) -> Tuple[Optional[int], Optional[str]]:
+        """Refund some quantities of a bill and restock them; returns (refund bill number, error)."""
+        refund_number, error = BillRefunds(self.repository, self.username).refund(bill_number, quantities)
+        if refund_number is not None:
+            self._audit('bill_refunded', f"bill:{bill_number}", after={'refund_bill': refund_number,
+                                                                      'quantities': quantities})
+        return refund_number, error
+
+    def void_bill(self, bill_number: int) -> Tuple[Optional[int], Optional[str]]:
+        """Refund and restock everything left of a bill; returns (refund bill number, error)."""
+        refund_number, error = BillRefunds(self.repository, self.username).void(bill_number)
+        if refund_number is not None:
+            self._audit('bill_voided', f"bill:{bill_number}", after={'refund_bill': refund_number})
+        return refund_number, error
+
+    def reconcile_stock_take(self, path: str) -> Dict:
+        """Compare a ``product_id,counted_quantity`` count file with system stock.
+
+        The report lists every counted product whose stock differs, plus
+        the file's line errors (see StockTake.reconcile).
+        """
+        counts, errors = parse_count_file(path)
+        report = StockTake(self.repository).reconcile(counts)
+        report['errors'] = errors
+        return report
+
+    def apply_stock_take(self, lines: List[Dict]) -> Optional[int]:
+        """Apply accepted stock-take variances in one write; returns how many products changed."""
         try:
-            # Verify old password
-            with open(admin_file, 'r') as f:
-                stored_creds = f.readline().strip().split(',')
-                if stored_creds[1] != old_password:
-                    return False
-                    
-            # Update password
-            with open(admin_file, 'w') as f:
-                f.write(f"{stored_creds[0]},{new_password}\n")
-            return True
-        except:
-            return False 
\ No newline at end of file
+            changes = StockTake(self.repository).apply(lines)
+        except OSError:
+            return None
+        for before, after in changes:
+            self._audit('stock_take_adjusted', f"product:{before[0]}", before, after)
+        return len(changes)
+
+    def export_replenishment_report(self, path: str) -> Dict:
+        """Forecast demand from the ledger and write the products to reorder to a CSV file."""
+        rows = ReplenishmentForecast(self.repository).report()
+        export_report(rows, path)
+        reorders = [row for row in rows if row['reorder_quantity']]
+        return {'products': len(rows), 'reorders': len(reorders),
+                'units': sum(row['reorder_quantity'] for row in reorders)}
+
+    def get_audit_entries(self, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None) -> List[Dict]:
+        """Get audit entries with start <= time < end, oldest first."""
+        return self.audit_log.entries(start=start, end=end)
+
+    def get_product_history(self, product_id: str, start: Optional[datetime] = None,
+                            end: Optional[datetime] = None) -> List[Dict]:
+        """Get the audited changes to one product, oldest first."""
+        return self.audit_log.entries(f"product:{product_id}", start, end)
+
+    def _audit(self, action: str, target: str, before=None, after=None):
+        self.audit_log.record(self.username or '', action, target,
+                              list(before) if isinstance(before, tuple) else before,
+                              list(after) if isinstance(after, tuple) else after)
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from .file_lock import FileLock
+from .journal import Journal
+from .ledger import TIMESTAMP_FORMAT
+from .settings import Settings
+
+
+class AuditLog:
+    """Buffered, append-only log of admin changes, indexed by target and time.
+
+    Each line of ``audit.log`` is a JSON entry: when, who, the action, its
+    target (``product:E002``, ``cashier:bob``, ...) and the values before
+    and after. Entries are buffered and appended in batches of
+    ``audit_batch``, or ``audit_flush_ms`` after the first buffered entry,
+    so bulk edits don't pay a write per change; a crash can lose at most
+    that window.
+
+    ``audit.idx`` holds one ``offset,length,time,target`` line per entry and
+    is appended by the writer together with the entries. Readers load it
+    once and keep a per-target and a time-sorted index in memory, scanning
+    only log bytes appended since, so a lookup reads just the matching
+    entries. Entries the index file lost in a crash are found by that scan
+    and the index file is rewritten on the next flush.
+
+    Each batch is also journaled with the offset it was appended at, so a
+    hot backup ships admin changes made after its base copy.
+    """
+
+    _logs: Dict[str, 'AuditLog'] = {}
+    _logs_guard = threading.Lock()
+
+    def __init__(self, data_dir: str, settings: Optional[Settings] = None):
+        settings = settings or Settings(data_dir)
+        self.log_file = os.path.join(data_dir, 'audit.log')
+        self.index_file = os.path.join(data_dir, 'audit.idx')
+        self.batch_size = max(1, settings.get_int('audit_batch', 256))
+        self.flush_interval = settings.get_float('audit_flush_ms', 1000) / 1000.0
+        # Appends from every process are serialized so entries and index lines stay in step
+        self.lock = FileLock.for_path(os.path.join(data_dir, 'audit.lock'))
+        self.journal = Journal.for_data_dir(data_dir)
+
+        self._pending: List[Tuple[str, float, str]] = []  # (line, time, target)
+        self._pending_guard = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+
+        self._guard = threading.RLock()
+        self._indexed_size: Optional[int] = None  # log bytes covered by the in-memory index
+        self._entries: Dict[int, Tuple[int, float, str]] = {}  # offset: (length, time, target)
+        self._by_target: Dict[str, List[int]] = {}  # target: offsets
+        self._by_time: List[Tuple[float, int]] = []  # (time, offset), sorted
+        self._index_stale = False  # the index file misses entries found in the log
+        atexit.register(self.flush)
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'AuditLog':
+        """Get the process-wide audit log of a data directory."""
+        key = os.path.abspath(data_dir)
+        with cls._logs_guard:
+            if key not in cls._logs:
+                cls._logs[key] = cls(key)
+            return cls._logs[key]
+
+    def record(self, actor: str, action: str, target: str, before: Any = None, after: Any = None):
+        """Buffer one entry; it is written with the next batch."""
+        now = time.time()
+        line = json.dumps({
+            'time': now,
+            'at': datetime.fromtimestamp(now).strftime(TIMESTAMP_FORMAT),
+            'actor': actor,
+            'action': action,
+            'target': target,
+            'before': before,
+            'after': after,
+        }, separators=(',', ':'))
+        with self._pending_guard:
+            self._pending.append((line, now, target))
+            full = len(self._pending) >= self.batch_size
+            if not full and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Append every buffered entry in one write."""
+        with self._pending_guard:
+            lines, self._pending = self._pending, []
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if not lines:
+            return
+
+        with self._guard, self.lock:
+            self._load()
+            self._catch_up()
+            data = [(line + '\n').encode('utf-8') for line, _, _ in lines]
+            with open(self.log_file, 'ab') as f:
+                offset = f.tell()
+                f.write(b''.join(data))
+            # Under the audit lock, so a base backup sees a batch in both audit.log and the journal or in neither
+            self.journal.record({'op': 'audit', 'offset': offset, 'lines': [line for line, _, _ in lines]})
+            if self._index_end() != offset:
+                self._index_stale = True  # a writer crashed between its entries and their index lines
+            new_entries = []
+            for (_, timestamp, target), raw in zip(lines, data):
+                entry = (offset, len(raw), timestamp, target)
+                self._add(*entry)
+                new_entries.append(entry)
+                offset += len(raw)
+            self._indexed_size = offset
+
+            if self._index_stale:
+                self._write_index()
+            else:
+                self._append_index(new_entries)
+
+    def entries(self, target: Optional[str] = None, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> List[Dict]:
+        """Get the entries of one target and/or with start <= time < end, oldest first."""
+        self.flush()
+        start_ts = start.timestamp() if start else float('-inf')
+        end_ts = end.timestamp() if end else float('inf')
+        with self._guard:
+            self._load()
+            self._catch_up()
+            if target is not None:
+                matches = [(self._entries[offset][1], offset) for offset in self._by_target.get(target, [])
+                           if start_ts <= self._entries[offset][1] < end_ts]
+                matches.sort()
+            else:
+                i = bisect.bisect_left(self._by_time, (start_ts, -1))
+                j = bisect.bisect_left(self._by_time, (end_ts, -1))
+                matches = self._by_time[i:j]
+            locations = [(offset, self._entries[offset][0]) for _, offset in matches]
+
+        entries = []
+        if not locations:
+            return entries
+        with open(self.log_file, 'rb') as f:
+            for offset, length in locations:
+                f.seek(offset)
+                try:
+                    entries.append(json.loads(f.read(length)))
+                except ValueError:
+                    continue
+        return entries
+
+    def _add(self, offset: int, length: int, timestamp: float, target: str):
+        self._entries[offset] = (length, timestamp, target)
+        self._by_target.setdefault(target, []).append(offset)
+        # Batches from different tills can interleave by a flush interval; keep time order
+        if not self._by_time or self._by_time[-1] <= (timestamp, offset):
+            self._by_time.append((timestamp, offset))
+        else:
+            bisect.insort(self._by_time, (timestamp, offset))
+
+    def _load(self):
+        """Read the index file once; only entries contiguous from the start of the log are trusted."""
+        if self._indexed_size is not None:
+            return
+        self._indexed_size = 0
+        try:
+            with open(self.index_file, 'r') as f:
+                for line in f:
+                    data = line.rstrip('\n').split(',', 3)
+                    if len(data) != 4:
+                        self._index_stale = True
+                        break
+                    offset, length, timestamp, target = int(data[0]), int(data[1]), float(data[2]), data[3]
+                    if offset != self._indexed_size:
+                        self._index_stale = True  # an entry lost its index line; scan from here
+                        break
+                    self._add(offset, length, timestamp, target)
+                    self._indexed_size = offset + length
+        except OSError:
+            pass
+        except ValueError:
+            self._index_stale = True
+        if self._indexed_size > self._log_size():
+            # The log is shorter than its index (restored or truncated): index it again
+            self._entries, self._by_target, self._by_time = {}, {}, []
+            self._indexed_size = 0
+            self._index_stale = True
+
+    def _catch_up(self):
+        """Index complete entries appended to the log since it was last read."""
+        if self._indexed_size >= self._log_size():
+            return
+        offset = self._indexed_size
+        with open(self.log_file, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # being written right now
+                try:
+                    entry = json.loads(raw)
+                    self._add(offset, len(raw), float(entry['time']), entry['target'])
+                except (ValueError, KeyError, TypeError):
+                    pass
+                offset += len(raw)
+        self._indexed_size = offset
+
+    def _log_size(self) -> int:
+        try:
+            return os.path.getsize(self.log_file)
+        except OSError:
+            return 0
+
+    def _index_end(self) -> int:
+        """Get the log offset just after the last entry of the index file."""
+        try:
+            with open(self.index_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 1024))
+                lines = f.read().splitlines()
+            data = lines[-1].split(b',', 3)
+            return int(data[0]) + int(data[1])
+        except (OSError, IndexError, ValueError):
+            return 0
+
+    def _append_index(self, entries: List[Tuple[int, int, float, str]]):
+        try:
+            with open(self.index_file, 'a') as f:
+                for offset, length, timestamp, target in entries:
+                    f.write(f"{offset},{length},{timestamp!r},{target}\n")
+        except OSError:
+            self._index_stale = True
+
+    def _write_index(self):
+        """Replace the index file with the whole in-memory index (caller holds ``lock``)."""
+        temp_file = self.index_file + '.tmp'
+        try:
+            with open(temp_file, 'w') as f:
+                for offset in sorted(self._entries):
+                    length, timestamp, target = self._entries[offset]
+                    f.write(f"{offset},{length},{timestamp!r},{target}\n")
+            os.replace(temp_file, self.index_file)
+            self._index_stale = False
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
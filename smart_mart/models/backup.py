@@ -0,0 +1,321 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from .audit_log import AuditLog
+from .bill_archive import BillArchive
+from .journal import Journal, Position
+from .ledger import TIMESTAMP_FORMAT, parse_bill
+from .product_store import product_files_for
+from .repository import DataRepository
+from .settings import Settings
+from .shift_totals import ShiftTotals, add_sales
+
+
+class HotBackup:
+    """Incremental hot backup of a data directory by journal shipping.
+
+    The backup directory holds a ``base/`` copy of the data directory, the
+    journal segments shipped since (``journal/``) and ``state.json`` with
+    the journal positions of both. ``take_base`` holds the products lock
+    only long enough to hard-link the catalog files (they are always
+    replaced, never rewritten in place), copy the small files and note the
+    ledger's length; the ledger and its archived partitions are copied
+    after the lock is released. ``ship`` then copies only journal bytes
+    added since the last call, without taking any lock, so a backup costs
+    I/O in proportion to the changes. ``restore`` replays the shipped
+    journal over the base copy.
+    """
+
+    # Runtime files that are never backed up; every store under stores/ has its own backup
+    SKIP_DIRS = ('journal', 'receipts', 'stores')
+    SKIP_PREFIXES = ('bills.idx', 'reservations')
+    SKIP_SUFFIXES = ('.lock', '.tmp')
+
+    def __init__(self, data_dir: str, backup_dir: str):
+        self.data_dir = os.path.abspath(data_dir)
+        self.backup_dir = os.path.abspath(backup_dir)
+        self.base_dir = os.path.join(self.backup_dir, 'base')
+        self.state_file = os.path.join(self.backup_dir, 'state.json')
+        self.journal = Journal.for_data_dir(self.data_dir)
+        # The shipped segments, read with the same segment layout as the live journal
+        self.shipped = Journal(self.backup_dir, Settings(self.backup_dir))
+
+    def take_base(self) -> Dict:
+        """Take a new base copy and start shipping the journal from it."""
+        if not self.journal.enabled:
+            raise RuntimeError("journaling is off; set journal=yes in settings.txt before taking a base")
+        os.makedirs(self.backup_dir, exist_ok=True)
+        staging = os.path.join(self.backup_dir, 'base.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        repository = DataRepository.for_data_dir(self.data_dir)
+
+        deferred = []  # (open source file, target path, bytes to copy) copied after the lock
+        # Same order as the writers: an audit flush journals its batch while holding the audit lock
+        with repository.products_lock, AuditLog.for_data_dir(self.data_dir).lock, self.journal.lock:
+            position = self.journal.position()
+            for source, relative in self._files():
+                target = os.path.join(staging, relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if relative in ('bills.txt', 'audit.log') or relative.startswith('ledger' + os.sep) \
+                        and not relative.endswith('manifest.json'):
+                    # Appended in place or never changed again: copy outside the lock
+                    source_file = open(source, 'rb')
+                    deferred.append((source_file, target, os.fstat(source_file.fileno()).st_size))
+                elif relative == 'products.txt' or relative.startswith('products' + os.sep):
+                    try:
+                        os.link(source, target)
+                    except OSError:  # another file system
+                        shutil.copy2(source, target)
+                else:
+                    shutil.copy2(source, target)
+
+        for source_file, target, size in deferred:
+            with source_file, open(target, 'wb') as f:
+                remaining = size
+                while remaining > 0:
+                    chunk = source_file.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+
+        # Swap the new base in and drop journal segments it already covers
+        old_base = self.base_dir + '.old'
+        shutil.rmtree(old_base, ignore_errors=True)
+        if os.path.exists(self.base_dir):
+            os.replace(self.base_dir, old_base)
+        os.replace(staging, self.base_dir)
+        shutil.rmtree(old_base, ignore_errors=True)
+        shutil.rmtree(self.shipped.directory, ignore_errors=True)
+
+        state = {'base_position': list(position), 'shipped_position': list(position),
+                 'base_taken_at': datetime.now().strftime(TIMESTAMP_FORMAT)}
+        self._save_state(state)
+        return state
+
+    def ship(self) -> int:
+        """Copy journal entries added since the last call; returns the bytes shipped."""
+        state = self._load_state()
+        position: Position = tuple(state['shipped_position'])
+        segments = self.journal.segments()
+        if segments and position[0] < segments[0]:
+            raise RuntimeError("journal segments were pruned before they were shipped; take a new base")
+
+        os.makedirs(self.shipped.directory, exist_ok=True)
+        shipped = 0
+        current_segment, out = None, None
+        try:
+            for (segment, offset), raw in self.journal.read(position):
+                if segment != current_segment:
+                    if out is not None:
+                        self._close_segment(out)
+                    current_segment = segment
+                    out = self._open_segment(segment, position[1] if segment == position[0] else 0)
+                out.write(raw)
+                shipped += len(raw)
+                position = (segment, offset)
+        finally:
+            if out is not None:
+                self._close_segment(out)
+
+        if shipped:
+            state['shipped_position'] = list(position)
+            state['shipped_at'] = datetime.now().strftime(TIMESTAMP_FORMAT)
+            self._save_state(state)
+        return shipped
+
+    def follow(self, interval: float = 1.0, stop: Optional[threading.Event] = None):
+        """Ship continuously every ``interval`` seconds until ``stop`` is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.ship()
+            stop.wait(interval)
+
+    def prune_live_journal(self) -> int:
+        """Delete live journal segments this backup has shipped (only safe with a single backup)."""
+        state = self._load_state()
+        return self.journal.prune(state['shipped_position'][0])
+
+    def restore(self, target_dir: str) -> Dict:
+        """Rebuild the data directory as of the last shipped entry into ``target_dir``."""
+        if os.path.isdir(target_dir) and os.listdir(target_dir):
+            raise ValueError(f"restore target '{target_dir}' is not empty")
+        state = self._load_state()
+        shutil.copytree(self.base_dir, target_dir, dirs_exist_ok=True)
+        report = self._replay(target_dir, tuple(state['base_position']), tuple(state['shipped_position']))
+        report['position'] = state['shipped_position']
+        return report
+
+    def verify(self) -> Dict:
+        """Restore into a scratch folder and check the result.
+
+        Checks that every shipped entry replays, that bill numbers have no
+        gaps, and, when the live journal has not moved past the backup,
+        that the restored catalog and bill count match the live ones.
+        """
+        state = self._load_state()
+        errors: List[str] = []
+        scratch = tempfile.mkdtemp(prefix='smart_mart_verify_')
+        try:
+            report = self.restore(os.path.join(scratch, 'data'))
+            errors.extend(report['errors'])
+            restored_dir = os.path.join(scratch, 'data')
+            restored_products = product_files_for(restored_dir).load()
+            numbers = [bill['bill_number'] for bill in self._restored_bills(restored_dir)
+                       if bill['timestamp'] and bill['bill_number']]
+            for previous, number in zip(numbers, numbers[1:]):
+                if number != previous + 1:
+                    errors.append(f"bill numbers jump from {previous} to {number}")
+
+            # Compare with the live data if nothing was written since the last ship
+            repository = DataRepository.for_data_dir(self.data_dir)
+            with repository.products_lock, self.journal.lock:
+                current = list(self.journal.position()) == state['shipped_position']
+                live_products = repository.load_products() if current else None
+                live_bills = repository.bill_count() if current else None
+            if current:
+                if live_products != restored_products:
+                    errors.append("restored catalog differs from the live catalog")
+                restored_bills = BillArchive(restored_dir, os.path.join(restored_dir, 'bills.txt')).archived_lines() \
+                    + self._count_lines(os.path.join(restored_dir, 'bills.txt'))
+                if restored_bills != live_bills:
+                    errors.append(f"restored ledger has {restored_bills} bills, live ledger {live_bills}")
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        return {
+            'ok': not errors,
+            'errors': errors,
+            'entries': report['entries'],
+            'products': len(restored_products),
+            'compared_with_live': current,
+            'base_taken_at': state.get('base_taken_at'),
+            'shipped_position': state['shipped_position'],
+        }
+
+    def _replay(self, target_dir: str, start: Position, end: Position) -> Dict:
+        """Apply shipped journal entries between two positions to a restored copy."""
+        product_files = product_files_for(target_dir, Settings(target_dir))
+        products = product_files.load()
+        bills_file = os.path.join(target_dir, 'bills.txt')
+        bill_count = BillArchive(target_dir, bills_file).archived_lines() + self._count_lines(bills_file)
+
+        audit_file = os.path.join(target_dir, 'audit.log')
+        totals_file = os.path.join(target_dir, 'shift_totals.json')
+        totals = None  # loaded when the first totals entry is replayed
+
+        entries = 0
+        errors: List[str] = []
+        with open(bills_file, 'a') as bills:
+            for (segment, offset), raw in self.shipped.read(start):
+                if (segment, offset) > end:
+                    break
+                try:
+                    ops = json.loads(raw)['ops']
+                except (ValueError, KeyError):
+                    errors.append(f"unreadable journal entry in segment {segment} before offset {offset}")
+                    continue
+                entries += 1
+                for op in ops:
+                    if op['op'] == 'products':
+                        for record in op['set']:
+                            products[record[0]] = (record[0], record[1], record[2], float(record[3]), int(record[4]))
+                        for product_id in op['delete']:
+                            products.pop(product_id, None)
+                    elif op['op'] == 'bills':
+                        for line in op['lines']:
+                            bill = parse_bill(line)
+                            # The base copy may already hold bills written after its position
+                            if bill and bill['bill_number'] <= bill_count:
+                                continue
+                            bills.write(f"{line}\n")
+                            bill_count += 1
+                    elif op['op'] == 'audit':
+                        self._replay_audit(audit_file, op)
+                    elif op['op'] == 'totals':
+                        if totals is None:
+                            totals = ShiftTotals(target_dir).x_report()
+                        add_sales(totals, op['sales'])
+                    elif op['op'] == 'file':
+                        path = os.path.join(target_dir, op['name'])
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with open(path, 'w') as f:
+                            f.write(op['content'])
+                        if os.path.abspath(path) == os.path.abspath(totals_file):
+                            totals = None  # a new day; later sales add to the replaced file
+        product_files.write(products)
+        if totals is not None:
+            with open(totals_file, 'w') as f:
+                json.dump(totals, f)
+        return {'entries': entries, 'errors': errors, 'products': len(products), 'bills': bill_count}
+
+    def _replay_audit(self, audit_file: str, op: Dict):
+        """Append a journaled audit batch unless the restored audit.log already holds it."""
+        data = b''.join((line + '\n').encode('utf-8') for line in op['lines'])
+        with open(audit_file, 'ab') as f:
+            size = f.tell()
+            if size >= op['offset'] + len(data):
+                return  # the base copy already has it
+            if size > op['offset']:
+                f.truncate(op['offset'])  # only part of the batch was copied; write it whole
+            f.write(data)
+
+    def _restored_bills(self, data_dir: str):
+        archive = BillArchive(data_dir, os.path.join(data_dir, 'bills.txt'))
+        for partition in archive.partitions():
+            yield from archive.iter_bills(partition)
+        with open(os.path.join(data_dir, 'bills.txt'), 'r', errors='replace') as f:
+            for line_number, line in enumerate(f, archive.archived_lines() + 1):
+                bill = parse_bill(line, line_number)
+                if bill:
+                    yield bill
+
+    def _files(self):
+        """Yield (path, path relative to the data directory) of every file to back up."""
+        for root, dirs, files in os.walk(self.data_dir):
+            if root == self.data_dir:
+                dirs[:] = [d for d in dirs if d not in self.SKIP_DIRS]
+            for name in files:
+                if name.startswith(self.SKIP_PREFIXES) or name.endswith(self.SKIP_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                yield path, os.path.relpath(path, self.data_dir)
+
+    def _open_segment(self, segment: int, offset: int):
+        """Open a shipped segment for appending at ``offset``, dropping any half-shipped tail."""
+        path = self.shipped.segment_file(segment)
+        f = open(path, 'r+b' if os.path.exists(path) else 'wb')
+        f.truncate(offset)
+        f.seek(offset)
+        return f
+
+    def _close_segment(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+
+    def _count_lines(self, path: str) -> int:
+        try:
+            with open(path, 'rb') as f:
+                return sum(1 for _ in f)
+        except OSError:
+            return 0
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise RuntimeError(f"no base backup in '{self.backup_dir}'; take one first")
+
+    def _save_state(self, state: Dict):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.state_file)
@@ -0,0 +1,259 @@
+import os
+import gzip
+import bisect
+import json
+import lzma
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from .ledger import TIMESTAMP_FORMAT, parse_bill
+from .settings import Settings
+
+
+class BillArchive:
+    """Rotated partitions of the bill ledger, listed in ``ledger/manifest.json``.
+
+    When bills.txt is rotated (daily, or once it reaches a size limit) its
+    lines are moved into one partition file, compressed with lzma or gzip,
+    and the manifest gets an entry with the partition's bill numbers, time
+    range, sale count and total, and the refunds it holds. Sales then only
+    ever append to a small bills.txt, and reports read the manifest to
+    skip, sum or stream-decompress only the partitions they need.
+
+    Rotation runs under the products lock. The partition and the manifest
+    are written before bills.txt is emptied; if that last step is
+    interrupted, ``rotate_if_due`` finishes it before the next sale.
+    """
+
+    COMPRESSIONS = {
+        'xz': ('.xz', lzma.open),
+        'gz': ('.gz', gzip.open),
+        'none': ('', open),
+    }
+
+    def __init__(self, data_dir: str, bills_file: str, settings: Optional[Settings] = None):
+        settings = settings or Settings(data_dir)
+        self.bills_file = bills_file
+        self.archive_dir = os.path.join(data_dir, 'ledger')
+        self.manifest_file = os.path.join(self.archive_dir, 'manifest.json')
+        self.rotation = settings.get('ledger_rotation')
+        self.rotate_bytes = int(settings.get_float('ledger_rotate_mb', 64) * 1024 * 1024)
+        self.compression = settings.get('ledger_compression')
+        if self.compression not in self.COMPRESSIONS:
+            self.compression = 'xz'
+
+        self._partitions: List[Dict] = []
+        self._manifest_stamp: Optional[Tuple[int, int, int]] = None
+        self._active_day: Tuple[Optional[int], Optional[str]] = (None, None)  # (inode, first bill date)
+
+    def partitions(self) -> List[Dict]:
+        """Get the manifest entries, oldest first."""
+        stamp = self._stamp(self.manifest_file)
+        if stamp != self._manifest_stamp:
+            try:
+                with open(self.manifest_file, 'r') as f:
+                    self._partitions = json.load(f)['partitions']
+            except (OSError, ValueError, KeyError):
+                self._partitions = []
+            self._manifest_stamp = stamp
+        return self._partitions
+
+    def archived_lines(self) -> int:
+        """Get the number of ledger lines moved into partitions."""
+        partitions = self.partitions()
+        return partitions[-1]['last_bill'] if partitions else 0
+
+    def rotate_if_due(self, now: Optional[datetime] = None) -> bool:
+        """Rotate bills.txt if the rotation policy says so (caller holds the products lock).
+
+        Returns True if bills.txt was replaced, so cached counts and the
+        time index of the active ledger must be reset.
+        """
+        partitions = self.partitions()
+        stamp = self._stamp(self.bills_file)
+        if stamp is None:
+            return False
+
+        # An earlier rotation stopped after writing the manifest: just empty bills.txt
+        if partitions and partitions[-1].get('source_stamp') == list(stamp):
+            self._clear_active()
+            return True
+
+        if stamp[2] == 0 or self.rotation == 'none':
+            return False
+        if self.rotation == 'size':
+            due = stamp[2] >= self.rotate_bytes
+        else:
+            first_day = self._first_day(stamp[0])
+            due = first_day is not None and first_day < (now or datetime.now()).strftime('%Y-%m-%d')
+        if not due:
+            return False
+        self.rotate()
+        return True
+
+    def rotate(self) -> Optional[Dict]:
+        """Move bills.txt into a new compressed partition (caller holds the products lock)."""
+        stamp = self._stamp(self.bills_file)
+        if stamp is None or stamp[2] == 0:
+            return None
+        os.makedirs(self.archive_dir, exist_ok=True)
+        first_bill = self.archived_lines() + 1
+        suffix, opener = self.COMPRESSIONS[self.compression]
+        temp_file = os.path.join(self.archive_dir, f"partition_{first_bill:06d}.tmp")
+
+        # One pass: copy every line into the compressor and collect the manifest totals
+        entry = {'lines': 0, 'sales': 0, 'undated': 0, 'total': 0.0, 'start': None, 'end': None, 'bytes': 0}
+        refunds = []  # (original bill, refund bill)
+        try:
+            with open(self.bills_file, 'rb') as source, opener(temp_file, 'wb') as target:
+                for raw in source:
+                    target.write(raw)
+                    entry['lines'] += 1
+                    entry['bytes'] += len(raw)
+                    bill = parse_bill(raw.decode('utf-8', errors='replace'), first_bill + entry['lines'] - 1)
+                    if not bill:
+                        continue
+                    entry['sales'] += 1
+                    entry['total'] += bill['total']
+                    if bill['refund_of']:
+                        refunds.append([bill['refund_of'], bill['bill_number']])
+                    if not bill['timestamp']:
+                        entry['undated'] += 1  # older line formats without a time
+                    else:
+                        if entry['start'] is None or bill['timestamp'] < entry['start']:
+                            entry['start'] = bill['timestamp']
+                        if entry['end'] is None or bill['timestamp'] > entry['end']:
+                            entry['end'] = bill['timestamp']
+            self._fsync(temp_file)
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+
+        day = (entry['start'] or datetime.now().strftime(TIMESTAMP_FORMAT))[:10].replace('-', '')
+        filename = f"bills_{day}_{first_bill:06d}.txt{suffix}"
+        os.replace(temp_file, os.path.join(self.archive_dir, filename))
+        entry.update({
+            'file': filename,
+            'compression': self.compression,
+            'first_bill': first_bill,
+            'last_bill': first_bill + entry['lines'] - 1,
+            'total': round(entry['total'], 2),
+            'source_stamp': list(stamp),  # bills.txt as archived, to detect an unfinished rotation
+            'rotated_at': datetime.now().strftime(TIMESTAMP_FORMAT),
+        })
+        if refunds:
+            entry['refunds'] = refunds
+        self._write_manifest(self.partitions() + [entry])
+        self._clear_active()
+        return entry
+
+    def iter_bills(self, partition: Dict) -> Iterator[Dict]:
+        """Stream the bills of one partition, decompressing as it goes."""
+        opener = self.COMPRESSIONS.get(partition.get('compression'), self.COMPRESSIONS['none'])[1]
+        with opener(os.path.join(self.archive_dir, partition['file']), 'rt', encoding='utf-8',
+                    errors='replace') as f:
+            for line_number, line in enumerate(f, partition['first_bill']):
+                bill = parse_bill(line, line_number)
+                if bill:
+                    yield bill
+
+    def find_bill(self, bill_number: int) -> Optional[Dict]:
+        """Get an archived bill by number, decompressing only the partition that holds it."""
+        partitions = self.partitions()
+        i = bisect.bisect_right([partition['first_bill'] for partition in partitions], bill_number) - 1
+        if i < 0 or bill_number > partitions[i]['last_bill']:
+            return None
+        for bill in self.iter_bills(partitions[i]):
+            if bill['bill_number'] == bill_number:
+                return bill
+        return None
+
+    def refunds_of(self, bill_number: int) -> List[int]:
+        """Get the numbers of archived refund bills that reverse a bill."""
+        return [refund_bill for partition in self.partitions() if partition['last_bill'] > bill_number
+                for original, refund_bill in partition.get('refunds', []) if original == bill_number]
+
+    def bills_between(self, start: datetime, end: datetime) -> List[Dict]:
+        """Get archived bills with start <= timestamp < end, reading only overlapping partitions."""
+        return list(self.iter_between(start, end))
+
+    def iter_between(self, start: datetime, end: datetime) -> Iterator[Dict]:
+        """Stream archived bills with start <= timestamp < end, one overlapping partition after another."""
+        start_text, end_text = start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+        for partition in self._overlapping(start_text, end_text):
+            for bill in self.iter_bills(partition):
+                if bill['timestamp'] and start_text <= bill['timestamp'] < end_text:
+                    yield bill
+
+    def summarize(self, start: datetime, end: datetime) -> Dict:
+        """Get archived bill count and revenue between two times.
+
+        Partitions that lie entirely inside the range, and whose bills all
+        have a time, are taken from the manifest without being opened.
+        """
+        start_text, end_text = start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+        sales, total = 0, 0.0
+        for partition in self._overlapping(start_text, end_text):
+            inside = start_text <= partition['start'] and partition['end'] < end_text
+            if inside and not partition.get('undated'):
+                sales += partition['sales']
+                total += partition['total']
+                continue
+            for bill in self.iter_bills(partition):
+                if bill['timestamp'] and start_text <= bill['timestamp'] < end_text:
+                    sales += 1
+                    total += bill['total']
+        return {'sales': sales, 'total': round(total, 2)}
+
+    def _overlapping(self, start_text: str, end_text: str) -> List[Dict]:
+        # Partitions without any timestamped bill can never match a time range
+        return [partition for partition in self.partitions()
+                if partition['start'] is not None
+                and partition['start'] < end_text and partition['end'] >= start_text]
+
+    def _first_day(self, inode: int) -> Optional[str]:
+        """Get the date of the first timestamped bill in bills.txt, cached per file."""
+        if self._active_day[0] == inode:
+            return self._active_day[1]
+        day = None
+        try:
+            with open(self.bills_file, 'r', errors='replace') as f:
+                for line in f:
+                    bill = parse_bill(line)
+                    if bill and bill['timestamp']:
+                        day = bill['timestamp'][:10]
+                        break
+        except OSError:
+            return None
+        # Only cache a found date; legacy lines alone might be followed by new ones
+        if day is not None:
+            self._active_day = (inode, day)
+        return day
+
+    def _clear_active(self):
+        """Atomically replace bills.txt with an empty file."""
+        temp_file = self.bills_file + '.tmp'
+        open(temp_file, 'w').close()
+        os.replace(temp_file, self.bills_file)
+        self._active_day = (None, None)
+
+    def _write_manifest(self, partitions: List[Dict]):
+        temp_file = self.manifest_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'partitions': partitions}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.manifest_file)
+        self._partitions = partitions
+        self._manifest_stamp = self._stamp(self.manifest_file)
+
+    def _fsync(self, path: str):
+        with open(path, 'rb') as f:
+            os.fsync(f.fileno())
+
+    def _stamp(self, path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
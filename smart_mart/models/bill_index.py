@@ -0,0 +1,303 @@
+import os
+import bisect
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .ledger import TIMESTAMP_FORMAT, parse_bill
+
+
+class BillTimeIndex:
+    """Sparse time index over an append-only bill ledger.
+
+    ``bills.idx`` holds one ``bucket_start,byte_offset`` line for the first
+    bill of every time bucket that has sales. A range query bisects the
+    buckets to find the byte window that can contain matching bills, and
+    reads only that window of the ledger.
+
+    Only the ledger writer appends to the index, right after the bills
+    (under the products lock). Readers keep the index in memory and scan
+    any ledger tail appended since, so bills written by other processes, or
+    whose index entry was lost in a crash, are still found; a missing entry
+    only widens the byte window that is read. The index covers bills.txt
+    only; when the ledger is rotated it is emptied, and readers reload it
+    once they see that bills.txt was replaced.
+
+    The same file also locates bills by number: a ``#,bill_number,offset``
+    line every NUMBER_STRIDE bills bounds the window a lookup reads, and an
+    ``R,original,refund_bill,offset`` line for every refund lets a bill's
+    refunds be found without scanning the ledger.
+
+    Sale timestamps are taken before the sale waits for its commit group,
+    so concurrent tills can append a bill after the first bill of a later
+    bucket. Such a bill gets an ``L,bucket,offset`` line, and a range query
+    reads the late bills of its buckets that lie past its byte window.
+    """
+
+    BUCKET_SECONDS = 600
+    NUMBER_STRIDE = 256
+
+    def __init__(self, bills_file: str, index_file: Optional[str] = None):
+        self.bills_file = bills_file
+        self.index_file = index_file or os.path.splitext(bills_file)[0] + '.idx'
+        self._guard = threading.RLock()
+        self._buckets: List[int] = []
+        self._offsets: List[int] = []
+        self._numbers: List[int] = []  # bill numbers, every NUMBER_STRIDE bills
+        self._number_offsets: List[int] = []
+        self._refunds: Dict[int, List[Tuple[int, int]]] = {}  # original bill: (refund bill, offset)
+        self._refund_entries: List[Tuple[int, int, int]] = []  # (offset, original, refund bill), by offset
+        self._late: List[Tuple[int, int]] = []  # (offset, bucket) of bills older than the bucket before them
+        self._written_offset = -1  # ledger offset of the last entry in the index file
+        self._indexed_size: Optional[int] = None  # ledger bytes covered by the index
+        self._ledger_inode: Optional[int] = None  # bills.txt the index was loaded for
+
+    def record(self, offset: int, lines: List[str]):
+        """Index lines that were just appended to the ledger starting at ``offset``."""
+        with self._guard:
+            self._load(offset)
+            self._catch_up(offset)
+            for line in lines:
+                self._index_line(line, offset)
+                offset += len(line.encode('utf-8')) + 1
+            self._indexed_size = offset
+            # Also writes entries another writer lost in a crash, found by the catch-up scan
+            self._append_entries()
+
+    def query(self, start: datetime, end: datetime) -> List[Dict]:
+        """Get the bills with start <= timestamp < end, in ledger order."""
+        with self._guard:
+            self._load()
+            self._catch_up(self._ledger_size())
+            start_ts, end_ts = start.timestamp(), end.timestamp()
+
+            # Byte window: from the bucket holding `start` to the first bucket past `end`
+            i = bisect.bisect_right(self._buckets, self._bucket(start_ts)) - 1
+            begin = self._offsets[i] if i >= 0 else 0
+            j = bisect.bisect_right(self._buckets, self._bucket(end_ts))
+            stop = self._offsets[j] if j < len(self._offsets) else self._indexed_size
+            # Bills of the range committed after a later bucket had started
+            first, last = self._bucket(start_ts), self._bucket(end_ts)
+            late = [offset for offset, bucket in self._late[bisect.bisect_left(self._late, (stop,)):]
+                    if first <= bucket <= last]
+
+        bills = []
+        start_text, end_text = start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+        for bill in self._read_window(begin, stop) + [bill for _, bill in self._read_lines(late)]:
+            if bill['timestamp'] and start_text <= bill['timestamp'] < end_text:
+                bills.append(bill)
+        return bills
+
+    def find(self, bill_number: int) -> Optional[Dict]:
+        """Get a bill of bills.txt by number, reading at most NUMBER_STRIDE bills."""
+        with self._guard:
+            self._load()
+            self._catch_up(self._ledger_size())
+            i = bisect.bisect_right(self._numbers, bill_number) - 1
+            begin = self._number_offsets[i] if i >= 0 else 0
+            stop = self._number_offsets[i + 1] if i + 1 < len(self._numbers) else self._indexed_size
+        for bill in self._read_window(begin, stop):
+            if bill['bill_number'] == bill_number:
+                return bill
+        return None
+
+    def refunds_of(self, bill_number: int) -> List[Dict]:
+        """Get the refunds and voids in bills.txt that reverse a bill."""
+        with self._guard:
+            self._load()
+            self._catch_up(self._ledger_size())
+            entries = list(self._refunds.get(bill_number, []))
+        numbers = {offset: refund_bill for refund_bill, offset in entries}
+        return [bill for offset, bill in self._read_lines(list(numbers)) if bill['bill_number'] == numbers[offset]]
+
+    def summarize(self, start: datetime, end: datetime) -> Dict:
+        """Get bill count and revenue between two times."""
+        bills = self.query(start, end)
+        return {'sales': len(bills), 'total': round(sum(bill['total'] for bill in bills), 2)}
+
+    def rebuild(self):
+        """Rebuild the index file from the whole ledger (caller holds the products lock)."""
+        with self._guard:
+            self._clear()
+            self._indexed_size = 0
+            self._catch_up(self._ledger_size())
+            self._write_index()
+
+    def reset(self):
+        """Empty the index before bills.txt is replaced by rotation (caller holds the products lock)."""
+        with self._guard:
+            self._clear()
+            self._indexed_size = None
+            self._write_index()
+
+    def _clear(self):
+        self._buckets, self._offsets = [], []
+        self._numbers, self._number_offsets = [], []
+        self._refunds = {}
+        self._refund_entries = []
+        self._late = []
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.BUCKET_SECONDS) * self.BUCKET_SECONDS
+
+    def _index_line(self, line: str, offset: int):
+        """Add the index entries of one ledger line at ``offset`` in memory."""
+        bill = parse_bill(line)
+        if not bill:
+            return
+        if bill['timestamp']:
+            try:
+                bucket = self._bucket(datetime.strptime(bill['timestamp'], TIMESTAMP_FORMAT).timestamp())
+            except ValueError:
+                bucket = None
+            if bucket is not None and (not self._buckets or bucket > self._buckets[-1]):
+                self._buckets.append(bucket)
+                self._offsets.append(offset)
+            elif bucket is not None and bucket < self._buckets[-1] and (not self._late or offset > self._late[-1][0]):
+                self._late.append((offset, bucket))
+        number = bill['bill_number']
+        if number and (not self._numbers or number >= self._numbers[-1] + self.NUMBER_STRIDE):
+            self._numbers.append(number)
+            self._number_offsets.append(offset)
+        if bill['refund_of']:
+            refunds = self._refunds.setdefault(bill['refund_of'], [])
+            if (number, offset) not in refunds:
+                refunds.append((number, offset))
+                bisect.insort(self._refund_entries, (offset, bill['refund_of'], number))
+
+    def _ledger_size(self) -> int:
+        try:
+            return os.path.getsize(self.bills_file)
+        except OSError:
+            return 0
+
+    def _current_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.bills_file).st_ino
+        except OSError:
+            return None
+
+    def _load(self, size: Optional[int] = None):
+        """Read the index file once, then scan the ledger up to ``size`` that it does not cover yet."""
+        inode = self._current_inode()
+        if self._indexed_size is not None and inode == self._ledger_inode:
+            return
+        # First use, or bills.txt was rotated: start over from the index file
+        self._ledger_inode = inode
+        self._clear()
+        self._written_offset = -1
+        buckets, offsets = [], []
+        try:
+            with open(self.index_file, 'r') as f:
+                for line in f:
+                    data = line.strip().split(',')
+                    if len(data) == 2:
+                        buckets.append(int(data[0]))
+                        offsets.append(int(data[1]))
+                    elif len(data) == 3 and data[0] == '#':
+                        self._numbers.append(int(data[1]))
+                        self._number_offsets.append(int(data[2]))
+                    elif len(data) == 4 and data[0] == 'R':
+                        self._refunds.setdefault(int(data[1]), []).append((int(data[2]), int(data[3])))
+                        self._refund_entries.append((int(data[3]), int(data[1]), int(data[2])))
+                    elif len(data) == 3 and data[0] == 'L':
+                        self._late.append((int(data[2]), int(data[1])))
+                    else:
+                        continue
+                    self._written_offset = max(self._written_offset, int(data[-1]))
+        except (OSError, ValueError):
+            self._clear()
+            buckets, offsets = [], []
+            self._written_offset = -1
+        self._buckets, self._offsets = buckets, offsets
+        # Re-scan from the last entry, which covers at most one bucket of bills
+        self._indexed_size = offsets[-1] if offsets else 0
+        if buckets:
+            self._buckets.pop()
+            self._offsets.pop()
+        self._late = [entry for entry in self._late if entry[0] < self._indexed_size]
+        self._refund_entries.sort()
+        self._catch_up(self._ledger_size() if size is None else size)
+
+    def _catch_up(self, size: int):
+        """Index ledger bytes between the indexed size and ``size`` in memory."""
+        if self._indexed_size is None or size <= self._indexed_size:
+            return
+        offset = self._indexed_size
+        with open(self.bills_file, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if offset + len(raw) > size:
+                    break
+                self._index_line(raw.decode('utf-8', errors='replace'), offset)
+                offset += len(raw)
+        self._indexed_size = offset
+
+    def _read_window(self, begin: int, stop: int) -> List[Dict]:
+        bills = []
+        try:
+            with open(self.bills_file, 'rb') as f:
+                f.seek(begin)
+                data = f.read(max(0, stop - begin))
+        except OSError:
+            return bills
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            bill = parse_bill(line)
+            if bill:
+                bills.append(bill)
+        return bills
+
+    def _read_lines(self, offsets: List[int]) -> List[Tuple[int, Dict]]:
+        """Read the bills that start at given ledger offsets, as (offset, bill)."""
+        bills = []
+        if not offsets:
+            return bills
+        try:
+            with open(self.bills_file, 'rb') as f:
+                for offset in offsets:
+                    f.seek(offset)
+                    bill = parse_bill(f.readline().decode('utf-8', errors='replace'))
+                    if bill:
+                        bills.append((offset, bill))
+        except OSError:
+            pass
+        return bills
+
+    def _entries(self, after: int = -1) -> List[Tuple[int, str]]:
+        """Get the index file lines of entries past ledger offset ``after``, in ledger order."""
+        i = bisect.bisect_right(self._offsets, after)
+        entries = [(offset, f"{bucket},{offset}") for bucket, offset in zip(self._buckets[i:], self._offsets[i:])]
+        i = bisect.bisect_right(self._number_offsets, after)
+        entries += [(offset, f"#,{number},{offset}")
+                    for number, offset in zip(self._numbers[i:], self._number_offsets[i:])]
+        i = bisect.bisect_right(self._refund_entries, (after, float('inf')))
+        entries += [(offset, f"R,{original},{refund_bill},{offset}")
+                    for offset, original, refund_bill in self._refund_entries[i:]]
+        i = bisect.bisect_right(self._late, (after, float('inf')))
+        entries += [(offset, f"L,{bucket},{offset}") for offset, bucket in self._late[i:]]
+        entries.sort()
+        return entries
+
+    def _append_entries(self):
+        entries = self._entries(self._written_offset)
+        if not entries:
+            return
+        try:
+            with open(self.index_file, 'a') as f:
+                for _, line in entries:
+                    f.write(line + '\n')
+            self._written_offset = entries[-1][0]
+        except OSError:
+            pass
+
+    def _write_index(self):
+        temp_file = self.index_file + '.tmp'
+        try:
+            with open(temp_file, 'w') as f:
+                entries = self._entries()
+                for _, line in entries:
+                    f.write(line + '\n')
+            os.replace(temp_file, self.index_file)
+            self._written_offset = entries[-1][0] if entries else -1
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+from .catalog import Product
+from .promotions import CompiledPromotions, PromotionEngine
+
+
+class Cart:
+    """Shopping cart that keeps its totals up to date as lines change.
+
+    Each line stores the product details and price it was added with, and
+    the subtotal is adjusted by the difference on every add, update or
+    remove, so reading the subtotal never walks the basket. Amounts are kept
+    in whole cents to avoid float drift over many changes. Promotions are
+    priced in one pass over the lines and the result is reused until the
+    cart or the active promotions change.
+    """
+
+    def __init__(self, promotions: Optional[PromotionEngine] = None):
+        self.promotions = promotions
+        self._lines: Dict[str, Dict] = {}  # product_id: {'id', 'name', 'category', 'price', 'quantity'}
+        self._line_cents: Dict[str, int] = {}  # product_id: unit price in cents
+        self._subtotal_cents = 0
+        self._item_count = 0
+        self._changes = 0
+        # payment method: (changes, promotion tables, pricing) of the last evaluation
+        self._pricing: Dict[str, Tuple[int, CompiledPromotions, Dict]] = {}
+
+    def set_quantity(self, product: Product, quantity: int):
+        """Set the quantity of a product's line, adding the line at the product's current price if needed."""
+        product_id = product[0]
+        if quantity <= 0:
+            self.remove(product_id)
+            return
+        line = self._lines.get(product_id)
+        if line is None:
+            line = {'id': product_id, 'name': product[1], 'category': product[2],
+                    'price': product[3], 'quantity': 0}
+            self._lines[product_id] = line
+            self._line_cents[product_id] = round(product[3] * 100)
+        self._subtotal_cents += self._line_cents[product_id] * (quantity - line['quantity'])
+        self._item_count += quantity - line['quantity']
+        line['quantity'] = quantity
+        self._changes += 1
+
+    def remove(self, product_id: str) -> bool:
+        """Remove a product's line."""
+        line = self._lines.pop(product_id, None)
+        if line is None:
+            return False
+        self._subtotal_cents -= self._line_cents.pop(product_id) * line['quantity']
+        self._item_count -= line['quantity']
+        self._changes += 1
+        return True
+
+    def clear(self):
+        """Remove every line."""
+        self._lines.clear()
+        self._line_cents.clear()
+        self._subtotal_cents = 0
+        self._item_count = 0
+        self._changes += 1
+
+    def quantity(self, product_id: str) -> int:
+        """Get the quantity of a product in the cart (0 if it has no line)."""
+        line = self._lines.get(product_id)
+        return line['quantity'] if line else 0
+
+    def line(self, product_id: str) -> Optional[Dict]:
+        """Get a copy of a product's line."""
+        line = self._lines.get(product_id)
+        return dict(line) if line else None
+
+    def line_total(self, product_id: str) -> float:
+        """Get price times quantity of a product's line."""
+        return self._line_cents.get(product_id, 0) * self.quantity(product_id) / 100
+
+    def items(self) -> List[Dict]:
+        """Get copies of every line in the order they were added."""
+        return [dict(line) for line in self._lines.values()]
+
+    def quantities(self) -> Dict[str, int]:
+        """Get product_id: quantity for every line."""
+        return {product_id: line['quantity'] for product_id, line in self._lines.items()}
+
+    @property
+    def item_count(self) -> int:
+        """Total number of units in the cart."""
+        return self._item_count
+
+    @property
+    def subtotal(self) -> float:
+        """Sum of every line total, before discounts."""
+        return self._subtotal_cents / 100
+
+    def pricing(self, payment_method: str) -> Dict:
+        """Get the subtotal, applied promotions, discount and total for paying with ``payment_method``."""
+        if self.promotions is None:
+            return {'subtotal': self.subtotal, 'discounts': [], 'discount': 0.0, 'total': self.subtotal}
+        tables = self.promotions.compiled()
+        cached = self._pricing.get(payment_method)
+        if cached is not None and cached[0] == self._changes and cached[1] is tables:
+            return cached[2]
+        result = tables.evaluate(self._lines.values(), payment_method)
+        self._pricing[payment_method] = (self._changes, tables, result)
+        return result
+
+    def discount(self, payment_method: str) -> float:
+        """Get the discount for paying with ``payment_method``."""
+        return self.pricing(payment_method)['discount']
+
+    def total(self, payment_method: str) -> float:
+        """Get the amount to pay with ``payment_method``."""
+        return self.pricing(payment_method)['total']
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._lines
@@ -1,142 +1,104 @@
 import os
+import uuid
 from typing import List, Tuple, Dict, Optional
 from datetime import datetime
+from .reservations import ReservationTable
+from .commit_pipeline import CommitPipeline
+from .repository import DataRepository
+from .catalog import CatalogSnapshot
+from .cart import Cart
+from .promotions import PromotionEngine
+from .ledger import TIMESTAMP_FORMAT, format_bill
+from .stores import store_data_dir
+from .metrics import CHECKOUT_FAILURES, CHECKOUT_SECONDS, SALES
 
 class Cashier:
-    def __init__(self):
-        self.data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-        self.cart: Dict[str, int] = {}  # product_id: quantity
-        self.ensure_data_files_exist()
-        self.categories = ['Electronics', 'Groceries', 'Clothing', 'Home & Kitchen', 'Sports']
+    def __init__(self, data_dir: Optional[str] = None, username: Optional[str] = None,
+                 store: Optional[str] = None):
+        # An explicit data_dir wins; otherwise the store's folder under the data root
+        self.data_dir = data_dir or store_data_dir(store)
+        self.username = username  # recorded on bills and in the shift totals
+        self.promotions = PromotionEngine.for_data_dir(self.data_dir)
+        self.cart = Cart(self.promotions)  # keeps line prices and running totals
+        # Parsing, caching and writes are shared with every Admin and Cashier in this process
+        self.repository = DataRepository.for_data_dir(self.data_dir)
+        # Stock held by this cart is visible to every other till sharing data_dir
+        self.holder_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.reservations = ReservationTable.for_data_dir(self.data_dir)
+        self.commit_pipeline = CommitPipeline.for_data_dir(self.data_dir)
+        self.last_sale: Optional[Dict] = None  # details of the last committed sale, for receipts
+        # Catalog version the open cart is priced against, pinned when the cart is opened
+        self.cart_snapshot: Optional[CatalogSnapshot] = None
 
     def ensure_data_files_exist(self):
         """Create necessary data files if they don't exist."""
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-            
-        required_files = ['products.txt', 'bills.txt']
-        for filename in required_files:
-            filepath = os.path.join(self.data_dir, filename)
-            if not os.path.exists(filepath):
-                open(filepath, 'a').close()
+        self.repository.ensure_data_files_exist()
 
     def login(self, username: str, password: str) -> bool:
         """Verify cashier login credentials."""
-        cashiers_file = os.path.join(self.data_dir, 'cashiers.txt')
-        try:
-            with open(cashiers_file, 'r') as f:
-                for line in f:
-                    stored_username, stored_password = line.strip().split(',')
-                    if username == stored_username and password == stored_password:
-                        return True
-            return False
-        except:
-            return False
+        if self.repository.check_cashier(username, password):
+            self.username = username
+            return True
+        return False
 
     def get_product(self, product_id: str) -> Optional[Tuple[str, str, str, float, int]]:
         """Get product details by ID."""
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        try:
-            with open(products_file, 'r') as f:
-                for line in f:
-                    data = line.strip().split(',')
-                    if data[0] == product_id:
-                        return (data[0], data[1], data[2], float(data[3]), int(data[4]))
-            return None
-        except:
-            return None
+        return self.repository.get_product(product_id)
 
     def list_products(self, category: Optional[str] = None) -> List[Tuple[str, str, str, float, int]]:
         """Get a list of all products, optionally filtered by category."""
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        products = []
-        try:
-            with open(products_file, 'r') as f:
-                for line in f:
-                    data = line.strip().split(',')
-                    if category is None or data[2] == category:
-                        products.append((data[0], data[1], data[2], float(data[3]), int(data[4])))
-            return products
-        except:
-            return []
+        return self.repository.list_products(category)
 
     def get_categories(self) -> List[str]:
         """Get list of product categories."""
-        return self.categories.copy()
+        return self.repository.list_categories()
 
-    def process_sale(self, cart_items: List[Dict]) -> bool:
+    def get_available_stock(self, product: Tuple[str, str, str, float, int]) -> int:
+        """Get stock of a product that is not held by any cart."""
+        return product[4] - self.reservations.reserved(product[0])
+
+    def process_sale(self, cart_items: List[Dict], payment_method: str = 'cash') -> bool:
         """Process a sale transaction."""
         if not cart_items:
+            CHECKOUT_FAILURES.labels('empty_cart').inc()
             return False
             
-        # Update product quantities
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        temp_file = os.path.join(self.data_dir, 'products_temp.txt')
-        
-        try:
-            # Read current products
-            products = {}
-            with open(products_file, 'r') as f:
-                for line in f:
-                    data = line.strip().split(',')
-                    products[data[0]] = data
-            
-            # Update quantities
+        with CHECKOUT_SECONDS.time():
+            # Record each line's category for the per-category shift totals
+            items = []
             for item in cart_items:
-                product_id = item['id']
-                if product_id not in products:
-                    return False
-                    
-                new_quantity = int(products[product_id][4]) - item['quantity']
-                if new_quantity < 0:  # Insufficient stock
-                    return False
-                    
-                products[product_id][4] = str(new_quantity)
-            
-            # Write updated quantities
-            with open(temp_file, 'w') as f:
-                for data in products.values():
-                    f.write(','.join(data) + '\n')
-                    
-            os.replace(temp_file, products_file)
-            
-            # Save bill
-            total = sum(item['price'] * item['quantity'] for item in cart_items)
-            bills_file = os.path.join(self.data_dir, 'bills.txt')
-            with open(bills_file, 'a') as f:
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                f.write(f"{timestamp},${total:.2f}\n")
+                product = self._cart_product(item['id'])
+                items.append(dict(item, category=product[2] if product else ''))
                 
-            return True
-            
-        except Exception as e:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            return False
+            pricing = self.promotions.evaluate(items, payment_method)
+            return self._commit_sale(items, pricing['total'], payment_method, pricing['discounts']) is not None
 
     def add_to_cart(self, product_id: str, quantity: int) -> bool:
         """Add a product to the shopping cart."""
         if quantity <= 0:
             return False
             
+        # Stock comes from the latest catalog; the price from the cart's snapshot
         product = self.get_product(product_id)
         if not product:
             return False
             
-        if product[4] < quantity:  # Check available stock
-            return False
-            
-        if product_id in self.cart:
-            self.cart[product_id] += quantity
-        else:
-            self.cart[product_id] = quantity
+        new_quantity = self.cart.quantity(product_id) + quantity
+        # An active cart keeps all of its holds, refreshed in the same write
+        if not self.reservations.reserve(self.holder_id, product_id, new_quantity, product[4], touch_all=True):
+            return False  # Not enough stock left once other carts' holds are counted
             
+        if not self.cart:
+            self.cart_snapshot = self.repository.catalog()
+        self.cart.set_quantity(self._cart_product(product_id), new_quantity)
         return True
 
     def remove_from_cart(self, product_id: str) -> bool:
         """Remove a product from the shopping cart."""
-        if product_id in self.cart:
-            del self.cart[product_id]
+        if self.cart.remove(product_id):
+            self.reservations.release(self.holder_id, product_id, touch_all=True)
+            if not self.cart:
+                self.cart_snapshot = None
             return True
         return False
 
@@ -146,80 +108,92 @@ class Cashier:
             return self.remove_from_cart(product_id)
             
         product = self.get_product(product_id)
-        if not product or product[4] < quantity:
+        if not product or not self.reservations.reserve(self.holder_id, product_id, quantity, product[4],
+                                                        touch_all=True):
             return False
             
-        self.cart[product_id] = quantity
+        if not self.cart:
+            self.cart_snapshot = self.repository.catalog()
+        self.cart.set_quantity(self._cart_product(product_id), quantity)
         return True
 
     def get_cart_items(self) -> List[Tuple[str, str, str, float, int]]:
         """Get all items in the cart with their details."""
-        cart_items = []
-        for product_id, quantity in self.cart.items():
-            product = self.get_product(product_id)
-            if product:
-                cart_items.append((product[0], product[1], product[2], product[3], quantity))
-        return cart_items
+        return [(item['id'], item['name'], item['category'], item['price'], item['quantity'])
+                for item in self.cart.items()]
 
     def calculate_total(self, payment_method: str) -> float:
         """Calculate total price with discount if applicable."""
-        total = sum(product[3] * quantity for product_id, quantity in self.cart.items()
-                   if (product := self.get_product(product_id)))
-                   
-        if payment_method.lower() == 'card':
-            total *= 0.9  # 10% discount for card payments
-            
-        return round(total, 2)
+        # Priced by the cart with the active promotions, e.g. the card discount
+        return self.cart.total(payment_method)
 
     def process_payment(self, payment_method: str) -> bool:
         """Process payment and update inventory."""
         if not self.cart:
+            CHECKOUT_FAILURES.labels('empty_cart').inc()
             return False
             
-        total = self.calculate_total(payment_method)
-        
-        # Update product quantities
-        products_file = os.path.join(self.data_dir, 'products.txt')
-        temp_file = os.path.join(self.data_dir, 'products_temp.txt')
-        
-        try:
-            # Update product quantities
-            products = {}
-            with open(products_file, 'r') as f:
-                for line in f:
-                    data = line.strip().split(',')
-                    product_id = data[0]
-                    if product_id in self.cart:
-                        new_quantity = int(data[4]) - self.cart[product_id]
-                        if new_quantity < 0:  # Insufficient stock
-                            return False
-                        data[4] = str(new_quantity)
-                    products[product_id] = ','.join(data)
-                    
-            # Write updated quantities
-            with open(temp_file, 'w') as f:
-                for line in products.values():
-                    f.write(f"{line}\n")
-                    
-            os.replace(temp_file, products_file)
+        # Keep the cart's holds until the sale is written
+        self.reservations.touch(self.holder_id)
+        with CHECKOUT_SECONDS.time():
+            pricing = self.cart.pricing(payment_method)
+            items = self.cart.items()
+            bill_number = self._commit_sale(items, pricing['total'], payment_method, pricing['discounts'])
+        if bill_number is None:
+            return False
             
-            # Save bill
-            bills_file = os.path.join(self.data_dir, 'bills.txt')
-            with open(bills_file, 'r') as f:
-                bill_number = sum(1 for _ in f) + 1
-                
-            with open(bills_file, 'a') as f:
-                f.write(f"Bill {bill_number}: {total}\n")
-                
-            # Clear cart after successful payment
-            self.cart.clear()
-            return True
+        # Clear cart after successful payment
+        self.clear_cart()
+        return True
+
+    def _cart_product(self, product_id: str) -> Optional[Tuple[str, str, str, float, int]]:
+        """Get a product as priced when the cart was opened.
+
+        Products created after that fall back to the current catalog.
+        """
+        if self.cart_snapshot is not None:
+            product = self.cart_snapshot.get(product_id)
+            if product:
+                return product
+        return self.get_product(product_id)
+
+    def _commit_sale(self, items: List[Dict], total: float, payment_method: str,
+                     discounts: Optional[List[Dict]] = None) -> Optional[int]:
+        """Write a sale through the commit pipeline and return its bill number."""
+        # Stock decrements, the bill and the shift totals are written together
+        stock_deltas: Dict[str, int] = {}
+        for item in items:
+            stock_deltas[item['id']] = stock_deltas.get(item['id'], 0) + item['quantity']
+            
+        sale = {
+            'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'cashier': self.username or '',
+            'payment_method': payment_method.title(),
+            'total': round(total, 2),
+            'items': items,
+            'discounts': discounts or [],  # applied promotions, for the receipt
+        }
+        bill_number = self.commit_pipeline.commit_sale(stock_deltas,
+                                                       lambda number: format_bill(number, sale),
+                                                       sale)
+        if bill_number is None:
+            CHECKOUT_FAILURES.labels('rejected').inc()  # unknown product or not enough stock
+            return None
             
-        except:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            return False
+        SALES.labels(sale['payment_method']).inc()
+        self.last_sale = dict(sale, bill_number=bill_number)
+        
+        # Sold stock is gone from disk, so the cart no longer needs to hold it
+        for product_id in stock_deltas:
+            self.reservations.release(self.holder_id, product_id)
+        return bill_number
+
+    def get_commit_stats(self) -> Dict[str, float]:
+        """Get commit latency and batching statistics for this data directory."""
+        return self.commit_pipeline.stats()
 
     def clear_cart(self):
         """Clear all items from the cart."""
-        self.cart.clear() 
\ No newline at end of file
+        self.cart.clear()
+        self.cart_snapshot = None
+        self.reservations.release(self.holder_id) 
\ No newline at end of file
@@ -0,0 +1,51 @@
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+Product = Tuple[str, str, str, float, int]  # (id, name, category, price, quantity)
+
+
+class CatalogSnapshot:
+    """Immutable, versioned view of the product catalog.
+
+    Writers never modify a published snapshot; they build a new one and swap
+    the repository's reference to it. Readers that hold a snapshot can keep
+    using it, without locking, for as long as they like.
+    """
+
+    __slots__ = ('version', 'stamp', 'products', '_postings')
+
+    def __init__(self, version: int, products: Dict[str, Product], stamp: Optional[Tuple] = None):
+        postings: Dict[str, List[str]] = {}
+        for product in products.values():
+            postings.setdefault(product[2], []).append(product[0])
+
+        self.version = version
+        self.stamp = stamp  # stamp of the catalog files this snapshot was read from
+        self.products: Mapping[str, Product] = MappingProxyType(products)
+        self._postings: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {category: tuple(ids) for category, ids in postings.items()})
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Get a product by ID."""
+        return self.products.get(product_id)
+
+    def list(self, category: Optional[str] = None) -> List[Product]:
+        """Get all products in file order, or only those of one category."""
+        if category is None:
+            return list(self.products.values())
+        return [self.products[product_id] for product_id in self._postings.get(category, ())]
+
+    def product_ids(self, category: str) -> Tuple[str, ...]:
+        """Get the IDs of every product in a category."""
+        return self._postings.get(category, ())
+
+    def categories(self) -> Iterable[str]:
+        """Get the categories that have at least one product."""
+        return self._postings.keys()
+
+    def category_sizes(self) -> Dict[str, int]:
+        """Get the number of products in each category that has any."""
+        return {category: len(ids) for category, ids in self._postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.products)
@@ -0,0 +1,55 @@
+import threading
+from typing import List, Optional
+from .catalog import CatalogSnapshot, Product
+from .product_query import ProductIndex, ProductQuery
+from .product_store import product_files_for
+from .settings import Settings
+from .shared_catalog import SharedCatalogReader
+
+
+class CatalogReader:
+    """Read-only view of a data directory's product catalog.
+
+    It holds only what reading needs: the catalog files, the current
+    CatalogSnapshot and a ProductIndex over it. Unlike DataRepository it
+    creates, locks and writes nothing, and sets up no journal, ledger,
+    bill index or catalog publisher. A snapshot is re-read when the catalog
+    files' stamp changes. With ``shared_catalog=yes``, a catalog another
+    process published for exactly those files is mapped instead of parsed.
+    """
+
+    def __init__(self, data_dir: str, settings: Optional[Settings] = None):
+        settings = settings or Settings(data_dir)
+        self.data_dir = data_dir
+        self.product_files = product_files_for(data_dir, settings)
+        self.shared_catalog = SharedCatalogReader(data_dir) if settings.get_bool('shared_catalog') else None
+        self.product_index = ProductIndex()
+        self._snapshot = CatalogSnapshot(0, {})
+        self._guard = threading.Lock()  # only held while re-reading the catalog
+
+    def catalog(self) -> CatalogSnapshot:
+        """Get the current catalog snapshot, re-reading it if the files changed."""
+        snapshot = self._snapshot
+        if self.product_files.stamp() == snapshot.stamp:
+            return snapshot
+        with self._guard:
+            stamp = self.product_files.stamp()
+            if stamp != self._snapshot.stamp:
+                version = self._snapshot.version + 1
+                shared = self.shared_catalog.snapshot(stamp, version) if self.shared_catalog else None
+                if shared is not None:
+                    self._snapshot = shared
+                else:
+                    try:
+                        self._snapshot = CatalogSnapshot(version, self.product_files.load(), stamp)
+                    except (OSError, ValueError):
+                        pass  # keep showing the last catalog that could be read
+            return self._snapshot
+
+    def get_product(self, product_id: str) -> Optional[Product]:
+        """Get product details by ID."""
+        return self.catalog().get(product_id)
+
+    def query_products(self, query: ProductQuery, limit: Optional[int] = None) -> List[Product]:
+        """Get the products matching a query, by product ID, through the price, stock and name indexes."""
+        return self.product_index.query(self.catalog(), query, limit)
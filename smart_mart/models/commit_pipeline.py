@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from .repository import DataRepository
+from .shift_totals import ShiftTotals
+from .settings import Settings
+from .metrics import COMMIT_GROUP_SIZE, COMMIT_SECONDS
+
+DURABILITY_MODES = ('none', 'sale', 'group')
+
+
+class _PendingSale:
+    """A sale waiting for the group writer."""
+
+    def __init__(self, stock_deltas: Dict[str, int], bill: Callable[[int], str], sale: Optional[Dict],
+                 held: Optional[Callable[[str], int]] = None):
+        self.stock_deltas = stock_deltas
+        self.bill = bill
+        self.sale = sale
+        self.held = held  # units of a product the sale must leave in stock
+        self.bill_number: Optional[int] = None
+        self.error: Optional[str] = None  # why the sale was rejected
+        self.submitted_at = time.perf_counter()
+        self.done = threading.Event()
+
+
+class CommitPipeline:
+    """Writes sales (stock decrements plus a bill line) to the data directory.
+
+    Durability modes, chosen with ``durability`` in settings.txt:
+
+    * ``none``  - write each sale without fsync; fastest, may lose recent sales on power loss
+    * ``sale``  - write and fsync each sale on its own
+    * ``group`` - a writer thread batches sales arriving within ``group_commit_ms``
+      into one products.txt rewrite and one bills.txt append, so a group
+      costs one fsync per file it touches (catalog, ledger, shift totals,
+      journal if enabled, and the directory) however many sales it holds
+
+    The bills.txt append is the commit point. If it fails, the catalog is
+    put back and every sale of the group fails with nothing left on disk;
+    once it succeeded the sales stand, even if saving the totals after it
+    fails.
+    """
+
+    LATENCY_SAMPLES = 1000
+
+    _pipelines: Dict[str, 'CommitPipeline'] = {}
+    _pipelines_guard = threading.Lock()
+
+    def __init__(self, data_dir: str, durability: str = 'group', group_commit_ms: float = 5):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.data_dir = data_dir
+        self.durability = durability
+        self.group_window = group_commit_ms / 1000.0
+        self.repository = DataRepository.for_data_dir(data_dir)
+        self.lock = self.repository.products_lock
+        self.shift_totals = ShiftTotals.for_data_dir(data_dir)
+
+        self._queue: List[_PendingSale] = []
+        self._queue_ready = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+
+        self._stats_guard = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+        self._commits = 0
+        self._groups = 0
+        self._failures = 0
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'CommitPipeline':
+        """Get the process-wide pipeline for a data directory, configured from its settings."""
+        key = os.path.abspath(data_dir)
+        with cls._pipelines_guard:
+            if key not in cls._pipelines:
+                settings = Settings(key)
+                durability = settings.get('durability', 'group')
+                if durability not in DURABILITY_MODES:
+                    durability = 'group'
+                cls._pipelines[key] = cls(key, durability, settings.get_float('group_commit_ms', 5))
+            return cls._pipelines[key]
+
+    def commit_sale(self, stock_deltas: Dict[str, int], bill: Callable[[int], str],
+                    sale: Optional[Dict] = None) -> Optional[int]:
+        """Commit a sale and return its bill number, or None if it was rejected.
+
+        ``stock_deltas`` maps product IDs to the quantity sold. ``bill`` is
+        called with the assigned bill number and returns the bills.txt line.
+        ``sale`` (total, payment_method, cashier, items) is added to the shift
+        totals. A sale is rejected if a product is unknown or would go below zero.
+        """
+        pending = _PendingSale(stock_deltas, bill, sale)
+        if self.durability == 'group':
+            self._ensure_writer()
+            with self._queue_ready:
+                self._queue.append(pending)
+                self._queue_ready.notify()
+            pending.done.wait()
+        else:
+            self._commit_group([pending])
+        return pending.bill_number
+
+    def commit_sales(self, sales: List[Tuple[Dict[str, int], Callable[[int], str], Optional[Dict]]],
+                     held: Optional[Callable[[str], int]] = None) -> List[Tuple[Optional[int], Optional[str]]]:
+        """Commit many sales as one group: one catalog write and one ledger append.
+
+        ``sales`` are (stock_deltas, bill, sale) as for ``commit_sale``. They
+        are applied in order and each is accepted or rejected on its own;
+        returns (bill number, None) or (None, reason) for each. ``held``
+        gives the units of a product that must stay in stock, e.g. what
+        till carts hold; it is asked under the products lock, so holds
+        taken since the caller's own check still count.
+        """
+        batch = [_PendingSale(stock_deltas, bill, sale, held) for stock_deltas, bill, sale in sales]
+        if batch:
+            self._commit_group(batch)
+        return [(pending.bill_number, pending.error) for pending in batch]
+
+    def stats(self) -> Dict[str, float]:
+        """Get commit counts and latency percentiles (milliseconds) of recent sales."""
+        with self._stats_guard:
+            samples = sorted(self._latencies)
+            commits, groups, failures = self._commits, self._groups, self._failures
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        return {
+            'durability': self.durability,
+            'commits': commits,
+            'failures': failures,
+            'groups': groups,
+            'avg_group_size': (commits + failures) / groups if groups else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': samples[-1] * 1000 if samples else 0.0,
+        }
+
+    def _ensure_writer(self):
+        with self._queue_ready:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop,
+                                                name='commit-pipeline',
+                                                daemon=True)
+                self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            with self._queue_ready:
+                while not self._queue:
+                    self._queue_ready.wait()
+            # Give concurrent tills a moment to join this group
+            time.sleep(self.group_window)
+            with self._queue_ready:
+                batch, self._queue = self._queue, []
+            self._commit_group(batch)
+
+    def _commit_group(self, batch: List[_PendingSale]):
+        """Apply a batch of sales with one rewrite and one append, fsynced unless durability is none."""
+        durable = self.durability != 'none'
+        try:
+            with self.lock:
+                # Cached catalog; only re-parsed if another process changed it
+                before = self.repository.catalog()
+                products = dict(before.products.items())
+                self.repository.rotate_bills_if_due()
+                next_bill = self.repository.bill_count() + 1
+
+                # Apply each sale on its own so one bad cart doesn't sink the group
+                bill_lines = []
+                committed_sales = []
+                changed = set()
+                for pending in batch:
+                    new_quantities = {}
+                    for product_id, quantity in pending.stock_deltas.items():
+                        if product_id not in products:
+                            pending.error = f"unknown product '{product_id}'"
+                            break
+                        new_quantity = products[product_id][4] - quantity
+                        held = pending.held(product_id) if pending.held else 0
+                        if new_quantity < held:  # Insufficient stock
+                            if held:
+                                available = max(0, products[product_id][4] - held)
+                                pending.error = f"not enough stock of '{product_id}' ({available} available)"
+                            else:
+                                pending.error = f"not enough stock of '{product_id}' ({products[product_id][4]} left)"
+                            break
+                        new_quantities[product_id] = new_quantity
+                    else:
+                        for product_id, new_quantity in new_quantities.items():
+                            products[product_id] = products[product_id][:4] + (new_quantity,)
+                        changed.update(new_quantities)
+                        pending.bill_number = next_bill
+                        bill_lines.append(pending.bill(next_bill))
+                        if pending.sale is not None:
+                            committed_sales.append(dict(pending.sale, bill_number=next_bill))
+                        next_bill += 1
+
+                if bill_lines:
+                    self._write_group(products, dict(before.products.items()), changed, bill_lines,
+                                      committed_sales, durable)
+        except Exception as e:
+            for pending in batch:
+                pending.bill_number = None
+                pending.error = f"write failed: {e}"
+        finally:
+            self._record(batch)
+            for pending in batch:
+                pending.done.set()
+
+    def _write_group(self, products: Dict, before: Dict, changed: Set[str], bill_lines: List[str],
+                     sales: List[Dict], durable: bool):
+        """Write a group's stock, bills and totals, with the bills append as the commit point."""
+        committed = False
+        try:
+            # Stock, bills and totals of the group form one journal entry
+            with self.repository.journal.group(durable):
+                self.repository.write_products(products, durable, changed)
+                try:
+                    self.repository.append_bills(bill_lines, durable)
+                except Exception:
+                    # No bill reached the ledger, so no stock may leave the catalog either
+                    self.repository.write_products(before, durable, changed)
+                    raise
+                committed = True
+                # Kept in memory even if the save fails, and saved with the next group
+                self.shift_totals.record_sales(sales, durable)
+            if durable:
+                self._fsync_dir()
+        except Exception:
+            if not committed:
+                raise
+
+    def _fsync_dir(self):
+        """Persist the rename of products.txt (not supported on Windows)."""
+        try:
+            fd = os.open(self.data_dir, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _record(self, batch: List[_PendingSale]):
+        now = time.perf_counter()
+        COMMIT_GROUP_SIZE.observe(len(batch))
+        with self._stats_guard:
+            self._groups += 1
+            for pending in batch:
+                if pending.bill_number is None:
+                    self._failures += 1
+                else:
+                    self._commits += 1
+                    self._latencies.append(now - pending.submitted_at)
+                    COMMIT_SECONDS.observe(now - pending.submitted_at)
@@ -0,0 +1,88 @@
+import os
+import threading
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive lock shared by threads and processes using the same lock file.
+
+    The lock is re-entrant for the thread holding it, so model methods that
+    already hold it can call each other freely.
+    """
+
+    _instances: Dict[str, 'FileLock'] = {}
+    _instances_guard = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    @classmethod
+    def for_path(cls, path: str) -> 'FileLock':
+        """Get the process-wide lock object for a lock file."""
+        path = os.path.abspath(path)
+        with cls._instances_guard:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def acquire(self):
+        """Block until the lock is held by the calling thread."""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+                self._lock_fd(self._fd)
+            except:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        """Release one level of the lock."""
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock_fd(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+    def _lock_fd(self, fd: int):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return
+        # msvcrt.locking gives up after ten one-second retries, keep waiting
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_fd(self, fd: int):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
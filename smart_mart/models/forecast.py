@@ -0,0 +1,156 @@
+import csv
+import math
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from .repository import DataRepository
+from .settings import Settings
+
+try:
+    import numpy as np
+except ImportError:  # forecasting needs NumPy; the rest of the app does not
+    np = None
+
+
+class ReplenishmentForecast:
+    """Suggested reorder quantities from the sales velocity in the bill ledger.
+
+    The ledger line items of the last ``forecast_history_days`` are turned
+    into three flat arrays (product, day, quantity) and every statistic is
+    computed for all products at once with ``np.bincount``, so memory grows
+    with the number of line items rather than products x days:
+
+    * velocity: mean units per day over the last ``forecast_velocity_days``
+      (a whole number of weeks, so weekdays are weighted evenly)
+    * seasonality: a day-of-week profile per product, shrunk toward the
+      store-wide profile for slow sellers whose own profile is mostly noise
+    * days of cover: current stock divided by velocity
+    * demand over the next ``forecast_lead_days`` + ``forecast_review_days``
+      (velocity x weekday factors), plus safety stock of
+      ``forecast_service_z`` standard deviations of daily demand
+
+    The suggested order is whatever brings stock up to that target.
+    """
+
+    def __init__(self, repository: DataRepository, settings: Optional[Settings] = None):
+        if np is None:
+            raise RuntimeError("replenishment forecasting needs NumPy (pip install numpy)")
+        settings = settings or Settings(repository.data_dir)
+        self.repository = repository
+        self.history_days = max(7, settings.get_int('forecast_history_days', 365))
+        self.velocity_days = max(7, settings.get_int('forecast_velocity_days', 28))
+        self.lead_days = max(0, settings.get_int('forecast_lead_days', 7))
+        self.review_days = max(1, settings.get_int('forecast_review_days', 7))
+        self.service_z = settings.get_float('forecast_service_z', 1.65)
+
+    def report(self, today: Optional[date] = None) -> List[Dict]:
+        """Forecast every product in the catalog from the ledger, most urgent first."""
+        today = today or date.today()
+        start = today - timedelta(days=self.history_days)
+        products = self.repository.list_products()
+        index = {product[0]: i for i, product in enumerate(products)}
+
+        # Stream the ledger line items of the history window into flat typed arrays,
+        # so no more than one bill is held as a dict at a time
+        product_ids, days, quantities = array('q'), array('q'), array('d')
+        day_numbers: Dict[str, int] = {}
+        start_time = datetime.combine(start, datetime.min.time())
+        end_time = datetime.combine(today, datetime.min.time())
+        for bill in self.repository.iter_bills_between(start_time, end_time):
+            date_text = bill['timestamp'][:10]
+            day = day_numbers.get(date_text)
+            if day is None:
+                day = day_numbers[date_text] = (date.fromisoformat(date_text) - start).days
+            for item in bill['items']:
+                i = index.get(item['id'])
+                if i is not None:  # products deleted since are not reordered
+                    product_ids.append(i)
+                    days.append(day)
+                    quantities.append(item['quantity'])
+
+        stock = np.fromiter((product[4] for product in products), dtype=np.float64, count=len(products))
+        result = self.forecast(np.frombuffer(product_ids, dtype=np.int64), np.frombuffer(days, dtype=np.int64),
+                               np.frombuffer(quantities, dtype=np.float64), stock, start, today)
+
+        rows = []
+        for i in np.argsort(result['days_of_cover'], kind='stable').tolist():
+            product = products[i]
+            cover = result['days_of_cover'][i]
+            rows.append({
+                'id': product[0],
+                'name': product[1],
+                'category': product[2],
+                'stock': product[4],
+                'velocity': round(float(result['velocity'][i]), 3),
+                'peak_weekday': int(result['peak_weekday'][i]),
+                'days_of_cover': None if math.isinf(cover) else round(float(cover), 1),
+                'forecast_demand': round(float(result['demand'][i]), 1),
+                'safety_stock': round(float(result['safety_stock'][i]), 1),
+                'reorder_quantity': int(result['reorder'][i]),
+            })
+        return rows
+
+    def forecast(self, product_ids, days, quantities, stock, start: date, today: date) -> Dict:
+        """Compute the forecast arrays from flat line item arrays.
+
+        ``product_ids`` index into ``stock``, ``days`` count from ``start``;
+        all returned arrays are indexed like ``stock``.
+        """
+        n = len(stock)
+        history = (today - start).days
+        recent = days >= history - self.velocity_days
+        velocity = np.bincount(product_ids[recent], weights=quantities[recent], minlength=n) / self.velocity_days
+
+        # Day-of-week profiles: units sold per (product, weekday), as shares of each product's units
+        weekdays = (days + start.weekday()) % 7
+        by_weekday = np.bincount(product_ids * 7 + weekdays, weights=quantities, minlength=n * 7).reshape(n, 7)
+        totals = by_weekday.sum(axis=1)
+        store_profile = by_weekday.sum(axis=0)
+        store_profile = store_profile / store_profile.sum() if store_profile.sum() else np.full(7, 1 / 7)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            own_profile = np.where(totals[:, None] > 0, by_weekday / totals[:, None], store_profile)
+        weight = (totals / (totals + 4 * 7))[:, None]  # about four weeks of daily sales to trust a product's own profile
+        factors = 7 * (weight * own_profile + (1 - weight) * store_profile)
+
+        # Demand over the lead time and review period: velocity times each coming day's weekday factor
+        horizon = self.lead_days + self.review_days
+        coming = np.bincount((np.arange(1, horizon + 1) + today.weekday()) % 7, minlength=7)
+        demand = velocity * (factors @ coming)
+
+        # Variance of daily demand, counting days without sales as zero; only
+        # (product, day) pairs with sales are materialized, never products x days
+        cells, cell_of_item = np.unique(product_ids * history + days, return_inverse=True)
+        daily = np.bincount(cell_of_item, weights=quantities, minlength=len(cells))
+        squares = np.bincount(cells // history, weights=daily ** 2, minlength=n)
+        observed = history - int(days.min()) if len(days) else history  # a newer store has a shorter ledger
+        mean = np.bincount(product_ids, weights=quantities, minlength=n) / observed
+        deviation = np.sqrt(np.maximum(squares / observed - mean ** 2, 0))
+        safety_stock = self.service_z * deviation * math.sqrt(horizon)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            days_of_cover = np.where(velocity > 0, stock / velocity, np.inf)
+        reorder = np.maximum(np.ceil(demand + safety_stock - stock), 0).astype(np.int64)
+        return {
+            'velocity': velocity,
+            'peak_weekday': factors.argmax(axis=1),
+            'days_of_cover': days_of_cover,
+            'demand': demand,
+            'safety_stock': safety_stock,
+            'reorder': reorder,
+        }
+
+
+def export_report(rows: List[Dict], path: str, only_reorders: bool = True):
+    """Write forecast rows to a CSV file; by default only products that need ordering."""
+    weekdays = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['product_id', 'name', 'category', 'stock', 'units_per_day', 'peak_day',
+                         'days_of_cover', 'forecast_demand', 'safety_stock', 'reorder_quantity'])
+        for row in rows:
+            if only_reorders and not row['reorder_quantity']:
+                continue
+            writer.writerow([row['id'], row['name'], row['category'], row['stock'], row['velocity'],
+                             weekdays[row['peak_weekday']],
+                             '' if row['days_of_cover'] is None else row['days_of_cover'],
+                             row['forecast_demand'], row['safety_stock'], row['reorder_quantity']])
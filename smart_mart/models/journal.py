@@ -0,0 +1,140 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from .file_lock import FileLock
+from .settings import Settings
+
+Position = Tuple[int, int]  # (segment number, byte offset)
+
+
+class Journal:
+    """Append-only log of every change written to a data directory.
+
+    Each line of ``journal/NNNNNN.log`` is one JSON entry holding the
+    operations of one write: product records set or deleted, bill lines
+    appended, the sales added to the shift totals, and whole small files
+    replaced (categories, accounts, Z-reports). Writes that belong
+    together, like the stock, bill and totals of a commit group, are
+    recorded as a single entry inside ``group()``.
+
+    Every operation is idempotent when replayed over a newer copy of the
+    data (records are absolute, and bills and totals carry bill numbers),
+    which lets the hot backup take a base copy without stopping checkout
+    and ship only the journal after it. Segments roll over at
+    ``journal_segment_mb`` and are deleted by the backup once shipped, so
+    journaling is off unless ``journal=yes``.
+    """
+
+    _journals: Dict[str, 'Journal'] = {}
+    _journals_guard = threading.Lock()
+
+    def __init__(self, data_dir: str, settings: Optional[Settings] = None):
+        settings = settings or Settings(data_dir)
+        self.data_dir = data_dir
+        self.directory = os.path.join(data_dir, 'journal')
+        self.enabled = settings.get_bool('journal', False)
+        self.segment_bytes = int(settings.get_float('journal_segment_mb', 16) * 1024 * 1024)
+        # Appends from every process are serialized, so entries keep commit order
+        self.lock = FileLock.for_path(os.path.join(data_dir, 'journal.lock'))
+        self._local = threading.local()
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'Journal':
+        """Get the process-wide journal of a data directory."""
+        key = os.path.abspath(data_dir)
+        with cls._journals_guard:
+            if key not in cls._journals:
+                cls._journals[key] = cls(key)
+            return cls._journals[key]
+
+    @contextmanager
+    def group(self, durable: bool = False):
+        """Record every operation made by this thread inside the block as one entry."""
+        if getattr(self._local, 'ops', None) is not None:
+            yield  # already grouped by an outer block
+            return
+        self._local.ops = []
+        try:
+            yield
+        finally:
+            # Whatever was written before a failure is still on disk, so journal it too
+            ops, self._local.ops = self._local.ops, None
+            if ops:
+                self._append(ops, durable)
+
+    def record(self, op: Dict, durable: bool = False):
+        """Record one operation, or add it to the open group of this thread."""
+        if not self.enabled:
+            return
+        ops = getattr(self._local, 'ops', None)
+        if ops is not None:
+            ops.append(op)
+        else:
+            self._append([op], durable)
+
+    def record_file(self, path: str, durable: bool = False):
+        """Record the new content of a small file inside the data directory."""
+        if not self.enabled:
+            return
+        with open(path, 'r') as f:
+            content = f.read()
+        self.record({'op': 'file', 'name': os.path.relpath(path, self.data_dir), 'content': content}, durable)
+
+    def position(self) -> Position:
+        """Get the position just after the last entry (caller holds ``lock`` for a stable answer)."""
+        segments = self.segments()
+        if not segments:
+            return (1, 0)
+        return (segments[-1], os.path.getsize(self.segment_file(segments[-1])))
+
+    def segments(self) -> List[int]:
+        """Get the numbers of the segment files, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(int(name[:-4]) for name in names if name.endswith('.log') and name[:-4].isdigit())
+
+    def read(self, start: Position) -> Iterator[Tuple[Position, bytes]]:
+        """Yield (position after, raw line) for every complete entry from ``start``."""
+        for segment in self.segments():
+            if segment < start[0]:
+                continue
+            offset = start[1] if segment == start[0] else 0
+            with open(self.segment_file(segment), 'rb') as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        break  # being written right now
+                    offset += len(raw)
+                    yield (segment, offset), raw
+
+    def prune(self, before: int) -> int:
+        """Delete segments numbered below ``before``; returns how many were removed."""
+        removed = 0
+        with self.lock:
+            segments = self.segments()
+            for segment in segments[:-1]:  # never the segment being written
+                if segment < before:
+                    os.remove(self.segment_file(segment))
+                    removed += 1
+        return removed
+
+    def _append(self, ops: List[Dict], durable: bool):
+        line = (json.dumps({'ops': ops}, separators=(',', ':')) + '\n').encode('utf-8')
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            segment, size = self.position()
+            if size and size + len(line) > self.segment_bytes:
+                segment += 1
+            with open(self.segment_file(segment), 'ab') as f:
+                f.write(line)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def segment_file(self, segment: int) -> str:
+        """Get the path of a segment file."""
+        return os.path.join(self.directory, f"{segment:06d}.log")
@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+ID_RESERVED = ',:;'  # separate a bill line's fields and items, so never part of a product ID
+
+
+def valid_product_id(product_id: str) -> bool:
+    """Check that a product ID can be written to and read back from a bill line."""
+    return bool(product_id) and not any(char in product_id for char in ID_RESERVED)
+
+
+def format_bill(bill_number: int, sale: Dict) -> str:
+    """Format a committed sale as one bills.txt line.
+
+    ``bill_number,timestamp,cashier,payment_method,total,items`` where items
+    is ``id:quantity:price`` joined with ``;``. A refund or void has negative
+    quantities and total, and a seventh field with the bill it reverses.
+    """
+    items = ';'.join(f"{item['id']}:{item['quantity']}:{item['price']}" for item in sale['items'])
+    line = (f"{bill_number},{sale['timestamp']},{sale.get('cashier', '')},"
+            f"{sale.get('payment_method', '')},{sale['total']:.2f},{items}")
+    if sale.get('refund_of'):
+        line += f",{sale['refund_of']}"
+    return line
+
+
+def parse_bill(line: str, line_number: int = 0) -> Optional[Dict]:
+    """Parse a bills.txt line, including the older ``Bill N: total`` and ``timestamp,$total`` forms.
+
+    Returns None for blank or unreadable lines. Older lines have no items,
+    and their bill number falls back to ``line_number``.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        if line.startswith('Bill '):
+            number, total = line[5:].split(':', 1)
+            return _bill(int(number), None, '', '', float(total), [])
+
+        data = line.split(',')
+        if len(data) == 2:
+            return _bill(line_number, data[0], '', '', float(data[1].lstrip('$')), [])
+
+        if len(data) not in (6, 7):
+            return None
+        items: List[Dict] = []
+        for entry in filter(None, data[5].split(';')):
+            product_id, quantity, price = entry.split(':')
+            items.append({'id': product_id, 'quantity': int(quantity), 'price': float(price)})
+        refund_of = int(data[6]) if len(data) == 7 else None
+        return _bill(int(data[0]), data[1], data[2], data[3], float(data[4]), items, refund_of)
+    except ValueError:
+        return None
+
+
+def _bill(bill_number: int, timestamp: Optional[str], cashier: str, payment_method: str,
+          total: float, items: List[Dict], refund_of: Optional[int] = None) -> Dict:
+    return {
+        'bill_number': bill_number,
+        'timestamp': timestamp,
+        'cashier': cashier,
+        'payment_method': payment_method,
+        'total': total,
+        'items': items,
+        'refund_of': refund_of,  # bill number a refund or void reverses
+    }
@@ -0,0 +1,275 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, from a fast cache hit to a stalled disk
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]  # (name suffix, labels, value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(ABC):
+    """A metric family; with label names, ``labels()`` gets one child per label set."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str = '', labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._labels: Tuple[Tuple[str, str], ...] = ()
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], '_Metric'] = {}
+
+    def labels(self, *values: str) -> '_Metric':
+        """Get the child for one set of label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._child()
+                    child._labels = tuple(zip(self.labelnames, (str(v) for v in values)))
+                    self._children[values] = child
+        return child
+
+    def samples(self) -> Iterator[Sample]:
+        """Yield every sample of the family."""
+        if self.labelnames:
+            for child in list(self._children.values()):
+                yield from child._samples()
+        else:
+            yield from self._samples()
+
+    @abstractmethod
+    def _child(self) -> '_Metric':
+        """Make an unlabelled metric of the same kind, for one label set."""
+
+    @abstractmethod
+    def _samples(self) -> Iterator[Sample]:
+        """Yield this metric's own samples."""
+
+
+class Counter(_Metric):
+    """A count that only goes up."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str = '', labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        """Add to the count."""
+        with self._lock:
+            self.value += amount
+
+    def _child(self) -> 'Counter':
+        return Counter(self.name)
+
+    def _samples(self) -> Iterator[Sample]:
+        yield '_total', self._labels, self.value
+
+
+class _Timer:
+    """Observes the time spent inside a ``with`` block."""
+
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: 'Histogram'):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    """Counts of observations in fixed buckets, plus their sum.
+
+    Observing is one bisect and one counter increment; the cumulative
+    bucket counts Prometheus expects are only computed when rendering.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str = '', labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Record one observation (seconds, for latency histograms)."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        """Time a ``with`` block into this histogram."""
+        return _Timer(self)
+
+    def _child(self) -> 'Histogram':
+        return Histogram(self.name, buckets=self.buckets)
+
+    def _samples(self) -> Iterator[Sample]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            yield '_bucket', self._labels + (('le', _format_value(bound)),), cumulative
+        yield '_sum', self._labels, total
+        yield '_count', self._labels, cumulative
+
+
+def timed(histogram: Histogram) -> Callable:
+    """Decorate a function to observe the time of every call in ``histogram``."""
+    def decorate(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, rendered in Prometheus text format.
+
+    Each till process keeps its own registry; ``serve`` exposes it on a
+    localhost port for a scraper and ``dump`` writes it to a file, e.g.
+    for a node exporter's textfile collector.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._guard = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def counter(self, name: str, help: str = '', labelnames: Sequence[str] = ()) -> Counter:
+        """Get or create a counter (exposed as ``<name>_total``)."""
+        return self._register(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str = '', labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Get every metric in Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._guard:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            exposed = metric.name + '_total' if metric.kind == 'counter' else metric.name
+            lines.append(f"# HELP {exposed} {metric.help}")
+            lines.append(f"# TYPE {exposed} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str):
+        """Atomically write the metrics to a file."""
+        temp_file = path + '.tmp'
+        try:
+            with open(temp_file, 'w') as f:
+                f.write(self.render())
+            os.replace(temp_file, path)
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve ``/metrics`` over HTTP from a daemon thread; returns the running server."""
+        if self._server is not None:
+            return self._server
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would flood the console
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        return self._server
+
+    def stop(self):
+        """Stop the HTTP server if it is running."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _register(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._guard:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric {name} is already registered as a {metric.kind}")
+            return metric
+
+
+REGISTRY = MetricsRegistry()
+
+# Metrics recorded by the models and views
+SALES = REGISTRY.counter('smart_mart_sales', "Sales committed by this till", ('payment_method',))
+REFUNDS = REGISTRY.counter('smart_mart_refunds', "Bills voided or partly refunded by this till", ('kind',))
+CHECKOUT_FAILURES = REGISTRY.counter('smart_mart_checkout_failures',
+                                     "Checkouts that did not commit a sale", ('reason',))
+CHECKOUT_SECONDS = REGISTRY.histogram('smart_mart_checkout_seconds',
+                                      "Time from starting a checkout to its result")
+COMMIT_SECONDS = REGISTRY.histogram('smart_mart_commit_seconds',
+                                    "Time a sale waited in the commit pipeline, including the write")
+COMMIT_GROUP_SIZE = REGISTRY.histogram('smart_mart_commit_group_size', "Sales written per commit group",
+                                       buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+FILE_IO_SECONDS = REGISTRY.histogram('smart_mart_file_io_seconds',
+                                     "Time spent reading and writing data files", ('operation',))
+UI_REFRESH_SECONDS = REGISTRY.histogram('smart_mart_ui_refresh_seconds',
+                                        "Time spent redrawing a view", ('view',))
@@ -0,0 +1,155 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from .commit_pipeline import CommitPipeline
+from .ledger import TIMESTAMP_FORMAT, format_bill
+from .metrics import SALES
+from .repository import DataRepository
+from .reservations import ReservationTable
+
+
+def parse_orders(lines: Iterable[str]) -> Tuple[Dict[str, List[Tuple[int, str, int]]], List[Tuple[int, str]]]:
+    """Read ``order_id,product_id,quantity`` lines, one line per order line.
+
+    Returns the orders in file order, as {order_id: [(line, product_id,
+    quantity)]}, and the (line, message) errors. Lines of one order do not
+    have to be adjacent, and a header line is skipped. An invalid line
+    that names its order is kept in that order with quantity 0, so the
+    order can be rejected as a whole.
+    """
+    orders: Dict[str, List[Tuple[int, str, int]]] = {}
+    errors: List[Tuple[int, str]] = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        data = [field.strip() for field in line.split(',')]
+        if line_number == 1 and data[0].lower() in ('order', 'order_id'):
+            continue
+        message = None
+        quantity = 0
+        if len(data) != 3 or not data[0] or not data[1]:
+            message = "expected order_id,product_id,quantity"
+        else:
+            try:
+                quantity = int(data[2])
+                if quantity <= 0:
+                    message = "quantity must be positive"
+            except ValueError:
+                message = f"invalid quantity '{data[2]}'"
+        if message:
+            errors.append((line_number, message))
+            quantity = 0
+        if data[0]:
+            orders.setdefault(data[0], []).append((line_number, data[1] if len(data) > 1 else '', quantity))
+    return orders, errors
+
+
+class OrderImporter:
+    """Commits a batch of online or marketplace orders in one write.
+
+    Every order is checked against one catalog snapshot, in file order,
+    with stock held by open till carts counted as taken, so the tills
+    never lose stock a customer is standing in front of; the holds are
+    checked again with the stock under the commit lock. Orders that pass
+    are committed through the commit pipeline as a single group: one
+    catalog write and one ledger append for the whole batch,
+    each order getting its own bill. An order is all or nothing; orders
+    that fail are reported with the reason and the rest still commit.
+    """
+
+    def __init__(self, repository: DataRepository, channel: str = 'online'):
+        if ',' in channel or '\n' in channel:
+            raise ValueError(f"invalid channel name '{channel}'")  # it becomes a bills.txt field
+        self.repository = repository
+        self.channel = channel  # recorded as the cashier of the bills
+        self.reservations = ReservationTable.for_data_dir(repository.data_dir)
+        self.commit_pipeline = CommitPipeline.for_data_dir(repository.data_dir)
+
+    def import_file(self, path: str) -> Dict:
+        """Read an order file and commit its orders (see ``import_orders``); errors are (line, message)."""
+        with open(path, 'r', errors='replace') as f:
+            return self.import_lines(f)
+
+    def import_lines(self, lines: Iterable[str]) -> Dict:
+        """Parse order lines from any text stream and commit the orders."""
+        orders, errors = parse_orders(lines)
+        report = self.import_orders(orders, errors)
+        report['errors'] = errors
+        return report
+
+    def import_orders(self, orders: Dict[str, List[Tuple[int, str, int]]],
+                      errors: Optional[List[Tuple[int, str]]] = None) -> Dict:
+        """Check every order against one snapshot and commit the ones that fit in one write.
+
+        Orders with a line in ``errors`` are rejected whole, and every line
+        is priced from the current catalog. Returns ``committed`` ({order_id:
+        bill_number}), ``failed`` ({order_id: reason}) and the ``units`` and
+        ``revenue`` committed.
+        """
+        line_errors = dict(errors or [])
+        snapshot = self.repository.catalog()
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        available: Dict[str, int] = {}
+        failed: Dict[str, str] = {}
+        accepted: List[Tuple[str, Dict]] = []
+
+        for order_id, lines in orders.items():
+            deltas: Dict[str, int] = {}
+            for _, product_id, quantity in lines:
+                deltas[product_id] = deltas.get(product_id, 0) + quantity
+            reason = None
+            for line_number, _, _ in lines:
+                if line_number in line_errors:
+                    reason = f"line {line_number}: {line_errors[line_number]}"
+                    break
+            for product_id, quantity in deltas.items():
+                if reason:
+                    break
+                product = snapshot.get(product_id)
+                if product is None:
+                    reason = f"unknown product '{product_id}'"
+                    break
+                if product_id not in available:
+                    available[product_id] = product[4] - self.reservations.reserved(product_id)
+                if quantity > available[product_id]:
+                    reason = f"not enough stock of '{product_id}' ({max(0, available[product_id])} available)"
+            if reason:
+                failed[order_id] = reason
+                continue
+
+            items = []
+            for product_id, quantity in deltas.items():
+                available[product_id] -= quantity
+                product = snapshot.get(product_id)
+                items.append({'id': product_id, 'name': product[1], 'category': product[2],
+                              'price': product[3], 'quantity': quantity})
+            sale = {
+                'timestamp': timestamp,
+                'cashier': self.channel,
+                'payment_method': 'Online',
+                'total': round(sum(item['price'] * item['quantity'] for item in items), 2),
+                'items': items,
+                'discounts': [],
+            }
+            accepted.append((order_id, sale))
+
+        # Stock and cart holds are checked again under the lock; a sale or hold since the snapshot still wins
+        results = self.commit_pipeline.commit_sales(
+            [(self._deltas(sale), lambda number, sale=sale: format_bill(number, sale), sale)
+             for _, sale in accepted],
+            held=self.reservations.reserved)
+        committed: Dict[str, int] = {}
+        units = 0
+        revenue = 0.0
+        for (order_id, sale), (bill_number, error) in zip(accepted, results):
+            if bill_number is None:
+                failed[order_id] = error or "rejected"
+                continue
+            committed[order_id] = bill_number
+            units += sum(item['quantity'] for item in sale['items'])
+            revenue += sale['total']
+            SALES.labels(sale['payment_method']).inc()
+        return {'committed': committed, 'failed': failed, 'units': units, 'revenue': round(revenue, 2)}
+
+    def _deltas(self, sale: Dict) -> Dict[str, int]:
+        return {item['id']: item['quantity'] for item in sale['items']}
@@ -0,0 +1,49 @@
+from typing import List, Optional
+from .catalog import Product
+from .catalog_reader import CatalogReader
+from .product_query import ProductQuery
+from .settings import Settings
+from .stores import store_data_dir
+
+
+class PriceCheck:
+    """Read-only product lookups for the price-check kiosk.
+
+    Nothing here holds stock or writes files: the kiosk reads the catalog
+    through a CatalogReader, which has no write paths at all. A scanned ID
+    is one lookup in the current catalog snapshot, and name searches go
+    through the reader's name word index (see ProductIndex), so a search is a
+    bisect per query word rather than a scan of the catalog, and matches
+    parts of words the way the cashier search does. Products
+    themselves, with their current price and stock, are always read from
+    the snapshot.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, store: Optional[str] = None):
+        self.data_dir = data_dir or store_data_dir(store)
+        settings = Settings(self.data_dir)
+        self.catalog = CatalogReader(self.data_dir, settings)
+        self.limit = max(1, settings.get_int('kiosk_results', 50))
+        self.refresh_ms = max(250, settings.get_int('kiosk_refresh_ms', 2000))
+
+    def version(self) -> int:
+        """Get the current catalog version, to tell when shown results are out of date."""
+        return self.catalog.catalog().version
+
+    def lookup(self, product_id: str) -> Optional[Product]:
+        """Get a product by its exact ID, e.g. a scanned barcode."""
+        return self.catalog.get_product(product_id.strip())
+
+    def search(self, text: str) -> List[Product]:
+        """Get up to ``kiosk_results`` products matching an ID or parts of the name, by name.
+
+        Every word typed must appear somewhere in the product name, so
+        "choc dark" finds "Dark Chocolate Bar" and "phone" finds "Headphones".
+        """
+        if not text.split():
+            return []
+        exact = self.lookup(text)
+        matches = self.catalog.query_products(ProductQuery().name_matches(text), self.limit)
+        results = sorted((product for product in matches if not exact or product[0] != exact[0]),
+                         key=lambda product: product[1].lower())
+        return ([exact] + results)[:self.limit] if exact else results
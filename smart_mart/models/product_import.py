@@ -0,0 +1,151 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from .catalog import Product
+from .ledger import ID_RESERVED, valid_product_id
+from .repository import DataRepository
+
+MIN_CHUNK_BYTES = 1 << 20  # files smaller than this are validated in-process
+
+
+def _chunk_offsets(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that start and end on line boundaries."""
+    size = os.path.getsize(path)
+    offsets = []
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            end = min(size, start + chunk_bytes)
+            if end < size:
+                f.seek(end)
+                f.readline()  # move to the start of the next line
+                end = f.tell()
+            offsets.append((start, end))
+            start = end
+    return offsets
+
+
+def _validate_chunk(path: str, start: int, end: int,
+                    categories: FrozenSet[str]) -> Tuple[int, List[Tuple[int, Product]], List[Tuple[int, str]]]:
+    """Validate one chunk (runs in a worker process).
+
+    Returns the chunk's line count, its valid rows and its errors; line
+    numbers are relative to the chunk and made absolute when merged.
+    """
+    rows: List[Tuple[int, Product]] = []
+    errors: List[Tuple[int, str]] = []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Split on \n only, so line numbers agree with the line-aligned chunk offsets
+    lines = data.decode('utf-8', errors='replace').split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        fields = [field.strip() for field in line.split(',')]
+        if len(fields) != 5:
+            errors.append((index, f"expected 5 fields (id,name,category,price,quantity), found {len(fields)}"))
+            continue
+
+        product_id, name, category, price_text, quantity_text = fields
+        if not product_id or not name or not category:
+            errors.append((index, "product ID, name and category must not be empty"))
+            continue
+        if not valid_product_id(product_id):
+            errors.append((index, f"product ID '{product_id}' must not contain any of '{ID_RESERVED}'"))
+            continue
+        if category not in categories:
+            errors.append((index, f"unknown category '{category}'"))
+            continue
+        try:
+            price = float(price_text)
+        except ValueError:
+            errors.append((index, f"invalid price '{price_text}'"))
+            continue
+        try:
+            quantity = int(quantity_text)
+        except ValueError:
+            errors.append((index, f"invalid quantity '{quantity_text}'"))
+            continue
+        if price < 0 or quantity < 0:
+            errors.append((index, "price and quantity must not be negative"))
+            continue
+
+        rows.append((index, (product_id, name, category, price, quantity)))
+    return len(lines), rows, errors
+
+
+class ProductImporter:
+    """Validates a bulk product file in parallel, then commits it in one write.
+
+    The file uses the products.txt format (``id,name,category,price,quantity``,
+    an optional header line is skipped). It is split into line-aligned chunks
+    that are validated on all cores by a ProcessPoolExecutor; per-chunk
+    results are merged into one report with absolute line numbers. Nothing
+    is written unless every row is valid.
+    """
+
+    def __init__(self, repository: DataRepository, workers: Optional[int] = None):
+        self.repository = repository
+        self.workers = workers or os.cpu_count() or 1
+
+    def validate(self, path: str) -> Dict:
+        """Validate a file and return ``{'rows', 'errors', 'lines'}``; errors are (line, message)."""
+        categories = frozenset(self.repository.list_categories())
+        size = os.path.getsize(path)
+        chunk_bytes = max(MIN_CHUNK_BYTES, size // (self.workers * 4) + 1)
+        chunks = _chunk_offsets(path, chunk_bytes)
+
+        if len(chunks) <= 1 or self.workers == 1:
+            results = [_validate_chunk(path, start, end, categories) for start, end in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(_validate_chunk, path, start, end, categories)
+                           for start, end in chunks]
+                results = [future.result() for future in futures]
+
+        # Merge chunk results, turning chunk-relative indexes into 1-based file lines
+        rows: Dict[str, Product] = {}
+        first_seen: Dict[str, int] = {}
+        errors: List[Tuple[int, str]] = []
+        line_base = 1
+        for line_count, chunk_rows, chunk_errors in results:
+            for index, message in chunk_errors:
+                line_number = line_base + index
+                if line_number == 1 and self._is_header(path):
+                    continue
+                errors.append((line_number, message))
+            for index, product in chunk_rows:
+                line_number = line_base + index
+                if product[0] in first_seen:
+                    errors.append((line_number, f"duplicate product ID '{product[0]}' "
+                                                f"(first seen on line {first_seen[product[0]]})"))
+                    continue
+                first_seen[product[0]] = line_number
+                rows[product[0]] = product
+            line_base += line_count
+
+        errors.sort()
+        return {'rows': rows, 'errors': errors, 'lines': line_base - 1}
+
+    def import_file(self, path: str, commit: bool = True) -> Dict:
+        """Validate a file and, if it has no errors, add or update all its products in one write."""
+        report = self.validate(path)
+        report['committed'] = False
+        if commit and not report['errors'] and report['rows']:
+            with self.repository.products_lock:
+                products = self.repository.load_products()
+                products.update(report['rows'])
+                self.repository.write_products(products)
+            report['committed'] = True
+        report['imported'] = len(report['rows'])
+        return report
+
+    def _is_header(self, path: str) -> bool:
+        with open(path, 'r', errors='replace') as f:
+            first = f.readline().strip().lower()
+        return first.startswith('id,') or first.startswith('product_id,')
@@ -0,0 +1,235 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+from .catalog import CatalogSnapshot, Product
+
+_LAST_ID = '\U0010ffff'  # sorts after every product ID, for inclusive upper bounds
+
+
+class ProductQuery:
+    """Conditions on products, all of which must hold.
+
+    Each method returns a new query with one more condition, so queries
+    compose and can be shared: ``ProductQuery().in_category('Electronics')
+    .price_between(high=100).stock_between(high=4)``. Bounds are inclusive
+    and None leaves that side open.
+    """
+
+    __slots__ = ('category', 'price', 'stock', 'name_terms')
+
+    def __init__(self, category: Optional[str] = None,
+                 price: Tuple[Optional[float], Optional[float]] = (None, None),
+                 stock: Tuple[Optional[int], Optional[int]] = (None, None),
+                 name_terms: Sequence[str] = ()):
+        self.category = category
+        self.price = price
+        self.stock = stock
+        self.name_terms = tuple(name_terms)
+
+    def in_category(self, category: str) -> 'ProductQuery':
+        """Only products of one category."""
+        return ProductQuery(category, self.price, self.stock, self.name_terms)
+
+    def price_between(self, low: Optional[float] = None, high: Optional[float] = None) -> 'ProductQuery':
+        """Only products priced from ``low`` to ``high``."""
+        return ProductQuery(self.category, (low, high), self.stock, self.name_terms)
+
+    def stock_between(self, low: Optional[int] = None, high: Optional[int] = None) -> 'ProductQuery':
+        """Only products with ``low`` to ``high`` units in stock."""
+        return ProductQuery(self.category, self.price, (low, high), self.name_terms)
+
+    def name_matches(self, text: str) -> 'ProductQuery':
+        """Only products whose name contains every word of ``text``, anywhere ("phone" finds "Smartphone")."""
+        return ProductQuery(self.category, self.price, self.stock, self.name_terms + tuple(text.lower().split()))
+
+    def is_empty(self) -> bool:
+        """Tell whether the query has no conditions, i.e. matches every product."""
+        return (self.category is None and self.price == (None, None)
+                and self.stock == (None, None) and not self.name_terms)
+
+    def matches(self, product: Product) -> bool:
+        """Check one product against every condition."""
+        if self.category is not None and product[2] != self.category:
+            return False
+        if not _within(product[3], self.price) or not _within(product[4], self.stock):
+            return False
+        if self.name_terms:
+            name = product[1].lower()
+            return all(term in name for term in self.name_terms)
+        return True
+
+
+def _within(value, bounds) -> bool:
+    low, high = bounds
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+class ProductIndex:
+    """Sorted indexes over a repository's catalog that answer ProductQuery.
+
+    Prices and stock levels are kept as sorted (value, product ID) lists.
+    Names are indexed by word: every suffix of every distinct word, sorted,
+    points to the word and the word to its products, so a bisect finds
+    the words containing a term anywhere. Categories use the snapshot's
+    own postings. A query turns each condition into a range of one index,
+    walks only the narrowest range and checks the other conditions on
+    those candidates, so its cost follows the size of the most selective
+    condition rather than the catalog.
+
+    An index is brought up to the current catalog version the first time
+    a query needs it. Writes made through the repository report the
+    products they changed (``note_changes``), so a sale moves just its
+    products' entries; after a write from another process the changed
+    products are found by comparing values, and only a large change
+    rebuilds an index from scratch.
+    """
+
+    CHANGE_HISTORY = 256  # catalog versions whose changed products are remembered
+    FIELDS = {'prices': 3, 'stocks': 4, 'words': 1}
+
+    def __init__(self):
+        self._guard = threading.RLock()
+        self._built: Dict[str, int] = {}  # index: catalog version it reflects
+        self._sorted: Dict[str, List[Tuple]] = {name: [] for name in self.FIELDS}
+        self._values: Dict[str, Dict[str, object]] = {name: {} for name in self.FIELDS}  # product ID: as indexed
+        self._word_ids: Dict[str, Set[str]] = {}  # word: IDs of the products whose name has it
+        self._changes: 'OrderedDict[int, FrozenSet[str]]' = OrderedDict()  # version: IDs changed from the one before
+
+    def note_changes(self, version: int, product_ids: Iterable[str]):
+        """Record which products a catalog version changed (added, updated or deleted)."""
+        with self._guard:
+            self._changes[version] = frozenset(product_ids)
+            while len(self._changes) > self.CHANGE_HISTORY:
+                self._changes.popitem(last=False)
+
+    def query(self, snapshot: CatalogSnapshot, query: ProductQuery, limit: Optional[int] = None) -> List[Product]:
+        """Get the products of a snapshot that match a query, by product ID.
+
+        With a ``limit``, the walk stops after that many matches, which
+        are then not necessarily the lowest IDs.
+        """
+        if query.is_empty():
+            return sorted(snapshot.list())[:limit]
+
+        # Indexes are updated in place, so a query holds the guard while it walks one
+        with self._guard:
+            # Each condition as (size, candidate IDs); the smallest is walked
+            ranges = []
+            if query.category is not None:
+                ids = snapshot.product_ids(query.category)
+                ranges.append((len(ids), ids))
+            for name, bounds in (('prices', query.price), ('stocks', query.stock)):
+                if bounds != (None, None):
+                    index = self._index(name, snapshot)
+                    start, end = _bounds_range(index, bounds)
+                    ranges.append((end - start, _ids(index, start, end)))
+            if query.name_terms:
+                suffixes = self._index('words', snapshot)
+                for term in query.name_terms:
+                    start = bisect_left(suffixes, (term,))
+                    end = bisect_left(suffixes, (term + _LAST_ID,), start)
+                    words = {suffixes[i][1] for i in range(start, end)}
+                    ranges.append((sum(len(self._word_ids[word]) for word in words),
+                                   (product_id for word in words for product_id in self._word_ids[word])))
+            _, candidates = min(ranges, key=lambda entry: entry[0])
+
+            results: List[Product] = []
+            seen = set()
+            for product_id in candidates:
+                if limit is not None and len(results) >= limit:
+                    break
+                if product_id in seen:
+                    continue  # a term can be in several words of one name
+                seen.add(product_id)
+                product = snapshot.get(product_id)
+                if product is not None and query.matches(product):
+                    results.append(product)
+        results.sort()
+        return results
+
+    def _index(self, name: str, snapshot: CatalogSnapshot) -> List[Tuple]:
+        """Get an index brought up to the snapshot's version (caller holds the guard)."""
+        built = self._built.get(name)
+        if built != snapshot.version:
+            products = snapshot.products
+            changed = self._changed(name, built, snapshot)
+            if changed is None or len(changed) > len(products) // 8:
+                self._build(name, products)
+            else:
+                for product_id in changed:
+                    self._update(name, product_id, products.get(product_id))
+            self._built[name] = snapshot.version
+        return self._sorted[name]
+
+    def _changed(self, name: str, built: Optional[int], snapshot: CatalogSnapshot) -> Optional[Set[str]]:
+        """Get the IDs whose indexed value may differ from the snapshot, or None to rebuild."""
+        if built is None:
+            return None
+        versions = range(built + 1, snapshot.version + 1)
+        if built < snapshot.version and all(version in self._changes for version in versions):
+            return set().union(*(self._changes[version] for version in versions))
+        # Written by another process, or an older snapshot: compare with what is indexed
+        field, values, products = self.FIELDS[name], self._values[name], snapshot.products
+        changed = {product_id for product_id, product in products.items() if values.get(product_id) != product[field]}
+        changed.update(product_id for product_id in values if product_id not in products)
+        return changed
+
+    def _build(self, name: str, products):
+        field = self.FIELDS[name]
+        self._values[name] = {product_id: product[field] for product_id, product in products.items()}
+        if name == 'words':
+            self._word_ids = {}
+            for product_id, product in products.items():
+                for word in set(product[1].lower().split()):
+                    self._word_ids.setdefault(word, set()).add(product_id)
+            self._sorted[name] = sorted((word[i:], word) for word in self._word_ids for i in range(len(word)))
+        else:
+            self._sorted[name] = sorted((product[field], product_id) for product_id, product in products.items())
+
+    def _update(self, name: str, product_id: str, product: Optional[Product]):
+        """Move one product's entries in an index; ``product`` is None once it was deleted."""
+        values, index = self._values[name], self._sorted[name]
+        old = values.pop(product_id, None)
+        if name == 'words':
+            if old is not None:
+                for word in set(old.lower().split()):
+                    ids = self._word_ids.get(word)
+                    if ids is not None:
+                        ids.discard(product_id)
+                        if not ids:
+                            del self._word_ids[word]
+                            for i in range(len(word)):
+                                _remove(index, (word[i:], word))
+            if product is not None:
+                for word in set(product[1].lower().split()):
+                    if word not in self._word_ids:
+                        self._word_ids[word] = set()
+                        for i in range(len(word)):
+                            insort(index, (word[i:], word))
+                    self._word_ids[word].add(product_id)
+                values[product_id] = product[1]
+            return
+        if old is not None:
+            _remove(index, (old, product_id))
+        if product is not None:
+            value = product[self.FIELDS[name]]
+            insort(index, (value, product_id))
+            values[product_id] = value
+
+
+def _remove(index: List[Tuple], entry: Tuple):
+    i = bisect_left(index, entry)
+    if i < len(index) and index[i] == entry:
+        del index[i]
+
+
+def _bounds_range(index: List[Tuple], bounds) -> Tuple[int, int]:
+    low, high = bounds
+    start = bisect_left(index, (low,)) if low is not None else 0
+    end = bisect_right(index, (high, _LAST_ID)) if high is not None else len(index)
+    return start, max(start, end)
+
+
+def _ids(index: List[Tuple], start: int, end: int):
+    return (index[i][1] for i in range(start, end))
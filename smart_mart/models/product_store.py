@@ -0,0 +1,189 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from .catalog import Product
+from .settings import Settings
+
+
+def parse_product_file(path: str) -> Dict[str, Product]:
+    """Read ``id,name,category,price,quantity`` lines into a dict keyed by product ID."""
+    products: Dict[str, Product] = {}
+    with open(path, 'r') as f:
+        for line in f:
+            data = line.strip().split(',')
+            if len(data) != 5:
+                continue
+            products[data[0]] = (data[0], data[1], data[2], float(data[3]), int(data[4]))
+    return products
+
+
+def write_product_file(path: str, products: List[Product], durable: bool = False):
+    """Atomically replace a product file."""
+    temp_file = path + '.tmp'
+    try:
+        with open(temp_file, 'w') as f:
+            for p in products:
+                f.write(f"{p[0]},{p[1]},{p[2]},{p[3]},{p[4]}\n")
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_file, path)
+    except OSError:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def product_files_for(data_dir: str, settings: Optional[Settings] = None):
+    """Get the catalog storage a data directory is configured for."""
+    settings = settings or Settings(data_dir)
+    products_file = os.path.join(data_dir, 'products.txt')
+    if settings.get_bool('catalog_partitions'):
+        return PartitionedProductFiles(os.path.join(data_dir, 'products'), products_file,
+                                       settings.get_int('catalog_workers', 4))
+    return ProductFile(products_file)
+
+
+class ProductFile:
+    """The whole catalog in one ``products.txt``."""
+
+    def __init__(self, products_file: str):
+        self.products_file = products_file
+
+    def ensure_exists(self):
+        """Create an empty catalog if there is none."""
+        if not os.path.exists(self.products_file):
+            open(self.products_file, 'a').close()
+
+    def stamp(self):
+        """Get a value that changes whenever the catalog files change."""
+        return _file_stamp(self.products_file)
+
+    def load(self) -> Dict[str, Product]:
+        """Read the catalog."""
+        return parse_product_file(self.products_file)
+
+    def write(self, products: Dict[str, Product], durable: bool = False):
+        """Replace the catalog (caller holds the products lock)."""
+        write_product_file(self.products_file, list(products.values()), durable)
+
+
+class PartitionedProductFiles:
+    """The catalog split by category into ``products/<category>.txt`` files.
+
+    A write only replaces the partitions whose products changed, so a sale
+    rewrites the files of the categories it sold from rather than the whole
+    catalog. Reloads only re-read partitions whose stamp changed, and read
+    several of them at once on a thread pool. An existing products.txt is
+    split into partitions on the first write and kept as
+    ``products.txt.migrated``.
+
+    Each partition is replaced atomically, but a write touching several
+    partitions is not atomic as a whole.
+    """
+
+    def __init__(self, directory: str, legacy_file: str, workers: int = 4):
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='catalog')
+        self._guard = threading.Lock()
+        # file name: (stamp, products) of every partition as last read or written
+        self._partitions: Dict[str, Tuple[Optional[Tuple[int, int, int]], Dict[str, Product]]] = {}
+
+    @staticmethod
+    def partition_name(category: str) -> str:
+        """Get the file name of a category's partition."""
+        return (re.sub(r'[^A-Za-z0-9]+', '_', category).strip('_').lower() or 'uncategorized') + '.txt'
+
+    def ensure_exists(self):
+        """Partitions are created by the first write; nothing to do."""
+
+    def stamp(self):
+        """Get a value that changes whenever any partition changes."""
+        if not os.path.isdir(self.directory):
+            return ('legacy', _file_stamp(self.legacy_file))
+        return tuple(sorted((name, _file_stamp(os.path.join(self.directory, name)))
+                            for name in self._names()))
+
+    def load(self) -> Dict[str, Product]:
+        """Read the catalog, re-reading only partitions that changed since the last read."""
+        if not os.path.isdir(self.directory):
+            return parse_product_file(self.legacy_file) if os.path.exists(self.legacy_file) else {}
+
+        with self._guard:
+            names = sorted(self._names())
+            stamps = {name: _file_stamp(os.path.join(self.directory, name)) for name in names}
+            stale = [name for name in names
+                     if name not in self._partitions or self._partitions[name][0] != stamps[name]]
+            # Fan out: every changed partition is parsed on its own worker
+            futures = {name: self.executor.submit(parse_product_file, os.path.join(self.directory, name))
+                       for name in stale}
+            partitions = {name: self._partitions[name] for name in names if name not in futures}
+            for name, future in futures.items():
+                partitions[name] = (stamps[name], future.result())
+            self._partitions = partitions
+
+            products: Dict[str, Product] = {}
+            for name in names:
+                products.update(partitions[name][1])
+            return products
+
+    def write(self, products: Dict[str, Product], durable: bool = False):
+        """Replace the partitions whose products changed (caller holds the products lock)."""
+        grouped: Dict[str, Dict[str, Product]] = {}
+        for product in products.values():
+            grouped.setdefault(self.partition_name(product[2]), {})[product[0]] = product
+
+        with self._guard:
+            migrating = not os.path.isdir(self.directory)
+            os.makedirs(self.directory, exist_ok=True)
+            if migrating:
+                self._partitions = {}
+            current = {name: self._partitions.get(name, (None, None)) for name in self._names()}
+
+            changed = [name for name, group in grouped.items()
+                       if name not in current or current[name][1] != group]
+            futures = [self.executor.submit(write_product_file, os.path.join(self.directory, name),
+                                            list(grouped[name].values()), durable)
+                       for name in changed]
+            for future in futures:
+                future.result()
+            for name in current:
+                if name not in grouped:
+                    os.remove(os.path.join(self.directory, name))
+
+            self._partitions = {name: (_file_stamp(os.path.join(self.directory, name)), group)
+                                for name, group in grouped.items()}
+            if durable:
+                self._fsync_directory()
+            if migrating and os.path.exists(self.legacy_file):
+                os.replace(self.legacy_file, self.legacy_file + '.migrated')
+
+    def _names(self) -> List[str]:
+        try:
+            return [name for name in os.listdir(self.directory) if name.endswith('.txt')]
+        except OSError:
+            return []
+
+    def _fsync_directory(self):
+        """Persist partition renames (not supported on Windows)."""
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
@@ -0,0 +1,244 @@
+import os
+import threading
+from itertools import chain
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PROMOTION_TYPES = ('product', 'category', 'multibuy', 'bundle', 'payment')
+
+DEFAULT_PROMOTIONS = ['CARD10,Card discount,payment,card,10,,,']
+
+
+class CompiledPromotions:
+    """Lookup tables for the promotions active during one time span.
+
+    Line rules are indexed by product ID and by category, bundles by each
+    of their products, and payment discounts by payment method, so pricing
+    a cart only looks up the rules that can touch its lines.
+    """
+
+    def __init__(self, rules: Iterable[Dict], compiled_at: datetime, valid_until: Optional[datetime]):
+        self.compiled_at = compiled_at
+        self.valid_until = valid_until  # the active set changes at this time
+        self.by_product: Dict[str, List[Dict]] = {}
+        self.by_category: Dict[str, List[Dict]] = {}
+        self.bundles_by_product: Dict[str, List[Dict]] = {}
+        self.by_payment: Dict[str, List[Dict]] = {}
+        for rule in rules:
+            if rule['type'] in ('product', 'multibuy'):
+                self.by_product.setdefault(rule['target'], []).append(rule)
+            elif rule['type'] == 'category':
+                self.by_category.setdefault(rule['target'], []).append(rule)
+            elif rule['type'] == 'bundle':
+                for product_id in rule['products']:
+                    self.bundles_by_product.setdefault(product_id, []).append(rule)
+            else:
+                self.by_payment.setdefault(rule['target'].lower(), []).append(rule)
+
+    def evaluate(self, lines: Iterable[Dict], payment_method: str = '') -> Dict:
+        """Price cart lines (dicts with id, category, price and quantity) in one pass.
+
+        Each line gets the single best of its product, category and
+        multi-buy rules; complete bundles are discounted on top, then the
+        payment discount applies to what is left.
+        """
+        subtotal = 0.0
+        discounts: Dict[str, Dict] = {}
+        quantities: Dict[str, int] = {}
+        bundles: Dict[str, Dict] = {}
+
+        for line in lines:
+            price, quantity = line['price'], line['quantity']
+            amount = price * quantity
+            subtotal += amount
+            quantities[line['id']] = quantities.get(line['id'], 0) + quantity
+
+            best, best_rule = 0.0, None
+            for rule in chain(self.by_product.get(line['id'], ()), self.by_category.get(line.get('category', ''), ())):
+                if rule['type'] == 'multibuy':
+                    buy, pay = rule['buy'], rule['pay']
+                    saving = (quantity // buy) * (buy - pay) * price
+                else:
+                    saving = amount * rule['percent'] / 100
+                if saving > best:
+                    best, best_rule = saving, rule
+            if best_rule is not None:
+                self._add(discounts, best_rule, best)
+
+            for rule in self.bundles_by_product.get(line['id'], ()):
+                bundles[rule['id']] = rule
+
+        for rule in bundles.values():
+            sets = min(quantities.get(product_id, 0) for product_id in rule['products'])
+            if sets:
+                self._add(discounts, rule, sets * rule['amount'])
+
+        after_lines = max(0.0, subtotal - sum(entry['amount'] for entry in discounts.values()))
+        for rule in self.by_payment.get(payment_method.lower(), ()):
+            self._add(discounts, rule, after_lines * rule['percent'] / 100)
+
+        applied = [dict(entry, amount=round(entry['amount'], 2)) for entry in discounts.values()]
+        subtotal = round(subtotal, 2)
+        total = round(max(0.0, subtotal - sum(entry['amount'] for entry in applied)), 2)
+        return {
+            'subtotal': subtotal,
+            'discounts': applied,
+            'discount': round(subtotal - total, 2),
+            'total': total,
+        }
+
+    def _add(self, discounts: Dict[str, Dict], rule: Dict, amount: float):
+        entry = discounts.setdefault(rule['id'], {'promotion': rule['id'], 'name': rule['name'], 'amount': 0.0})
+        entry['amount'] += amount
+
+
+class PromotionEngine:
+    """Active promotions from ``promotions.txt``, compiled into lookup tables.
+
+    One line per rule: ``id,name,type,target,value,start,end,hours``.
+
+    * ``product``  - target product ID, value percent off
+    * ``category`` - target category, value percent off
+    * ``multibuy`` - target product ID, value ``buy:pay`` (e.g. ``3:2``)
+    * ``bundle``   - target product IDs joined with ``+``, value amount off per complete set
+    * ``payment``  - target payment method, value percent off the whole sale
+
+    ``start`` and ``end`` (``YYYY-MM-DD HH:MM``) limit the dates a rule
+    runs, and ``hours`` (``HH:MM-HH:MM``) the time of day; all three may be
+    empty. The rules active now are compiled once and reused until the
+    file changes or a rule starts or stops.
+    """
+
+    _engines: Dict[str, 'PromotionEngine'] = {}
+    _engines_guard = threading.Lock()
+
+    def __init__(self, data_dir: str):
+        self.promotions_file = os.path.join(data_dir, 'promotions.txt')
+        self._guard = threading.Lock()
+        self._rules: List[Dict] = []
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._compiled: Optional[CompiledPromotions] = None
+        self.version = 0  # bumped whenever the compiled tables are replaced
+
+        if not os.path.exists(self.promotions_file):
+            with open(self.promotions_file, 'w') as f:
+                for line in DEFAULT_PROMOTIONS:
+                    f.write(f"{line}\n")
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'PromotionEngine':
+        """Get the process-wide promotion engine for a data directory."""
+        key = os.path.abspath(data_dir)
+        with cls._engines_guard:
+            if key not in cls._engines:
+                cls._engines[key] = cls(key)
+            return cls._engines[key]
+
+    def compiled(self, at: Optional[datetime] = None) -> CompiledPromotions:
+        """Get the lookup tables of the promotions active at ``at`` (default now)."""
+        at = at or datetime.now()
+        with self._guard:
+            stamp = self._file_stamp()
+            if stamp != self._stamp:
+                self._rules = self._parse()
+                self._stamp = stamp
+                self._compiled = None
+            compiled = self._compiled
+            if (compiled is None or (compiled.valid_until is not None and at >= compiled.valid_until)
+                    or at < compiled.compiled_at):
+                compiled = self._compile(at)
+                self._compiled = compiled
+                self.version += 1
+            return compiled
+
+    def evaluate(self, lines: Iterable[Dict], payment_method: str = '', at: Optional[datetime] = None) -> Dict:
+        """Price cart lines with the promotions active at ``at`` (default now)."""
+        return self.compiled(at).evaluate(lines, payment_method)
+
+    def list_rules(self) -> List[Dict]:
+        """Get every valid rule in the file, active or not."""
+        self.compiled()
+        return [dict(rule) for rule in self._rules]
+
+    def _compile(self, at: datetime) -> CompiledPromotions:
+        active = []
+        boundaries = []
+        for rule in self._rules:
+            is_active, boundary = self._window(rule, at)
+            if is_active:
+                active.append(rule)
+            if boundary is not None:
+                boundaries.append(boundary)
+        return CompiledPromotions(active, at, min(boundaries) if boundaries else None)
+
+    def _window(self, rule: Dict, at: datetime) -> Tuple[bool, Optional[datetime]]:
+        """Check whether a rule runs at ``at``, and when that next changes."""
+        if rule['end'] is not None and at >= rule['end']:
+            return False, None
+        if rule['start'] is not None and at < rule['start']:
+            return False, rule['start']
+        if rule['hours'] is None:
+            return True, rule['end']
+
+        # Daily window, which may run past midnight
+        opens, closes = rule['hours']
+        day = datetime.combine(at.date(), datetime.min.time())
+        for start in (day - timedelta(days=1), day):
+            window_start = start + opens
+            window_end = start + closes if closes > opens else start + timedelta(days=1) + closes
+            if window_start <= at < window_end:
+                boundary = window_end
+                break
+        else:
+            boundary = day + opens if at < day + opens else day + timedelta(days=1) + opens
+            return False, boundary if rule['end'] is None else min(boundary, rule['end'])
+        return True, boundary if rule['end'] is None else min(boundary, rule['end'])
+
+    def _parse(self) -> List[Dict]:
+        rules = []
+        try:
+            with open(self.promotions_file, 'r') as f:
+                for line in f:
+                    rule = self._parse_rule(line)
+                    if rule:
+                        rules.append(rule)
+        except OSError:
+            pass
+        return rules
+
+    def _parse_rule(self, line: str) -> Optional[Dict]:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return None
+        data = [field.strip() for field in line.split(',')]
+        if len(data) != 8 or data[2] not in PROMOTION_TYPES or not data[0] or not data[3]:
+            return None
+        rule_id, name, rule_type, target, value, start, end, hours = data
+        rule = {'id': rule_id, 'name': name or rule_id, 'type': rule_type, 'target': target}
+        try:
+            if rule_type == 'multibuy':
+                buy, pay = (int(part) for part in value.split(':'))
+                if buy <= 0 or not 0 <= pay < buy:
+                    return None
+                rule.update(buy=buy, pay=pay)
+            elif rule_type == 'bundle':
+                rule.update(products=tuple(target.split('+')), amount=float(value))
+            else:
+                rule['percent'] = min(100.0, max(0.0, float(value)))
+            rule['start'] = datetime.strptime(start, '%Y-%m-%d %H:%M') if start else None
+            rule['end'] = datetime.strptime(end, '%Y-%m-%d %H:%M') if end else None
+            rule['hours'] = None
+            if hours:
+                opens, closes = (datetime.strptime(part, '%H:%M') for part in hours.split('-'))
+                rule['hours'] = (timedelta(hours=opens.hour, minutes=opens.minute),
+                                 timedelta(hours=closes.hour, minutes=closes.minute))
+        except ValueError:
+            return None
+        return rule
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.promotions_file)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
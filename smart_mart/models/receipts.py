@@ -0,0 +1,159 @@
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from .settings import Settings
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # PNG receipts are optional
+    Image = None
+
+try:
+    import win32api
+except ImportError:  # only used to pick a named printer on Windows
+    win32api = None
+
+
+class ReceiptSpooler:
+    """Renders receipts for committed sales on a background worker pool.
+
+    Every receipt is written as plain text (and, if Pillow is available, a
+    PNG) to the spool directory, then optionally sent to a printer queue.
+    ``submit`` returns immediately so the till can start the next sale.
+    """
+
+    WIDTH = 40  # characters per receipt line
+
+    _spoolers: Dict[str, 'ReceiptSpooler'] = {}
+    _spoolers_guard = threading.Lock()
+
+    def __init__(self, output_dir: str, printer: str = '', png: bool = True, workers: int = 2):
+        self.output_dir = output_dir
+        self.printer = printer
+        self._warned_printer = False
+        self.png = png and Image is not None
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                           thread_name_prefix='receipt')
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'ReceiptSpooler':
+        """Get the process-wide spooler for a data directory, configured from its settings."""
+        key = os.path.abspath(data_dir)
+        with cls._spoolers_guard:
+            if key not in cls._spoolers:
+                settings = Settings(key)
+                output_dir = os.path.join(key, settings.get('receipt_dir', 'receipts'))
+                cls._spoolers[key] = cls(output_dir,
+                                         printer=settings.get('receipt_printer', ''),
+                                         png=settings.get_bool('receipt_png', True),
+                                         workers=settings.get_int('receipt_workers', 2))
+            return cls._spoolers[key]
+
+    def submit(self, sale: Dict) -> Future:
+        """Queue a receipt for rendering; the future resolves to the text file path."""
+        return self.executor.submit(self._spool, dict(sale))
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool, by default after queued receipts are finished."""
+        self.executor.shutdown(wait=wait)
+
+    def render_text(self, sale: Dict) -> str:
+        """Format a sale as a plain-text receipt."""
+        width = self.WIDTH
+        lines: List[str] = [
+            'SMART MART'.center(width),
+            '=' * width,
+            f"Bill #: {sale.get('bill_number', '')}",
+            f"Date:   {sale.get('timestamp', '')}",
+        ]
+        if sale.get('cashier'):
+            lines.append(f"Cashier: {sale['cashier']}")
+        lines.append('-' * width)
+
+        for item in sale.get('items', []):
+            line_total = item['price'] * item['quantity']
+            lines.append(item['name'][:width])
+            detail = f"  {item['quantity']} x ${item['price']:.2f}"
+            amount = f"${line_total:.2f}"
+            lines.append(detail + amount.rjust(width - len(detail)))
+
+        lines.append('-' * width)
+        subtotal = sum(item['price'] * item['quantity'] for item in sale.get('items', []))
+        total = sale.get('total', subtotal)
+        if abs(subtotal - total) >= 0.005:
+            lines.append(self._row('Subtotal', subtotal))
+            if sale.get('discounts'):
+                for discount in sale['discounts']:
+                    lines.append(self._row(discount['name'][:self.WIDTH - 12], -discount['amount']))
+            else:
+                lines.append(self._row('Discount', total - subtotal))
+        lines.append(self._row('TOTAL', total))
+        if sale.get('payment_method'):
+            lines.append(f"Paid by: {sale['payment_method']}")
+        if 'amount_received' in sale:
+            lines.append(self._row('Received', sale['amount_received']))
+            lines.append(self._row('Change', sale.get('change', 0.0)))
+        lines.append('=' * width)
+        lines.append('Thank you for shopping with us!'.center(width))
+        return '\n'.join(lines) + '\n'
+
+    def _row(self, label: str, amount: float) -> str:
+        value = f"${amount:.2f}"
+        return label + value.rjust(self.WIDTH - len(label))
+
+    def _spool(self, sale: Dict) -> Optional[str]:
+        """Render and spool one receipt (runs on a worker thread)."""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(self.output_dir, f"receipt_{sale.get('bill_number', 0):06d}")
+            text = self.render_text(sale)
+
+            # Write to a temp name first so a printer watching the folder never sees half a file
+            text_file = base + '.txt'
+            with open(text_file + '.tmp', 'w') as f:
+                f.write(text)
+            os.replace(text_file + '.tmp', text_file)
+
+            if self.png:
+                self._render_png(text, base + '.png')
+            if self.printer:
+                self._print(text_file)
+            return text_file
+        except Exception as e:
+            print(f"Error spooling receipt: {e}")
+            return None
+
+    def _render_png(self, text: str, image_path: str):
+        """Draw the receipt text onto a white image."""
+        font = ImageFont.load_default()
+        lines = text.splitlines()
+        line_height = 14
+        image = Image.new('RGB', (self.WIDTH * 7 + 20, len(lines) * line_height + 20), 'white')
+        draw = ImageDraw.Draw(image)
+        for i, line in enumerate(lines):
+            draw.text((10, 10 + i * line_height), line, fill='black', font=font)
+        image.save(image_path)
+
+    def _print(self, path: str):
+        """Send a receipt to the configured printer queue.
+
+        On Windows a printer name needs pywin32; without it, receipts go to
+        the default printer and the name is ignored.
+        """
+        if sys.platform.startswith('win'):
+            if self.printer == 'default':
+                os.startfile(path, 'print')
+            elif win32api is not None:
+                win32api.ShellExecute(0, 'printto', path, f'"{self.printer}"', '.', 0)
+            else:
+                if not self._warned_printer:
+                    self._warned_printer = True
+                    print(f"Printing to the default printer: receipt_printer '{self.printer}' "
+                          f"needs pywin32 on Windows")
+                os.startfile(path, 'print')
+            return
+        command = ['lp', path] if self.printer == 'default' else ['lp', '-d', self.printer, path]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
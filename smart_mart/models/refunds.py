@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from .commit_pipeline import CommitPipeline
+from .ledger import TIMESTAMP_FORMAT, format_bill
+from .metrics import REFUNDS
+from .repository import DataRepository
+
+
+class BillRefunds:
+    """Voids and refunds of committed bills.
+
+    A refund is a new ledger entry that reverses all or part of an earlier
+    bill: negative quantities at the bill's prices, a negative total and
+    the number of the bill it reverses. It goes through the commit
+    pipeline like a sale, so the restocking, the ledger entry and the shift
+    totals are one group write. The original bill is found through the
+    bill number index (or the one archived partition that holds it) and
+    its earlier refunds through the refund entries of the index and the
+    manifest, so a refund reads a handful of bills however long the ledger
+    is. A bill can never be refunded beyond what it sold.
+    """
+
+    def __init__(self, repository: DataRepository, username: Optional[str] = None):
+        self.repository = repository
+        self.username = username  # recorded as the cashier of refund bills
+        self.commit_pipeline = CommitPipeline.for_data_dir(repository.data_dir)
+
+    def refundable(self, bill_number: int) -> Optional[Dict]:
+        """Get a sale with ``remaining`` (product ID: quantity not refunded yet) and the ``refunded`` amount.
+
+        Returns None if there is no such bill, or it is a refund itself or
+        has no line items (older ledger formats).
+        """
+        bill = self.repository.find_bill(bill_number)
+        if not bill or bill['refund_of'] or not bill['items']:
+            return None
+        remaining: Dict[str, int] = {}
+        for item in bill['items']:
+            remaining[item['id']] = remaining.get(item['id'], 0) + item['quantity']
+        refunded = 0.0
+        for refund in self.repository.refunds_of(bill_number):
+            for item in refund['items']:
+                remaining[item['id']] = remaining.get(item['id'], 0) + item['quantity']  # refunds are negative
+            refunded -= refund['total']
+        return dict(bill, remaining=remaining, refunded=round(refunded, 2))
+
+    def refund(self, bill_number: int,
+               quantities: Optional[Dict[str, int]] = None) -> Tuple[Optional[int], Optional[str]]:
+        """Refund some quantities of a bill, or all that is left of it, and put them back in stock.
+
+        Returns (refund bill number, None), or (None, reason) if nothing
+        was refunded. The amount is the lines' share of what the customer
+        paid, so promotions are refunded in proportion; refunding the last
+        remaining items pays back exactly what is left of the bill's total.
+        """
+        # Held across the check and the commit, so two refunds of one bill can't both pass
+        with self.repository.products_lock:
+            bill = self.refundable(bill_number)
+            if bill is None:
+                return None, f"no refundable sale with bill number {bill_number}"
+            remaining = {product_id: quantity for product_id, quantity in bill['remaining'].items() if quantity > 0}
+            if quantities is None:
+                quantities = remaining
+            for product_id, quantity in quantities.items():
+                if quantity <= 0:
+                    return None, f"the quantity of '{product_id}' to refund must be positive"
+            if not quantities:
+                return None, "nothing left to refund"
+            for product_id, quantity in quantities.items():
+                if quantity > remaining.get(product_id, 0):
+                    return None, f"only {remaining.get(product_id, 0)} of '{product_id}' can be refunded"
+
+            prices: Dict[str, float] = {}
+            for item in bill['items']:
+                prices.setdefault(item['id'], item['price'])
+            if quantities == remaining:
+                amount = round(bill['total'] - bill['refunded'], 2)
+            else:
+                gross = sum(item['price'] * item['quantity'] for item in bill['items'])
+                refund_gross = sum(prices[product_id] * quantity for product_id, quantity in quantities.items())
+                amount = round(bill['total'] * refund_gross / gross, 2) if gross else 0.0
+
+            items = []
+            for product_id, quantity in quantities.items():
+                product = self.repository.get_product(product_id)
+                items.append({'id': product_id, 'category': product[2] if product else '',
+                              'price': prices[product_id], 'quantity': -quantity})
+            refund = {
+                'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT),
+                'cashier': self.username or '',
+                'payment_method': bill['payment_method'],
+                'total': -amount,
+                'items': items,
+                'discounts': [],
+                'refund_of': bill_number,
+            }
+            stock_deltas = {item['id']: item['quantity'] for item in items}
+            (refund_number, error), = self.commit_pipeline.commit_sales(
+                [(stock_deltas, lambda number: format_bill(number, refund), refund)])
+        if refund_number is not None:
+            REFUNDS.labels('void' if quantities == remaining and not bill['refunded'] else 'refund').inc()
+        return refund_number, error
+
+    def void(self, bill_number: int) -> Tuple[Optional[int], Optional[str]]:
+        """Refund everything of a bill that is not refunded yet."""
+        return self.refund(bill_number)
@@ -0,0 +1,513 @@
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .file_lock import FileLock
+from .bill_index import BillTimeIndex
+from .bill_archive import BillArchive
+from .catalog import CatalogSnapshot, Product
+from .product_query import ProductIndex, ProductQuery
+from .settings import Settings
+from .product_store import product_files_for
+from .journal import Journal
+from .ledger import valid_product_id
+from .metrics import FILE_IO_SECONDS
+from .shared_catalog import SharedCatalogPublisher, SharedCatalogReader
+
+DEFAULT_CATEGORIES = ['Electronics', 'Groceries', 'Clothing', 'Home & Kitchen', 'Sports']
+
+
+class DataRepository:
+    """Single owner of the data directory files: parsing, caching and writes.
+
+    One repository is shared by every Admin and Cashier in the process that
+    uses the same data directory (see ``for_data_dir``). Each file is parsed
+    into a cache once and re-parsed only when its (inode, mtime, size) stamp
+    changes, i.e. when another process rewrote it. Writes made through the
+    repository update the cache in place. Every cache change bumps that
+    file's generation counter, which views can compare to decide whether
+    they need to refresh.
+
+    The product catalog is published as immutable CatalogSnapshot objects.
+    Reading it never takes a lock: ``catalog()`` returns the current
+    snapshot, and a writer replaces the reference only after the new
+    products.txt is in place, so readers never wait for an admin edit.
+    With ``catalog_partitions=yes`` in settings.txt the catalog is kept in
+    one file per category instead (see PartitionedProductFiles).
+
+    With ``shared_catalog=yes`` every catalog this process reads or writes
+    is also published to shared memory (see SharedCatalogPublisher), and a
+    changed catalog is first looked up there: when another process on the
+    host already published exactly the files on disk, it is used in place
+    instead of being parsed into a private copy.
+    """
+
+    _repositories: Dict[str, 'DataRepository'] = {}
+    _repositories_guard = threading.Lock()
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.products_file = os.path.join(data_dir, 'products.txt')
+        self.categories_file = os.path.join(data_dir, 'categories.txt')
+        self.cashiers_file = os.path.join(data_dir, 'cashiers.txt')
+        self.admin_file = os.path.join(data_dir, 'admin.txt')
+        self.bills_file = os.path.join(data_dir, 'bills.txt')
+        self.bill_index = BillTimeIndex(self.bills_file)
+        settings = Settings(data_dir)
+        self.journal = Journal.for_data_dir(data_dir)  # every write is also journaled for hot backups
+        self.bill_archive = BillArchive(data_dir, self.bills_file, settings)
+        self.product_files = product_files_for(data_dir, settings)
+        self.shared_catalog: Optional[SharedCatalogReader] = None
+        self.catalog_publisher: Optional[SharedCatalogPublisher] = None
+        if settings.get_bool('shared_catalog'):
+            self.shared_catalog = SharedCatalogReader(data_dir)
+            self.catalog_publisher = SharedCatalogPublisher(data_dir, self.product_files)
+
+        # Shared with every writer of products.txt, in this process or another
+        self.products_lock = FileLock.for_path(os.path.join(data_dir, 'products.lock'))
+        self.accounts_lock = FileLock.for_path(os.path.join(data_dir, 'accounts.lock'))
+        self.categories_lock = FileLock.for_path(os.path.join(data_dir, 'categories.lock'))
+
+        self._guard = threading.RLock()
+        self._stamps: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._generations: Dict[str, int] = {}
+
+        self._snapshot = CatalogSnapshot(0, {})
+        self._snapshot_guard = threading.Lock()  # only held while re-parsing the catalog
+        self.product_index = ProductIndex()
+        self._categories: List[str] = []
+        self._cashiers: Dict[str, str] = {}  # username: password
+        self._admin: Optional[Tuple[str, str]] = None
+        self._bill_count = 0  # lines in bills.txt; archived lines are counted by the manifest
+        self._bills_counted: Tuple[Optional[int], int, int] = (None, 0, 0)  # (inode, bytes, lines) read so far
+        self._loaders: Dict[str, Tuple[str, Callable[[], None]]] = {
+            'categories': (self.categories_file, self._parse_categories),
+            'cashiers': (self.cashiers_file, self._parse_cashiers),
+            'admin': (self.admin_file, self._parse_admin),
+            'bills': (self.bills_file, self._parse_bills),
+        }
+
+        self.ensure_data_files_exist()
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'DataRepository':
+        """Get the process-wide repository for a data directory."""
+        key = os.path.abspath(data_dir)
+        with cls._repositories_guard:
+            if key not in cls._repositories:
+                cls._repositories[key] = cls(key)
+            return cls._repositories[key]
+
+    def ensure_data_files_exist(self):
+        """Create necessary data files if they don't exist."""
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        # Create admin.txt with default credentials if it doesn't exist
+        if not os.path.exists(self.admin_file):
+            with open(self.admin_file, 'w') as f:
+                f.write('admin,admin123\n')
+
+        # Create categories.txt with the default categories if it doesn't exist
+        if not os.path.exists(self.categories_file):
+            with self.categories_lock:
+                if not os.path.exists(self.categories_file):
+                    self._write_lines(self.categories_file, DEFAULT_CATEGORIES)
+
+        # Create other required files
+        self.product_files.ensure_exists()
+        for path in (self.cashiers_file, self.bills_file):
+            if not os.path.exists(path):
+                open(path, 'a').close()
+
+    def generation(self, name: str) -> int:
+        """Get the change counter of a cached file ('products', 'categories', 'cashiers', 'admin')."""
+        if name == 'products':
+            return self.catalog().version
+        with self._guard:
+            self._sync(name)
+            return self._generations.get(name, 0)
+
+    # Products
+
+    def catalog(self) -> CatalogSnapshot:
+        """Get the current catalog snapshot, re-reading the catalog if another process changed it."""
+        snapshot = self._snapshot
+        if self.product_files.stamp() == snapshot.stamp:
+            return snapshot
+        parsed = None
+        with self._snapshot_guard:
+            stamp = self.product_files.stamp()
+            if stamp != self._snapshot.stamp:
+                shared = self.shared_catalog.snapshot(stamp, self._snapshot.version + 1) if self.shared_catalog else None
+                if shared is not None:
+                    self._snapshot = shared
+                else:
+                    try:
+                        with FILE_IO_SECONDS.labels('catalog_read').time():
+                            products = self.product_files.load()
+                        self._publish(products, stamp)
+                        parsed = self._snapshot
+                    except (OSError, ValueError):
+                        pass
+            snapshot = self._snapshot
+        if parsed is not None and self.catalog_publisher:
+            self.catalog_publisher.submit(parsed.products, parsed.stamp)  # spare other processes the parse
+        return snapshot
+
+    def get_product(self, product_id: str) -> Optional[Product]:
+        """Get product details by ID."""
+        return self.catalog().get(product_id)
+
+    def list_products(self, category: Optional[str] = None) -> List[Product]:
+        """Get all products in file order, or only those of one category."""
+        return self.catalog().list(category)
+
+    def query_products(self, query: ProductQuery, limit: Optional[int] = None) -> List[Product]:
+        """Get the products matching a query, by product ID, through the price, stock and name indexes."""
+        return self.product_index.query(self.catalog(), query, limit)
+
+    def product_ids(self, category: str) -> List[str]:
+        """Get the IDs of every product in a category."""
+        return list(self.catalog().product_ids(category))
+
+    def category_sizes(self) -> Dict[str, int]:
+        """Get the number of products in each category, from the catalog's category postings."""
+        return self.catalog().category_sizes()
+
+    def load_products(self) -> Dict[str, Product]:
+        """Get a copy of the catalog to modify; hold ``products_lock`` until it is written back."""
+        return dict(self.catalog().products.items())
+
+    def write_products(self, products: Dict[str, Product], durable: bool = False,
+                       changed: Optional[Iterable[str]] = None):
+        """Replace the catalog with ``products`` and publish them (caller holds ``products_lock``).
+
+        ``changed`` names the products that differ from the current catalog,
+        if the caller knows; otherwise they are found by comparison.
+        """
+        previous = self._snapshot
+        old = previous.products
+        if changed is None:
+            changed = {product_id for product_id, p in products.items() if old.get(product_id) != p}
+            changed.update(product_id for product_id in old if product_id not in products)
+        else:
+            changed = set(changed)
+        with FILE_IO_SECONDS.labels('catalog_write').time():
+            self.product_files.write(products, durable)
+        if self.journal.enabled and changed:
+            # Journal only what changed, e.g. the stock of the products a sale touched
+            self.journal.record({'op': 'products',
+                                 'set': [list(products[product_id]) for product_id in changed if product_id in products],
+                                 'delete': [product_id for product_id in changed if product_id not in products]},
+                                durable)
+        with self._snapshot_guard:
+            follows = self._snapshot is previous
+            self._publish(dict(products), self.product_files.stamp())
+            snapshot = self._snapshot
+        if follows:
+            # The indexes then move just these products instead of comparing the whole catalog
+            self.product_index.note_changes(snapshot.version, changed)
+        if self.catalog_publisher:
+            self.catalog_publisher.submit(snapshot.products, snapshot.stamp)
+
+    def save_product(self, product: Product) -> bool:
+        """Add a product, or replace the product with the same ID."""
+        if not valid_product_id(product[0]):
+            return False
+        try:
+            with self.products_lock:
+                products = self.load_products()
+                products[product[0]] = product
+                self.write_products(products, changed=[product[0]])
+            return True
+        except OSError:
+            return False
+
+    def delete_product(self, product_id: str) -> bool:
+        """Remove a product."""
+        try:
+            with self.products_lock:
+                products = self.load_products()
+                if products.pop(product_id, None) is None:
+                    return False
+                self.write_products(products, changed=[product_id])
+            return True
+        except OSError:
+            return False
+
+    # Categories
+
+    def list_categories(self) -> List[str]:
+        """Get the category names in file order."""
+        with self._guard:
+            self._sync('categories')
+            return self._categories.copy()
+
+    def has_category(self, category: str) -> bool:
+        """Check whether a category exists."""
+        with self._guard:
+            self._sync('categories')
+            return category in self._categories
+
+    def add_category(self, category: str) -> bool:
+        """Add a new category."""
+        category = category.strip()
+        if not category or ',' in category:
+            return False
+        with self._guard, self.categories_lock:
+            self._sync('categories')
+            if category in self._categories:
+                return False
+            return self._save_categories(self._categories + [category])
+
+    def remove_category(self, category: str) -> bool:
+        """Remove a category that no product belongs to."""
+        with self._guard, self.categories_lock:
+            self._sync('categories')
+            if category not in self._categories or self.product_ids(category):
+                return False
+            return self._save_categories([c for c in self._categories if c != category])
+
+    def _save_categories(self, categories: List[str]) -> bool:
+        try:
+            self._write_lines(self.categories_file, categories)
+            self.journal.record_file(self.categories_file)
+        except OSError:
+            return False
+        self._categories = list(categories)
+        self._changed('categories', self.categories_file)
+        return True
+
+    # Accounts
+
+    def get_admin_credentials(self) -> Optional[Tuple[str, str]]:
+        """Get the (username, password) of the administrator."""
+        with self._guard:
+            self._sync('admin')
+            return self._admin
+
+    def set_admin_password(self, new_password: str) -> bool:
+        """Replace the administrator password."""
+        with self._guard, self.accounts_lock:
+            self._sync('admin')
+            if self._admin is None:
+                return False
+            try:
+                self._write_lines(self.admin_file, [f"{self._admin[0]},{new_password}"])
+                self.journal.record_file(self.admin_file)
+            except OSError:
+                return False
+            self._admin = (self._admin[0], new_password)
+            self._changed('admin', self.admin_file)
+            return True
+
+    def list_cashiers(self) -> List[str]:
+        """Get a list of all cashier usernames."""
+        with self._guard:
+            self._sync('cashiers')
+            return list(self._cashiers)
+
+    def check_cashier(self, username: str, password: str) -> bool:
+        """Verify cashier credentials."""
+        with self._guard:
+            self._sync('cashiers')
+            return username in self._cashiers and self._cashiers[username] == password
+
+    def add_cashier(self, username: str, password: str) -> bool:
+        """Add a new cashier."""
+        with self._guard, self.accounts_lock:
+            self._sync('cashiers')
+            if username in self._cashiers:
+                return False
+            try:
+                with open(self.cashiers_file, 'a') as f:
+                    f.write(f"{username},{password}\n")
+                self.journal.record_file(self.cashiers_file)
+            except OSError:
+                return False
+            self._cashiers[username] = password
+            self._changed('cashiers', self.cashiers_file)
+            return True
+
+    def remove_cashier(self, username: str) -> bool:
+        """Remove a cashier."""
+        with self._guard, self.accounts_lock:
+            self._sync('cashiers')
+            if username not in self._cashiers:
+                return False
+            cashiers = dict(self._cashiers)
+            del cashiers[username]
+            try:
+                self._write_lines(self.cashiers_file, [f"{u},{p}" for u, p in cashiers.items()])
+                self.journal.record_file(self.cashiers_file)
+            except OSError:
+                return False
+            self._cashiers = cashiers
+            self._changed('cashiers', self.cashiers_file)
+            return True
+
+    # Bills
+
+    def bill_count(self) -> int:
+        """Get the number of ledger lines, archived or not (caller holds ``products_lock``)."""
+        with self._guard:
+            self._sync('bills')
+            return self.bill_archive.archived_lines() + self._bill_count
+
+    def rotate_bills_if_due(self) -> bool:
+        """Move bills.txt into a compressed partition if the rotation policy says so (caller holds ``products_lock``)."""
+        with self._guard:
+            try:
+                if not self.bill_archive.rotate_if_due():
+                    return False
+            except OSError:
+                return False  # keep selling into bills.txt; rotation is retried on the next sale
+            self.bill_index.reset()
+            self._sync('bills')
+            return True
+
+    def append_bills(self, lines: List[str], durable: bool = False):
+        """Append bill lines (caller holds ``products_lock``)."""
+        with self._guard:
+            self._sync('bills')
+            data = ''.join(f"{line}\n" for line in lines).encode('utf-8')
+            # Binary and unbuffered, so byte offsets stay exact and a failed append can be cut off
+            with FILE_IO_SECONDS.labels('bills_append').time(), open(self.bills_file, 'ab', buffering=0) as f:
+                offset = f.seek(0, os.SEEK_END)
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[f.write(view):]
+                    if durable:
+                        os.fsync(f.fileno())
+                except OSError:
+                    # Leave no partial bill behind; the caller treats the whole append as failed
+                    try:
+                        os.ftruncate(f.fileno(), offset)
+                    except OSError:
+                        pass
+                    raise
+                size = offset + len(data)
+            self.journal.record({'op': 'bills', 'lines': lines}, durable)
+            self._bill_count += len(lines)
+            self._bills_counted = (self._bills_counted[0], size, self._bill_count)
+            self._stamps['bills'] = self._stamp(self.bills_file)
+            self.bill_index.record(offset, lines)
+
+    def bills_between(self, start: datetime, end: datetime) -> List[Dict]:
+        """Get the bills with start <= timestamp < end from the needed partitions and the time index."""
+        return self.bill_archive.bills_between(start, end) + self.bill_index.query(start, end)
+
+    def iter_bills_between(self, start: datetime, end: datetime) -> Iterator[Dict]:
+        """Stream the bills with start <= timestamp < end, holding one bill of the archive at a time."""
+        yield from self.bill_archive.iter_between(start, end)
+        yield from self.bill_index.query(start, end)
+
+    def find_bill(self, bill_number: int) -> Optional[Dict]:
+        """Get a bill by number through the bill number index of bills.txt, or its archived partition."""
+        if bill_number > self.bill_archive.archived_lines():
+            bill = self.bill_index.find(bill_number)
+            if bill is not None:
+                return bill
+        return self.bill_archive.find_bill(bill_number)
+
+    def refunds_of(self, bill_number: int) -> List[Dict]:
+        """Get the refunds and voids that reverse a bill, oldest first."""
+        refunds = [self.bill_archive.find_bill(number) for number in self.bill_archive.refunds_of(bill_number)]
+        return [refund for refund in refunds if refund] + self.bill_index.refunds_of(bill_number)
+
+    def revenue_between(self, start: datetime, end: datetime) -> Dict:
+        """Get bill count and revenue between two times, using partition totals where possible."""
+        archived = self.bill_archive.summarize(start, end)
+        active = self.bill_index.summarize(start, end)
+        return {'sales': archived['sales'] + active['sales'],
+                'total': round(archived['total'] + active['total'], 2)}
+
+    # Cache maintenance
+
+    def _stamp(self, path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _changed(self, name: str, path: str):
+        self._stamps[name] = self._stamp(path)
+        self._generations[name] = self._generations.get(name, 0) + 1
+
+    def _sync(self, name: str):
+        """Re-parse a file if it changed on disk since it was cached."""
+        path, parse = self._loaders[name]
+        stamp = self._stamp(path)
+        if name in self._stamps and stamp == self._stamps[name]:
+            return
+        try:
+            with FILE_IO_SECONDS.labels(f'{name}_read').time():
+                parse()
+        except (OSError, ValueError):
+            return
+        self._stamps[name] = stamp
+        self._generations[name] = self._generations.get(name, 0) + 1
+
+    def _publish(self, products: Dict[str, Product], stamp):
+        """Swap in a new catalog snapshot; readers holding the old one are unaffected."""
+        self._snapshot = CatalogSnapshot(self._snapshot.version + 1, products, stamp)
+
+    def _parse_categories(self):
+        categories: List[str] = []
+        with open(self.categories_file, 'r') as f:
+            for line in f:
+                name = line.strip()
+                if name and name not in categories:
+                    categories.append(name)
+        self._categories = categories
+
+    def _parse_cashiers(self):
+        cashiers: Dict[str, str] = {}
+        with open(self.cashiers_file, 'r') as f:
+            for line in f:
+                data = line.strip().split(',')
+                if len(data) == 2:
+                    cashiers[data[0]] = data[1]
+        self._cashiers = cashiers
+
+    def _parse_admin(self):
+        with open(self.admin_file, 'r') as f:
+            data = f.readline().strip().split(',')
+        self._admin = (data[0], data[1]) if len(data) == 2 else None
+
+    def _parse_bills(self):
+        """Count bills.txt lines, reading only what was appended since the last count."""
+        inode, offset, count = self._bills_counted
+        with open(self.bills_file, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != inode or st.st_size < offset:
+                offset, count = 0, 0
+            f.seek(offset)
+            partial = 0
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    partial = 1  # counted, but read again once it is complete
+                    break
+                offset += len(raw)
+                count += 1
+        self._bills_counted = (st.st_ino, offset, count)
+        self._bill_count = count + partial
+
+    def _write_lines(self, path: str, lines: List[str], durable: bool = False):
+        """Atomically replace a file with the given lines."""
+        temp_file = path + '.tmp'
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with FILE_IO_SECONDS.labels(f'{name}_write').time(), open(temp_file, 'w') as f:
+                for line in lines:
+                    f.write(f"{line}\n")
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_file, path)
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
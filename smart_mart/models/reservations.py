@@ -0,0 +1,181 @@
+import os
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from .file_lock import FileLock
+
+
+class ReservationTable:
+    """Stock held by open carts, shared by every till using a data directory.
+
+    Each hold belongs to a cart (the holder) and expires after a TTL unless
+    the cart touches it again. Holds are kept in ``reservations.txt`` so tills
+    in other processes see them; in memory a per-product running total makes
+    ``reserved()`` a dictionary lookup.
+    """
+
+    DEFAULT_TTL = 15 * 60  # seconds a cart may hold stock without activity
+
+    _tables: Dict[str, 'ReservationTable'] = {}
+    _tables_guard = threading.Lock()
+
+    def __init__(self, data_dir: str, ttl: float = DEFAULT_TTL):
+        self.data_dir = data_dir
+        self.ttl = ttl
+        self.reservations_file = os.path.join(data_dir, 'reservations.txt')
+        self.lock = FileLock.for_path(os.path.join(data_dir, 'reservations.lock'))
+        self._guard = threading.RLock()
+        self._holds: Dict[Tuple[str, str], Tuple[int, float]] = {}  # (holder, product_id): (quantity, expires_at)
+        self._reserved: Dict[str, int] = {}  # product_id: total quantity held
+        self._expiry: List[Tuple[float, str, str]] = []  # heap of (expires_at, holder, product_id)
+        self._file_stamp: Optional[Tuple[int, int, int]] = None
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'ReservationTable':
+        """Get the process-wide reservation table for a data directory."""
+        key = os.path.abspath(data_dir)
+        with cls._tables_guard:
+            if key not in cls._tables:
+                cls._tables[key] = cls(key)
+            return cls._tables[key]
+
+    def reserved(self, product_id: str, exclude_holder: Optional[str] = None) -> int:
+        """Get the quantity of a product held by carts, optionally ignoring one cart."""
+        with self._guard:
+            self._sync()
+            total = self._reserved.get(product_id, 0)
+            if exclude_holder is not None:
+                hold = self._holds.get((exclude_holder, product_id))
+                if hold:
+                    total -= hold[0]
+            return total
+
+    def reserve(self, holder: str, product_id: str, quantity: int, stock: int, touch_all: bool = False) -> bool:
+        """Hold ``quantity`` units for a cart if ``stock`` covers every other hold.
+
+        The quantity replaces whatever the cart held before for this product.
+        With ``touch_all``, the cart's other holds get the same fresh expiry
+        in the same save, as ``touch`` would.
+        """
+        if quantity <= 0:
+            return self.release(holder, product_id, touch_all)
+
+        with self._guard, self.lock:
+            self._sync()
+            held_by_others = self._reserved.get(product_id, 0)
+            current = self._holds.get((holder, product_id))
+            if current:
+                held_by_others -= current[0]
+            if held_by_others + quantity > stock:
+                return False
+
+            expires_at = time.time() + self.ttl
+            self._set_hold(holder, product_id, quantity, expires_at)
+            if touch_all:
+                self._extend(holder, expires_at)
+            self._save()
+            return True
+
+    def release(self, holder: str, product_id: Optional[str] = None, touch_all: bool = False) -> bool:
+        """Release one product, or every product, held by a cart; ``touch_all`` as for ``reserve``."""
+        with self._guard, self.lock:
+            self._sync()
+            if product_id is None:
+                keys = [key for key in self._holds if key[0] == holder]
+            else:
+                keys = [(holder, product_id)] if (holder, product_id) in self._holds else []
+            for key in keys:
+                self._drop_hold(key)
+            extended = touch_all and self._extend(holder, time.time() + self.ttl)
+            if keys or extended:
+                self._save()
+            return bool(keys)
+
+    def touch(self, holder: str):
+        """Extend the expiry of every hold belonging to a cart."""
+        with self._guard, self.lock:
+            self._sync()
+            if self._extend(holder, time.time() + self.ttl):
+                self._save()
+
+    def _extend(self, holder: str, expires_at: float) -> bool:
+        """Give every hold of a cart a new expiry in memory; tell whether it has any."""
+        keys = [key for key in self._holds if key[0] == holder]
+        for key in keys:
+            self._set_hold(key[0], key[1], self._holds[key][0], expires_at)
+        return bool(keys)
+
+    def _set_hold(self, holder: str, product_id: str, quantity: int, expires_at: float):
+        key = (holder, product_id)
+        previous = self._holds.get(key)
+        delta = quantity - (previous[0] if previous else 0)
+        self._holds[key] = (quantity, expires_at)
+        self._reserved[product_id] = self._reserved.get(product_id, 0) + delta
+        if previous and previous[1] == expires_at:
+            return  # its heap entry is still current
+        heapq.heappush(self._expiry, (expires_at, holder, product_id))
+        # Every touch leaves a stale entry behind; rebuild once they outnumber the holds
+        if len(self._expiry) > 2 * len(self._holds) + 64:
+            self._expiry = [(expires, holder, product_id)
+                            for (holder, product_id), (_, expires) in self._holds.items()]
+            heapq.heapify(self._expiry)
+
+    def _drop_hold(self, key: Tuple[str, str]):
+        quantity, _ = self._holds.pop(key)
+        remaining = self._reserved.get(key[1], 0) - quantity
+        if remaining > 0:
+            self._reserved[key[1]] = remaining
+        else:
+            self._reserved.pop(key[1], None)
+
+    def _expire(self):
+        """Drop holds whose TTL has passed; stale heap entries are skipped."""
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, holder, product_id = heapq.heappop(self._expiry)
+            hold = self._holds.get((holder, product_id))
+            if hold and hold[1] == expires_at:
+                self._drop_hold((holder, product_id))
+
+    def _sync(self):
+        """Reload holds if another process changed the file, then expire old ones."""
+        try:
+            st = os.stat(self.reservations_file)
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp != self._file_stamp:
+            self._load()
+            self._file_stamp = stamp
+        self._expire()
+
+    def _load(self):
+        self._holds.clear()
+        self._reserved.clear()
+        self._expiry = []
+        now = time.time()
+        try:
+            with open(self.reservations_file, 'r') as f:
+                for line in f:
+                    data = line.strip().split(',')
+                    if len(data) != 4:
+                        continue
+                    holder, product_id, quantity, expires_at = data[0], data[1], int(data[2]), float(data[3])
+                    if expires_at > now:
+                        self._set_hold(holder, product_id, quantity, expires_at)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        temp_file = os.path.join(self.data_dir, 'reservations_temp.txt')
+        try:
+            with open(temp_file, 'w') as f:
+                for (holder, product_id), (quantity, expires_at) in self._holds.items():
+                    f.write(f"{holder},{product_id},{quantity},{expires_at:.3f}\n")
+            os.replace(temp_file, self.reservations_file)
+            st = os.stat(self.reservations_file)
+            self._file_stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
@@ -0,0 +1,84 @@
+import os
+from typing import Dict, Optional
+
+
+class Settings:
+    """Per-store settings read from ``settings.txt`` in the data directory.
+
+    The file holds one ``key=value`` pair per line; blank lines and lines
+    starting with ``#`` are ignored. Missing keys fall back to DEFAULTS.
+    """
+
+    DEFAULTS: Dict[str, str] = {
+        'durability': 'group',  # none, sale or group
+        'group_commit_ms': '5',
+        'receipt_dir': 'receipts',  # relative to the data directory
+        'receipt_printer': '',  # printer queue name, 'default', or empty to only spool files
+        'receipt_png': 'yes',
+        'receipt_workers': '2',
+        'thumbnails': 'no',  # product images in the cashier's catalog and cart
+        'image_dir': 'images',  # relative to the data directory; <product ID>.png/.jpg/...
+        'thumbnail_size': '24',  # pixels; keep below the table row height
+        'thumbnail_cache': '512',  # thumbnails kept in memory per window
+        'thumbnail_workers': '2',
+        'ledger_rotation': 'daily',  # daily, size or none
+        'ledger_rotate_mb': '64',  # bills.txt size that triggers size rotation
+        'ledger_compression': 'xz',  # xz, gz or none
+        'catalog_partitions': 'no',  # keep the catalog in one file per category
+        'catalog_workers': '4',  # threads reading catalog partitions
+        'shared_catalog': 'no',  # share one in-memory catalog between the processes of this host
+        'journal': 'no',  # journal every write, for hot backups (backup.py needs it on)
+        'journal_segment_mb': '16',
+        'audit_batch': '256',  # admin changes buffered before one append to audit.log
+        'audit_flush_ms': '1000',
+        'forecast_history_days': '365',  # ledger days read by the replenishment forecast
+        'forecast_velocity_days': '28',  # recent days that set the sales velocity
+        'forecast_lead_days': '7',  # days from order to delivery
+        'forecast_review_days': '7',  # days until the next order
+        'forecast_service_z': '1.65',  # safety stock in standard deviations of daily demand
+        'kiosk_results': '50',  # products listed per price-check search
+        'kiosk_refresh_ms': '2000',  # how often the price-check screen looks for catalog changes
+    }
+
+    def __init__(self, data_dir: str):
+        self.settings_file = os.path.join(data_dir, 'settings.txt')
+        self.values: Dict[str, str] = dict(self.DEFAULTS)
+        self.load()
+
+    def load(self):
+        """Read the settings file over the defaults."""
+        try:
+            with open(self.settings_file, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#') or '=' not in line:
+                        continue
+                    key, value = line.split('=', 1)
+                    self.values[key.strip()] = value.strip()
+        except OSError:
+            pass
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a setting as a string."""
+        return self.values.get(key, default)
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        """Get a setting as an integer."""
+        try:
+            return int(self.values[key])
+        except (KeyError, ValueError):
+            return default
+
+    def get_float(self, key: str, default: float = 0.0) -> float:
+        """Get a setting as a float."""
+        try:
+            return float(self.values[key])
+        except (KeyError, ValueError):
+            return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        """Get a setting as a boolean (yes/true/1/on)."""
+        value = self.values.get(key)
+        if value is None:
+            return default
+        return value.lower() in ('1', 'yes', 'true', 'on')
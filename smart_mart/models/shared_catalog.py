@@ -0,0 +1,420 @@
+import os
+import json
+import time
+import zlib
+import struct
+import hashlib
+import threading
+from collections.abc import Mapping
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple
+from .catalog import Product
+from .file_lock import FileLock
+
+MAGIC = b'SMCAT001'
+CONTROL = struct.Struct('<8sQ64s')  # magic, sequence (odd while publishing), data segment name
+HEADER = struct.Struct('<8sIIIIIII')  # magic, products, index slots, id/name/category widths, categories, stamp bytes
+HEADER_BYTES = 64
+EMPTY = -1
+
+
+def segment_base(data_dir: str) -> str:
+    """Get the shared memory name prefix of a data directory's catalog."""
+    return 'smcat_' + hashlib.sha1(os.path.abspath(data_dir).encode('utf-8')).hexdigest()[:12]
+
+
+def stamp_key(stamp) -> str:
+    """Get a catalog stamp as text that compares equal across processes."""
+    return json.dumps(stamp)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Map an existing segment without letting this process's resource tracker unlink it on exit."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:  # not tracked on this platform
+        pass
+    return shm
+
+
+def _unlink(shm: shared_memory.SharedMemory):
+    """Remove a segment's name; mapped readers keep their mapping."""
+    # unlink() also unregisters from the resource tracker, which never saw segments from _attach
+    try:
+        resource_tracker.register(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    shm.unlink()
+
+
+def _width(values) -> int:
+    """Round the longest encoded value up to 8 bytes."""
+    longest = max((len(value) for value in values), default=1)
+    return max(8, (longest + 7) // 8 * 8)
+
+
+class SharedProducts(Mapping):
+    """Read-only ``product_id: Product`` mapping over a catalog segment.
+
+    Products are decoded from their fixed-width record on access; nothing
+    is copied into the process up front.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self._shm = shm
+        buf = shm.buf
+        magic, self._count, self._slots, id_width, name_width, category_width, categories, stamp_bytes = \
+            HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a catalog segment")
+        self._record = struct.Struct(f'<{id_width}s{name_width}s{category_width}sdq')
+        self._id_width = id_width
+        self._id = struct.Struct(f'<{id_width}s')
+        self._slot = struct.Struct('<i')
+        self.stamp_key = bytes(buf[HEADER_BYTES:HEADER_BYTES + stamp_bytes]).decode('utf-8')
+        self._records_at = HEADER_BYTES + (stamp_bytes + 7) // 8 * 8
+        self._index_at = self._records_at + self._count * self._record.size
+        self._categories_at = self._index_at + self._slots * 4
+        self._category_entry = struct.Struct(f'<{category_width}sII')
+        self._postings_at = self._categories_at + categories * self._category_entry.size
+        self._postings: Dict[str, Tuple[int, int]] = {}
+        for i in range(categories):
+            name, start, count = self._category_entry.unpack_from(buf, self._categories_at + i * self._category_entry.size)
+            self._postings[name.rstrip(b'\0').decode('utf-8')] = (start, count)
+
+    def record(self, index: int) -> Product:
+        """Decode the product stored in record ``index``."""
+        product_id, name, category, price, quantity = self._record.unpack_from(
+            self._shm.buf, self._records_at + index * self._record.size)
+        return (product_id.rstrip(b'\0').decode('utf-8'), name.rstrip(b'\0').decode('utf-8'),
+                category.rstrip(b'\0').decode('utf-8'), price, quantity)
+
+    def find(self, product_id: str) -> int:
+        """Get the record index of a product from the hash index, or -1."""
+        key = product_id.encode('utf-8')
+        if len(key) > self._id_width or not self._slots:
+            return EMPTY
+        buf = self._shm.buf
+        mask = self._slots - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            index, = self._slot.unpack_from(buf, self._index_at + slot * 4)
+            if index == EMPTY:
+                return EMPTY
+            if self._id.unpack_from(buf, self._records_at + index * self._record.size)[0].rstrip(b'\0') == key:
+                return index
+            slot = (slot + 1) & mask
+
+    def category_indexes(self, category: str) -> List[int]:
+        """Get the record indexes of a category's products in file order."""
+        start, count = self._postings.get(category, (0, 0))
+        return list(struct.unpack_from(f'<{count}i', self._shm.buf, self._postings_at + start * 4))
+
+    def categories(self) -> List[str]:
+        """Get the categories that have at least one product."""
+        return list(self._postings)
+
+    def category_sizes(self) -> Dict[str, int]:
+        """Get the number of products in each category, from the postings table alone."""
+        return {category: count for category, (_, count) in self._postings.items()}
+
+    def __getitem__(self, product_id: str) -> Product:
+        index = self.find(product_id)
+        if index == EMPTY:
+            raise KeyError(product_id)
+        return self.record(index)
+
+    def get(self, product_id: str, default=None):
+        index = self.find(product_id)
+        return default if index == EMPTY else self.record(index)
+
+    def __contains__(self, product_id) -> bool:
+        return isinstance(product_id, str) and self.find(product_id) != EMPTY
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self.record(i)[0]
+
+    def values(self):
+        return [self.record(i) for i in range(self._count)]
+
+    def items(self):
+        return [(product[0], product) for product in self.values()]
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class SharedCatalogSnapshot:
+    """A CatalogSnapshot backed by a shared memory segment instead of a dict."""
+
+    __slots__ = ('version', 'stamp', 'products', 'generation')
+
+    def __init__(self, version: int, products: SharedProducts, stamp, generation: int):
+        self.version = version
+        self.stamp = stamp
+        self.products = products
+        self.generation = generation
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Get a product by ID."""
+        return self.products.get(product_id)
+
+    def list(self, category: Optional[str] = None) -> List[Product]:
+        """Get all products in file order, or only those of one category."""
+        if category is None:
+            return self.products.values()
+        return [self.products.record(i) for i in self.products.category_indexes(category)]
+
+    def product_ids(self, category: str) -> Tuple[str, ...]:
+        """Get the IDs of every product in a category."""
+        return tuple(self.products.record(i)[0] for i in self.products.category_indexes(category))
+
+    def categories(self):
+        """Get the categories that have at least one product."""
+        return self.products.categories()
+
+    def category_sizes(self) -> Dict[str, int]:
+        """Get the number of products in each category that has any."""
+        return self.products.category_sizes()
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+
+class SharedCatalogPublisher:
+    """Publishes a data directory's catalog into shared memory for every process on the host.
+
+    Each catalog version goes into a new, immutable segment: a header, the
+    catalog stamp, fixed-width ``id,name,category,price,quantity`` records
+    in file order, an open-addressing hash index of record numbers keyed
+    by CRC-32 of the product ID, and per-category postings. A small
+    control segment names the current one; its sequence number is odd
+    while it is being switched, so readers retry instead of reading a torn
+    name. The previous segment is unlinked once the new one is named, and
+    stays mapped in the readers still using it.
+
+    Any process may publish. Publishers are serialized by
+    ``catalog_publish.lock``, and with ``product_files`` a catalog is only
+    published while its stamp is still that of the files on disk, so an
+    older catalog never replaces a newer one. ``submit`` publishes on a
+    background thread, keeping only the latest catalog when writes come
+    faster than segments can be built.
+    """
+
+    def __init__(self, data_dir: str, product_files=None):
+        self.base = segment_base(data_dir)
+        self.product_files = product_files
+        self.lock = FileLock.for_path(os.path.join(data_dir, 'catalog_publish.lock'))
+        self._control: Optional[shared_memory.SharedMemory] = None
+        self._current: Optional[shared_memory.SharedMemory] = None  # kept open: Windows frees unreferenced segments
+        self._latest: Optional[Tuple[Mapping, object]] = None
+        self._latest_ready = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, products: Mapping, stamp):
+        """Publish a catalog in the background, superseding any catalog not yet published."""
+        with self._latest_ready:
+            self._latest = (products, stamp)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._publish_loop, name='catalog-publisher', daemon=True)
+                self._worker.start()
+            self._latest_ready.notify()
+
+    def publish(self, products: Mapping, stamp) -> Optional[int]:
+        """Write a catalog into a new segment and switch readers to it.
+
+        Returns the new generation, or None if the catalog files changed
+        since ``stamp`` and the catalog was not published.
+        """
+        with self.lock:
+            if self.product_files is not None and self.product_files.stamp() != stamp:
+                return None
+            return self._publish(products, stamp)
+
+    def _publish_loop(self):
+        while True:
+            with self._latest_ready:
+                while self._latest is None:
+                    self._latest_ready.wait()
+                (products, stamp), self._latest = self._latest, None
+            try:
+                self.publish(products, stamp)
+            except (OSError, ValueError):
+                pass  # readers keep parsing the catalog files themselves
+
+    def _publish(self, products: Mapping, stamp) -> int:
+        if self._control is None or CONTROL.unpack_from(self._control.buf, 0)[0] != MAGIC:
+            self._control = self._open_control()
+        _, sequence, previous = CONTROL.unpack_from(self._control.buf, 0)
+        sequence += sequence % 2  # a publisher died mid-switch; the name it wrote is complete or unused
+        generation = sequence // 2 + 1
+
+        data = self._build(products, stamp)
+        segment = self._create(f"{self.base}_{generation}", len(data))
+        segment.buf[:len(data)] = data
+
+        # Fill the new segment completely before any reader can find it
+        buf = self._control.buf
+        struct.pack_into('<Q', buf, 8, sequence + 1)
+        struct.pack_into('<64s', buf, 16, segment.name.lstrip('/').encode('ascii'))
+        struct.pack_into('<Q', buf, 8, sequence + 2)
+
+        previous = previous.rstrip(b'\0').decode('ascii')
+        if previous:
+            try:
+                _unlink(_attach(previous))
+            except FileNotFoundError:
+                pass
+        if self._current is not None:
+            self._current.close()
+        self._current = segment
+        return generation
+
+    def unpublish(self):
+        """Remove the published catalog; readers go back to parsing the catalog files."""
+        try:
+            control = _attach(self.base)
+        except FileNotFoundError:
+            return
+        name = CONTROL.unpack_from(control.buf, 0)[2].rstrip(b'\0').decode('ascii')
+        struct.pack_into('<8s', control.buf, 0, b'')  # tells mapped readers and publishers to let go
+        _unlink(control)
+        control.close()
+        if name:
+            try:
+                _unlink(_attach(name))
+            except FileNotFoundError:
+                pass
+        if self._current is not None:
+            self._current.close()
+        self._current = self._control = None
+
+    def _build(self, products: Mapping, stamp) -> bytearray:
+        """Lay out a catalog segment."""
+        values = list(products.values())
+        encoded = [(p[0].encode('utf-8'), p[1].encode('utf-8'), p[2].encode('utf-8')) for p in values]
+        id_width = _width(e[0] for e in encoded)
+        name_width = _width(e[1] for e in encoded)
+        category_width = _width(e[2] for e in encoded)
+        record = struct.Struct(f'<{id_width}s{name_width}s{category_width}sdq')
+        category_entry = struct.Struct(f'<{category_width}sII')
+
+        postings: Dict[bytes, List[int]] = {}
+        for i, e in enumerate(encoded):
+            postings.setdefault(e[2], []).append(i)
+        slots = 1
+        while slots < len(encoded) * 2:  # at most half full keeps probe chains short
+            slots *= 2
+        stamp_bytes = stamp_key(stamp).encode('utf-8')
+
+        records_at = HEADER_BYTES + (len(stamp_bytes) + 7) // 8 * 8
+        index_at = records_at + len(encoded) * record.size
+        categories_at = index_at + slots * 4
+        postings_at = categories_at + len(postings) * category_entry.size
+        data = bytearray(postings_at + len(encoded) * 4)
+
+        HEADER.pack_into(data, 0, MAGIC, len(encoded), slots, id_width, name_width, category_width,
+                         len(postings), len(stamp_bytes))
+        data[HEADER_BYTES:HEADER_BYTES + len(stamp_bytes)] = stamp_bytes
+        table = [EMPTY] * slots
+        mask = slots - 1
+        for i, (e, product) in enumerate(zip(encoded, values)):
+            record.pack_into(data, records_at + i * record.size, e[0], e[1], e[2], product[3], product[4])
+            slot = zlib.crc32(e[0]) & mask
+            while table[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            table[slot] = i
+        struct.pack_into(f'<{slots}i', data, index_at, *table)
+
+        start = 0
+        flat: List[int] = []
+        for j, (category, indexes) in enumerate(postings.items()):
+            category_entry.pack_into(data, categories_at + j * category_entry.size, category, start, len(indexes))
+            flat.extend(indexes)
+            start += len(indexes)
+        struct.pack_into(f'<{len(flat)}i', data, postings_at, *flat)
+        return data
+
+    def _create(self, name: str, size: int) -> shared_memory.SharedMemory:
+        """Create a segment that outlives this process, replacing one leaked under the same name."""
+        try:
+            segment = shared_memory.SharedMemory(name=name, create=True, size=max(1, size))
+        except FileExistsError:
+            _unlink(_attach(name))
+            segment = shared_memory.SharedMemory(name=name, create=True, size=max(1, size))
+        # The current catalog must survive its publisher exiting; the next publish unlinks it
+        try:
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        except Exception:
+            pass
+        return segment
+
+    def _open_control(self) -> shared_memory.SharedMemory:
+        try:
+            control = _attach(self.base)
+        except FileNotFoundError:
+            control = self._create(self.base, CONTROL.size)
+        if CONTROL.unpack_from(control.buf, 0)[0] != MAGIC:
+            CONTROL.pack_into(control.buf, 0, MAGIC, 0, b'')
+        return control
+
+
+class SharedCatalogReader:
+    """Maps the catalog segment published for a data directory, read-only.
+
+    ``snapshot`` returns the published catalog only if it was built from
+    the catalog files with the given stamp, so a reader never sees a
+    catalog older than the files on disk; otherwise the caller parses the
+    files itself as usual.
+    """
+
+    RETRIES = 100
+
+    def __init__(self, data_dir: str):
+        self.base = segment_base(data_dir)
+        self._control: Optional[shared_memory.SharedMemory] = None
+        self._sequence: Optional[int] = None
+        self._products: Optional[SharedProducts] = None
+        self._guard = threading.Lock()
+
+    def snapshot(self, stamp, version: int) -> Optional[SharedCatalogSnapshot]:
+        """Get the shared catalog for files with ``stamp`` as snapshot ``version``, or None."""
+        with self._guard:
+            products = self._map()
+            if products is None or products.stamp_key != stamp_key(stamp):
+                return None
+            return SharedCatalogSnapshot(version, products, stamp, self._sequence // 2)
+
+    def _map(self) -> Optional[SharedProducts]:
+        """Remap when the publisher switched segments; None if nothing is published."""
+        try:
+            if self._control is None:
+                self._control = _attach(self.base)
+            for _ in range(self.RETRIES):
+                magic, sequence, name = CONTROL.unpack_from(self._control.buf, 0)
+                if magic != MAGIC:
+                    # Unpublished; a later publish creates a new control segment
+                    self._control.close()
+                    self._control = None
+                    return None
+                if sequence == 0:
+                    return None
+                if sequence == self._sequence:
+                    return self._products
+                if sequence % 2:
+                    time.sleep(0)  # the publisher is switching segments
+                    continue
+                name = name.rstrip(b'\0').decode('ascii')
+                if CONTROL.unpack_from(self._control.buf, 0)[1] != sequence:
+                    continue
+                try:
+                    products = SharedProducts(_attach(name))
+                except FileNotFoundError:
+                    continue  # already replaced by a newer one
+                self._sequence, self._products = sequence, products
+                return products
+        except (FileNotFoundError, ValueError, OSError):
+            self._control = None
+        return None
@@ -0,0 +1,203 @@
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .ledger import TIMESTAMP_FORMAT
+from .journal import Journal
+
+
+def sale_summary(sale: Dict) -> Dict:
+    """Keep only what the totals use of a committed sale."""
+    summary = {
+        'bill_number': sale.get('bill_number'),
+        'total': sale['total'],
+        'payment_method': sale.get('payment_method'),
+        'cashier': sale.get('cashier'),
+        'items': [{'category': item.get('category'), 'price': item['price'], 'quantity': item['quantity']}
+                  for item in sale['items']],
+    }
+    if sale.get('refund_of'):
+        summary['refund_of'] = sale['refund_of']
+    return summary
+
+
+def add_sales(totals: Dict, sales: List[Dict]):
+    """Add sales to a totals dict; sales at or below its ``last_bill`` are already counted and skipped.
+
+    A refund is not a sale: ``sales``, ``items`` and ``by_cashier`` count
+    only sales, and refunds are counted in ``refunds``, ``refunded``,
+    ``items_refunded`` and ``refunds_by_cashier`` (under the user who gave
+    the money back). ``total``, ``by_payment_method`` and ``by_category``
+    are net: a refund takes its amount off them, since it leaves the
+    drawer through the payment method of the bill it reverses.
+    """
+    for sale in sales:
+        if sale.get('bill_number') is not None and sale['bill_number'] <= (totals['last_bill'] or 0):
+            continue  # replayed over totals that already hold it
+        amount = sale['total']
+        units = sum(item['quantity'] for item in sale['items'])
+        cashier = sale.get('cashier') or 'Unknown'
+        if sale.get('refund_of'):
+            count = 0
+            totals['refunds'] = totals.get('refunds', 0) + 1
+            totals['refunded'] = round(totals.get('refunded', 0.0) - amount, 2)
+            totals['items_refunded'] = totals.get('items_refunded', 0) - units
+            _add(totals.setdefault('refunds_by_cashier', {}), cashier, -amount)
+        else:
+            count = 1
+            totals['sales'] += 1
+            totals['items'] += units
+            _add(totals['by_cashier'], cashier, amount)
+        totals['total'] = round(totals['total'] + amount, 2)
+        _add(totals['by_payment_method'], sale.get('payment_method') or 'Unknown', amount, count)
+        # Category totals are gross line amounts, before payment discounts
+        for item in sale['items']:
+            _add(totals['by_category'], item.get('category') or 'Unknown',
+                 item['price'] * item['quantity'], count)
+        totals['last_bill'] = sale.get('bill_number', totals['last_bill'])
+        if totals['first_bill'] is None:
+            totals['first_bill'] = totals['last_bill']
+
+
+def _add(group: Dict, key: str, amount: float, count: int = 1):
+    entry = group.setdefault(key, {'sales': 0, 'total': 0.0})
+    entry['sales'] += count
+    entry['total'] = round(entry['total'] + amount, 2)
+
+
+class ShiftTotals:
+    """Running sales totals for the open business day, kept in ``shift_totals.json``.
+
+    The commit pipeline calls ``record_sales`` for every committed group while
+    it still holds the products lock, so the totals always agree with
+    bills.txt. An X-report just reads them; closing the day (Z-report)
+    snapshots them into ``z_reports/`` and starts a fresh day. Neither
+    depends on the size of the ledger.
+    """
+
+    _instances: Dict[str, 'ShiftTotals'] = {}
+    _instances_guard = threading.Lock()
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.totals_file = os.path.join(data_dir, 'shift_totals.json')
+        self.reports_dir = os.path.join(data_dir, 'z_reports')
+        self.journal = Journal.for_data_dir(data_dir)
+        self._guard = threading.RLock()
+        self._totals: Dict = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'ShiftTotals':
+        """Get the process-wide totals for a data directory."""
+        key = os.path.abspath(data_dir)
+        with cls._instances_guard:
+            if key not in cls._instances:
+                cls._instances[key] = cls(key)
+            return cls._instances[key]
+
+    def record_sales(self, sales: List[Dict], durable: bool = False):
+        """Add committed sales to the running totals (caller holds the products lock)."""
+        if not sales:
+            return
+        with self._guard:
+            self._sync()
+            sales = [sale_summary(sale) for sale in sales]
+            add_sales(self._totals, sales)
+            # The journal gets the sales, not the whole file, so each commit journals only its own bills
+            self.journal.record({'op': 'totals', 'sales': sales}, durable)
+            self._save(durable)
+
+    def x_report(self) -> Dict:
+        """Get a copy of the current day's totals without resetting them."""
+        with self._guard:
+            self._sync()
+            return json.loads(json.dumps(self._totals))
+
+    def close_day(self, lock) -> Dict:
+        """Snapshot the day's totals as a Z-report and reset them.
+
+        ``lock`` is the products lock, so no sale can commit half-way through.
+        """
+        with lock, self._guard:
+            self._sync()
+            report = json.loads(json.dumps(self._totals))
+            report['closed_at'] = datetime.now().strftime(TIMESTAMP_FORMAT)
+
+            os.makedirs(self.reports_dir, exist_ok=True)
+            report_file = os.path.join(self.reports_dir, f"z_{report['z_number']:05d}.json")
+            with open(report_file, 'w') as f:
+                json.dump(report, f, indent=2)
+            self.journal.record_file(report_file)
+
+            self._totals = self._empty(report['z_number'] + 1)
+            self._save(durable=True)
+            self.journal.record_file(self.totals_file, durable=True)  # once a day, the fresh totals
+            return report
+
+    def list_z_reports(self) -> List[str]:
+        """Get the file names of past Z-reports, oldest first."""
+        try:
+            return sorted(name for name in os.listdir(self.reports_dir) if name.endswith('.json'))
+        except OSError:
+            return []
+
+    def _empty(self, z_number: int = 1) -> Dict:
+        return {
+            'z_number': z_number,
+            'opened_at': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'sales': 0,
+            'items': 0,
+            'total': 0.0,
+            'refunds': 0,
+            'refunded': 0.0,
+            'items_refunded': 0,
+            'first_bill': None,
+            'last_bill': None,
+            'by_payment_method': {},
+            'by_cashier': {},
+            'refunds_by_cashier': {},
+            'by_category': {},
+        }
+
+    def _sync(self):
+        """Reload the sidecar if another process updated it.
+
+        A damaged file never starts a fresh day, which would drop the day's
+        takings and reuse its Z number: the last good totals in memory are
+        kept (and written back by the next save), and without any, this
+        raises ValueError so nothing is recorded over it.
+        """
+        try:
+            st = os.stat(self.totals_file)
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            # No file yet, i.e. a new store's first day
+            if not self._totals:
+                self._totals = self._empty()
+            self._stamp = None
+            return
+        if stamp == self._stamp:
+            return
+        try:
+            with open(self.totals_file, 'r') as f:
+                totals = json.load(f)
+            if not isinstance(totals, dict) or 'z_number' not in totals:
+                raise ValueError("not a shift totals file")
+        except (OSError, ValueError) as e:
+            if not self._totals:
+                raise ValueError(f"cannot read {self.totals_file} ({e}); restore it before recording sales")
+            return
+        self._totals, self._stamp = totals, stamp
+
+    def _save(self, durable: bool = False):
+        temp_file = self.totals_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self._totals, f)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_file, self.totals_file)
+        st = os.stat(self.totals_file)
+        self._stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
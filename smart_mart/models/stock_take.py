@@ -0,0 +1,131 @@
+from typing import Dict, List, Optional, Tuple
+from .catalog import CatalogSnapshot
+from .repository import DataRepository
+
+try:
+    import numpy as np
+except ImportError:  # reconciliation falls back to plain Python
+    np = None
+
+
+def parse_count_file(path: str) -> Tuple[Dict[str, int], List[Tuple[int, str]]]:
+    """Read ``product_id,counted_quantity`` lines; returns counts and (line, message) errors.
+
+    A header line is skipped and repeated IDs are added up, so a product
+    counted in two places can be listed twice.
+    """
+    counts: Dict[str, int] = {}
+    errors: List[Tuple[int, str]] = []
+    with open(path, 'r', errors='replace') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            data = [field.strip() for field in line.split(',')]
+            if line_number == 1 and data[0].lower() in ('id', 'product_id'):
+                continue
+            if len(data) != 2 or not data[0]:
+                errors.append((line_number, "expected product_id,counted_quantity"))
+                continue
+            try:
+                quantity = int(data[1])
+            except ValueError:
+                errors.append((line_number, f"invalid count '{data[1]}'"))
+                continue
+            if quantity < 0:
+                errors.append((line_number, "count cannot be negative"))
+                continue
+            counts[data[0]] = counts.get(data[0], 0) + quantity
+    return counts, errors
+
+
+class StockTake:
+    """Compares a physical stock count with the catalog and applies the differences.
+
+    ``reconcile`` diffs every counted product against system stock at once
+    (one vectorized subtraction with NumPy when it is installed) and
+    reports the quantity and value variances. ``apply`` writes accepted
+    variances in one catalog write. Variances are applied as deltas to the
+    current stock, so sales made between the count and the apply are kept.
+    Products missing from the count file are left alone, so a count can
+    cover a single aisle.
+    """
+
+    def __init__(self, repository: DataRepository):
+        self.repository = repository
+
+    def reconcile(self, counts: Dict[str, int], snapshot: Optional[CatalogSnapshot] = None) -> Dict:
+        """Get the variance of every counted product whose count differs from system stock.
+
+        Returns ``lines`` (id, name, category, price, system, counted,
+        variance, value), the IDs of counted products that are not in the
+        catalog, and the net quantity, net value and shrinkage value totals.
+        """
+        snapshot = snapshot or self.repository.catalog()
+        products = list(map(snapshot.products.get, counts))
+        known = [product for product in products if product]
+        unknown = [product_id for product_id, product in zip(counts, products) if not product]
+
+        if np is not None:
+            system = np.fromiter((p[4] for p in known), dtype=np.int64, count=len(known))
+            counted = np.fromiter((counts[p[0]] for p in known), dtype=np.int64, count=len(known))
+            prices = np.fromiter((p[3] for p in known), dtype=np.float64, count=len(known))
+            variances = counted - system
+            values = variances * prices
+            differing = np.flatnonzero(variances).tolist()
+            variance_list, value_list = variances.tolist(), values.tolist()
+            net_quantity = int(variances.sum())
+            net_value = float(values.sum())
+            shrinkage = float(values[values < 0].sum())
+        else:
+            variance_list = [counts[p[0]] - p[4] for p in known]
+            value_list = [variance * p[3] for variance, p in zip(variance_list, known)]
+            differing = [i for i, variance in enumerate(variance_list) if variance]
+            net_quantity = sum(variance_list)
+            net_value = sum(value_list)
+            shrinkage = sum(value for value in value_list if value < 0)
+
+        lines = []
+        for i in differing:
+            product = known[i]
+            lines.append({
+                'id': product[0],
+                'name': product[1],
+                'category': product[2],
+                'price': product[3],
+                'system': product[4],
+                'counted': counts[product[0]],
+                'variance': variance_list[i],
+                'value': round(value_list[i], 2),
+            })
+        return {
+            'snapshot_version': snapshot.version,
+            'counted': len(known),
+            'lines': lines,
+            'unknown': unknown,
+            'net_quantity': net_quantity,
+            'net_value': round(net_value, 2),
+            'shrinkage_value': round(shrinkage, 2),
+        }
+
+    def apply(self, lines: List[Dict]) -> List[Tuple[Tuple, Tuple]]:
+        """Add the variances of accepted lines to current stock in one write.
+
+        Returns (before, after) products for every product that changed;
+        products deleted since the count are skipped and stock never goes
+        below zero.
+        """
+        changes = []
+        with self.repository.products_lock:
+            products = self.repository.load_products()
+            for line in lines:
+                product = products.get(line['id'])
+                if not product or not line['variance']:
+                    continue
+                updated = product[:4] + (max(0, product[4] + line['variance']),)
+                if updated != product:
+                    products[product[0]] = updated
+                    changes.append((product, updated))
+            if changes:
+                self.repository.write_products(products)
+        return changes
@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from .repository import DataRepository
+from .shift_totals import ShiftTotals
+
+DEFAULT_DATA_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+
+
+def data_root() -> str:
+    """Get the deployment's data root: $SMART_MART_DATA, or the data folder beside the package."""
+    return os.environ.get('SMART_MART_DATA') or DEFAULT_DATA_ROOT
+
+
+def store_data_dir(store: Optional[str] = None, root: Optional[str] = None) -> str:
+    """Get the data directory of a store.
+
+    Without a store this is the data root itself, the single-store layout.
+    Stores of a multi-store deployment live in ``<root>/stores/<store>``.
+    """
+    root = root or data_root()
+    if not store:
+        return root
+    if os.sep in store or (os.altsep and os.altsep in store) or store in ('.', '..'):
+        raise ValueError(f"invalid store name '{store}'")
+    return os.path.join(root, 'stores', store)
+
+
+def list_stores(root: Optional[str] = None) -> List[str]:
+    """Get the names of the stores under a data root."""
+    stores_dir = os.path.join(root or data_root(), 'stores')
+    try:
+        return sorted(name for name in os.listdir(stores_dir)
+                      if os.path.isdir(os.path.join(stores_dir, name)))
+    except OSError:
+        return []
+
+
+class HeadOffice:
+    """Reports across every store of a deployment.
+
+    Each report fans out to the stores on a thread pool and returns the
+    per-store results keyed by store name; stores are independent data
+    directories, so they are read in parallel without sharing any lock.
+    """
+
+    def __init__(self, root: Optional[str] = None, workers: int = 8):
+        self.root = root or data_root()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='head-office')
+
+    def stores(self) -> List[str]:
+        """Get the names of every store."""
+        return list_stores(self.root)
+
+    def revenue_between(self, start: datetime, end: datetime) -> Dict[str, Dict]:
+        """Get bill count and revenue between two times for every store."""
+        return self._fan_out(lambda data_dir: DataRepository.for_data_dir(data_dir).revenue_between(start, end))
+
+    def x_reports(self) -> Dict[str, Dict]:
+        """Get the open business day's running totals of every store."""
+        return self._fan_out(lambda data_dir: ShiftTotals.for_data_dir(data_dir).x_report())
+
+    def stock_of(self, product_id: str) -> Dict[str, Optional[int]]:
+        """Get the stock of one product in every store (None where it isn't stocked)."""
+        def stock(data_dir: str) -> Optional[int]:
+            product = DataRepository.for_data_dir(data_dir).get_product(product_id)
+            return product[4] if product else None
+        return self._fan_out(stock)
+
+    def total_revenue_between(self, start: datetime, end: datetime) -> Dict:
+        """Get bill count and revenue between two times summed over every store."""
+        reports = self.revenue_between(start, end).values()
+        return {'sales': sum(report['sales'] for report in reports),
+                'total': round(sum(report['total'] for report in reports), 2)}
+
+    def shutdown(self):
+        """Stop the worker pool."""
+        self.executor.shutdown()
+
+    def _fan_out(self, query: Callable[[str], object]) -> Dict:
+        futures = {store: self.executor.submit(query, store_data_dir(store, self.root))
+                   for store in self.stores()}
+        return {store: future.result() for store, future in futures.items()}
@@ -0,0 +1,134 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from .settings import Settings
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional
+    Image = None
+
+
+class ThumbnailStore:
+    """Scaled product images, decoded and resized on a background worker pool.
+
+    A product's image is ``<image_dir>/<product ID>.png`` (or .jpg, .jpeg,
+    .gif, .webp, .bmp). It is decoded and scaled once and the thumbnail is
+    saved under ``<image_dir>/.thumbnails``, so later lookups, by this till
+    or another, only read a small PNG; a thumbnail older than its image is
+    made again. ``request`` returns immediately and finished thumbnails
+    (PIL images, or None for products without an image) are collected with
+    ``completed``, from the GUI thread, which is the only thread that may
+    turn them into Tk images.
+    """
+
+    EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')
+
+    _stores: Dict[str, 'ThumbnailStore'] = {}
+    _stores_guard = threading.Lock()
+
+    def __init__(self, image_dir: str, size: int = 24, workers: int = 2, enabled: bool = True):
+        self.image_dir = image_dir
+        self.cache_dir = os.path.join(image_dir, '.thumbnails')
+        self.size = size
+        self.enabled = enabled and Image is not None
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                           thread_name_prefix='thumbnail')
+        self._guard = threading.Lock()
+        self._pending: Set[str] = set()
+        self._completed: List[Tuple[str, Optional['Image.Image']]] = []
+        self._sources: Dict[str, str] = {}  # product ID: image file name
+        self._sources_stamp: Optional[Tuple[int, int]] = None  # (inode, mtime) of image_dir when listed
+
+    @classmethod
+    def for_data_dir(cls, data_dir: str) -> 'ThumbnailStore':
+        """Get the process-wide thumbnail store for a data directory, configured from its settings."""
+        key = os.path.abspath(data_dir)
+        with cls._stores_guard:
+            if key not in cls._stores:
+                settings = Settings(key)
+                cls._stores[key] = cls(os.path.join(key, settings.get('image_dir', 'images')),
+                                       size=max(8, settings.get_int('thumbnail_size', 24)),
+                                       workers=settings.get_int('thumbnail_workers', 2),
+                                       enabled=settings.get_bool('thumbnails'))
+            return cls._stores[key]
+
+    def request(self, product_id: str):
+        """Queue a product's thumbnail; it shows up in ``completed`` when ready."""
+        if not self.enabled:
+            return
+        with self._guard:
+            if product_id in self._pending:
+                return
+            self._pending.add(product_id)
+        self.executor.submit(self._make, product_id)
+
+    def completed(self) -> List[Tuple[str, Optional['Image.Image']]]:
+        """Take the (product ID, thumbnail or None) pairs finished since the last call."""
+        with self._guard:
+            completed, self._completed = self._completed, []
+        return completed
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool."""
+        self.executor.shutdown(wait=wait)
+
+    def _make(self, product_id: str):
+        try:
+            image = self._thumbnail(product_id)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            image = None  # unreadable images are shown as no image
+        with self._guard:
+            self._pending.discard(product_id)
+            self._completed.append((product_id, image))
+
+    def _thumbnail(self, product_id: str) -> Optional['Image.Image']:
+        source = self._source(product_id)
+        if source is None:
+            return None
+        key = hashlib.sha1(product_id.encode('utf-8')).hexdigest()[:16]
+        cached = os.path.join(self.cache_dir, f"{key}-{self.size}.png")
+
+        # Reuse the scaled copy unless the image was replaced since
+        try:
+            if os.path.getmtime(cached) >= os.path.getmtime(source):
+                with Image.open(cached) as image:
+                    image.load()
+                    return image.copy()
+        except OSError:
+            pass
+
+        with Image.open(source) as image:
+            image.draft('RGB', (self.size, self.size))  # lets JPEG decode at a fraction of full size
+            thumbnail = image.convert('RGBA')
+        thumbnail.thumbnail((self.size, self.size), Image.Resampling.LANCZOS)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_file = f"{cached}.{threading.get_ident()}.tmp"
+        try:
+            thumbnail.save(temp_file, 'PNG')
+            os.replace(temp_file, cached)
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        return thumbnail
+
+    def _source(self, product_id: str) -> Optional[str]:
+        """Find a product's image, listing image_dir again only when it changed."""
+        try:
+            stat = os.stat(self.image_dir)
+        except OSError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp != self._sources_stamp:
+            sources = {}
+            for name in os.listdir(self.image_dir):
+                stem, extension = os.path.splitext(name)
+                if extension.lower() in self.EXTENSIONS:
+                    sources[stem] = name
+            with self._guard:
+                self._sources, self._sources_stamp = sources, stamp
+        name = self._sources.get(product_id)
+        return os.path.join(self.image_dir, name) if name else None
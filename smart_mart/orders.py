@@ -0,0 +1,39 @@
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.order_import import OrderImporter
+from models.repository import DataRepository
+from models.stores import store_data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commit a batch of online orders in one write.")
+    parser.add_argument('orders', help="file of order_id,product_id,quantity lines, or - for stdin")
+    parser.add_argument('--channel', default='online', help="recorded as the cashier on the bills")
+    parser.add_argument('--store', help="store to sell from, from <data root>/stores/<store>")
+    parser.add_argument('--data-dir', help="data directory to sell from (overrides --store)")
+    args = parser.parse_args()
+
+    repository = DataRepository.for_data_dir(args.data_dir or store_data_dir(args.store))
+    try:
+        importer = OrderImporter(repository, args.channel)
+        if args.orders == '-':
+            report = importer.import_lines(sys.stdin)
+        else:
+            report = importer.import_file(args.orders)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    # One JSON report on stdout, for the web shop to mark orders as placed or refused
+    report['errors'] = [{'line': line_number, 'message': message} for line_number, message in report['errors']]
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if not report['failed'] and not report['errors'] else 2)
+
+
+if __name__ == '__main__':
+    main()
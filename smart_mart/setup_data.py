@@ -18,6 +18,12 @@ def setup_data():
         f.write('cashier1,pass123\n')
         f.write('cashier2,pass123\n')
     
+    # Create product categories
+    categories_file = os.path.join(data_dir, 'categories.txt')
+    with open(categories_file, 'w') as f:
+        for category in ['Electronics', 'Groceries', 'Clothing', 'Home & Kitchen', 'Sports']:
+            f.write(f'{category}\n')
+    
     # Create sample products
     products_file = os.path.join(data_dir, 'products.txt')
     with open(products_file, 'w') as f:
@@ -46,6 +52,70 @@ def setup_data():
         f.write('S002,Yoga Mat,Sports,19.99,20\n')
         f.write('S003,Dumbbells,Sports,39.99,10\n')
     
+    # Create default store settings
+    settings_file = os.path.join(data_dir, 'settings.txt')
+    with open(settings_file, 'w') as f:
+        f.write('# Store settings (key=value)\n\n')
+        f.write('# Sale write durability: none, sale (fsync every sale) or group (batch concurrent sales into one write and fsync per file)\n')
+        f.write('durability=group\n')
+        f.write('group_commit_ms=5\n\n')
+        f.write("# Receipts are spooled to receipt_dir (relative to this folder); set receipt_printer\n")
+        f.write("# to a printer queue name, or 'default', to also print them (a name needs pywin32 on Windows)\n")
+        f.write('receipt_dir=receipts\n')
+        f.write('receipt_printer=\n')
+        f.write('receipt_png=yes\n')
+        f.write('receipt_workers=2\n')
+        f.write('\n# Product thumbnails in the cashier\'s catalog and cart, from image_dir/<product ID>.png\n')
+        f.write('# (or .jpg, .gif, .webp, .bmp); scaled copies are cached in image_dir/.thumbnails\n')
+        f.write('thumbnails=no\n')
+        f.write('image_dir=images\n')
+        f.write('thumbnail_size=24\n')
+        f.write('thumbnail_cache=512\n')
+        f.write('thumbnail_workers=2\n')
+        f.write('\n# The bill ledger is rotated into ledger/ (daily, or when bills.txt reaches ledger_rotate_mb\n')
+        f.write('# with ledger_rotation=size); ledger_compression is xz, gz or none\n')
+        f.write('ledger_rotation=daily\n')
+        f.write('ledger_rotate_mb=64\n')
+        f.write('ledger_compression=xz\n')
+        f.write('\n# Keep the catalog in products/<category>.txt instead of products.txt (an existing\n')
+        f.write('# products.txt is split on the next write); catalog_workers threads read the partitions\n')
+        f.write('catalog_partitions=no\n')
+        f.write('catalog_workers=4\n')
+        f.write('\n# Publish the catalog in shared memory so tills on this machine map one copy instead\n')
+        f.write('# of each parsing their own (costs a background rebuild after every catalog write)\n')
+        f.write('shared_catalog=no\n')
+        f.write('\n# Journal every write in journal/ so backup.py can ship it to a hot backup. Turn it on\n')
+        f.write('# together with the backup: segments are only deleted by "backup.py ... prune"\n')
+        f.write('journal=no\n')
+        f.write('journal_segment_mb=16\n')
+        f.write('\n# Admin changes are appended to audit.log in batches of audit_batch, or audit_flush_ms\n')
+        f.write('# after the first buffered change\n')
+        f.write('audit_batch=256\n')
+        f.write('audit_flush_ms=1000\n')
+        f.write('\n# Replenishment forecast: velocity over the last forecast_velocity_days, reorder to cover\n')
+        f.write('# lead time + review period plus forecast_service_z standard deviations of safety stock\n')
+        f.write('forecast_history_days=365\n')
+        f.write('forecast_velocity_days=28\n')
+        f.write('forecast_lead_days=7\n')
+        f.write('forecast_review_days=7\n')
+        f.write('forecast_service_z=1.65\n')
+        f.write('\n# Price-check kiosk (main.py --kiosk): results per search, and how often it picks up\n')
+        f.write('# price and stock changes\n')
+        f.write('kiosk_results=50\n')
+        f.write('kiosk_refresh_ms=2000\n')
+    
+    # Create default promotions
+    promotions_file = os.path.join(data_dir, 'promotions.txt')
+    with open(promotions_file, 'w') as f:
+        f.write('# Promotions: id,name,type,target,value,start,end,hours\n')
+        f.write('#   product  - target product ID, value percent off\n')
+        f.write('#   category - target category, value percent off\n')
+        f.write('#   multibuy - target product ID, value buy:pay (3:2 = buy 3, pay for 2)\n')
+        f.write('#   bundle   - target product IDs joined with +, value amount off per complete set\n')
+        f.write('#   payment  - target payment method, value percent off the whole sale\n')
+        f.write('# start/end are YYYY-MM-DD HH:MM and hours is HH:MM-HH:MM; leave them empty for no limit\n')
+        f.write('CARD10,Card discount,payment,card,10,,,\n')
+    
     # Create empty bills file
     bills_file = os.path.join(data_dir, 'bills.txt')
     open(bills_file, 'w').close()
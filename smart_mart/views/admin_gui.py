@@ -1,13 +1,19 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox, filedialog
+import threading
 from typing import Optional, Callable
+from datetime import datetime, timedelta
 from .base_gui import BaseGUI
 from models.admin_model import Admin
+from models.product_query import ProductQuery
+from models.ledger import ID_RESERVED, valid_product_id
+from models.metrics import UI_REFRESH_SECONDS, timed
 
 class AdminGUI(BaseGUI):
-    def __init__(self, on_logout: Optional[Callable] = None):
+    def __init__(self, on_logout: Optional[Callable] = None, data_dir: Optional[str] = None,
+                 username: Optional[str] = None):
         super().__init__("Admin Panel")
-        self.admin = Admin()
+        self.admin = Admin(data_dir, username=username)
         self.on_logout = on_logout
         
         # Create header with user info and logout
@@ -22,7 +28,10 @@ class AdminGUI(BaseGUI):
         
         # Create tabs
         self.create_products_tab()
+        self.create_categories_tab()
         self.create_cashiers_tab()
+        self.create_reports_tab()
+        self.create_bill_history_tab()
         self.create_settings_tab()
 
     def create_header(self):
@@ -64,14 +73,39 @@ class AdminGUI(BaseGUI):
         ttk.Label(filter_frame, text="Filter by Category:").pack(side=tk.LEFT)
         self.category_var = tk.StringVar()
         categories = ['All'] + self.admin.get_categories()
-        category_combo = ttk.Combobox(filter_frame,
-                                    textvariable=self.category_var,
-                                    values=categories,
-                                    state='readonly',
-                                    width=30)
-        category_combo.pack(side=tk.LEFT, padx=5)
-        category_combo.set('All')
-        category_combo.bind('<<ComboboxSelected>>', lambda _: self.refresh_product_list())
+        self.category_filter_combo = ttk.Combobox(filter_frame,
+                                                textvariable=self.category_var,
+                                                values=categories,
+                                                state='readonly',
+                                                width=30)
+        self.category_filter_combo.pack(side=tk.LEFT, padx=5)
+        self.category_filter_combo.set('All')
+        self.category_filter_combo.bind('<<ComboboxSelected>>', lambda _: self.refresh_product_list())
+        
+        # Name, price and stock filters; empty boxes leave that side open
+        range_frame = ttk.Frame(left_panel)
+        range_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.product_filter_vars = {}
+        for key, label, width in (('name', "Name contains:", 14), ('min_price', "Price $", 7), ('max_price', "to", 7),
+                                  ('min_stock', "Stock", 6), ('max_stock', "to", 6)):
+            ttk.Label(range_frame, text=label).pack(side=tk.LEFT, padx=(5, 0))
+            var = tk.StringVar()
+            entry = ttk.Entry(range_frame, textvariable=var, width=width)
+            entry.pack(side=tk.LEFT, padx=5)
+            entry.bind('<Return>', lambda _: self.refresh_product_list())
+            self.product_filter_vars[key] = var
+        
+        ttk.Button(range_frame,
+                  text="Filter",
+                  command=self.refresh_product_list,
+                  style='Primary.TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(range_frame,
+                  text="Clear",
+                  command=self.clear_product_filters).pack(side=tk.LEFT)
+        
+        self.product_count_var = tk.StringVar()
+        ttk.Label(left_panel, textvariable=self.product_count_var).pack(fill=tk.X)
         
         # Product list with scrollbar
         tree_frame = ttk.Frame(left_panel)
@@ -127,12 +161,12 @@ class AdminGUI(BaseGUI):
         ttk.Label(category_frame, text="Category:").pack(side=tk.LEFT)
         
         self.product_category_var = tk.StringVar()
-        category_combo = ttk.Combobox(category_frame,
-                                    textvariable=self.product_category_var,
-                                    values=self.admin.get_categories(),
-                                    state='readonly',
-                                    width=30)
-        category_combo.pack(side=tk.RIGHT, expand=True, fill=tk.X, padx=(10, 0))
+        self.product_category_combo = ttk.Combobox(category_frame,
+                                                 textvariable=self.product_category_var,
+                                                 values=self.admin.get_categories(),
+                                                 state='readonly',
+                                                 width=30)
+        self.product_category_combo.pack(side=tk.RIGHT, expand=True, fill=tk.X, padx=(10, 0))
         
         self.product_price_entry = self.create_entry_field(right_panel, "Price ($):")
         self.product_quantity_entry = self.create_entry_field(right_panel, "Quantity:")
@@ -144,10 +178,76 @@ class AdminGUI(BaseGUI):
         self.create_button(button_frame, "Add/Update Product", self.add_update_product, 'Success.TButton')
         self.create_button(button_frame, "Delete Product", self.delete_product, 'Danger.TButton')
         self.create_button(button_frame, "Clear Form", self.clear_product_form)
+        self.import_button = self.create_button(button_frame, "Import Products...", self.import_products)
+        self.orders_button = self.create_button(button_frame, "Import Orders...", self.import_orders)
+        self.create_button(button_frame, "Product History", self.show_product_history)
+        self.create_button(button_frame, "Stock Take...", self.stock_take)
         
         # Initial product list load
         self.refresh_product_list()
 
+    def create_categories_tab(self):
+        """Create the categories management tab."""
+        tab = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(tab, text=" Categories ")
+        
+        # Split into left and right panels
+        left_panel = ttk.Frame(tab)
+        left_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
+        
+        right_panel = ttk.Frame(tab)
+        right_panel.pack(side=tk.LEFT, fill=tk.BOTH)
+        
+        # Left panel content
+        self.create_section(left_panel, "Category List")
+        
+        # Category list with scrollbar
+        tree_frame = ttk.Frame(left_panel)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('Category', 'Products')
+        self.category_tree = ttk.Treeview(tree_frame,
+                                         columns=columns,
+                                         show='headings',
+                                         selectmode='browse')
+        
+        self.category_tree.column('Category', width=200)
+        self.category_tree.column('Products', width=100)
+        for col in columns:
+            self.category_tree.heading(col, text=col, anchor=tk.CENTER)
+        
+        # Add scrollbar
+        y_scroll = ttk.Scrollbar(tree_frame,
+                               orient=tk.VERTICAL,
+                               command=self.category_tree.yview)
+        
+        self.category_tree.configure(yscrollcommand=y_scroll.set)
+        
+        # Pack scrollbar and tree
+        self.category_tree.grid(row=0, column=0, sticky='nsew')
+        y_scroll.grid(row=0, column=1, sticky='ns')
+        
+        tree_frame.grid_columnconfigure(0, weight=1)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        
+        self.category_tree.bind('<<TreeviewSelect>>', self.on_category_select)
+        
+        # Right panel content
+        self.create_section(right_panel, "Category Details")
+        
+        # Category form
+        self.category_name_entry = self.create_entry_field(right_panel, "Name:")
+        
+        # Buttons
+        button_frame = ttk.Frame(right_panel)
+        button_frame.pack(fill=tk.X, pady=20)
+        
+        self.create_button(button_frame, "Add Category", self.add_category, 'Success.TButton')
+        self.create_button(button_frame, "Delete Category", self.delete_category, 'Danger.TButton')
+        
+        # Initial category list load
+        self.refresh_category_list()
+
     def create_cashiers_tab(self):
         """Create the cashiers management tab."""
         tab = ttk.Frame(self.notebook, padding=10)
@@ -210,6 +310,134 @@ class AdminGUI(BaseGUI):
         # Initial cashier list load
         self.refresh_cashier_list()
 
+    def create_reports_tab(self):
+        """Create the end-of-day reports tab."""
+        tab = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(tab, text=" Reports ")
+        
+        self.create_section(tab, "Shift Totals (X-Report)")
+        
+        # Summary line
+        self.report_summary_var = tk.StringVar()
+        ttk.Label(tab,
+                 textvariable=self.report_summary_var,
+                 font=('Segoe UI', 11, 'bold')).pack(fill=tk.X, pady=(0, 10))
+        
+        # Totals grouped by payment method, cashier and category
+        tree_frame = ttk.Frame(tab)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.report_tree = ttk.Treeview(tree_frame,
+                                       columns=('Sales', 'Amount'),
+                                       show='tree headings',
+                                       selectmode='none')
+        self.report_tree.column('#0', width=250)
+        self.report_tree.column('Sales', width=100, anchor=tk.E)
+        self.report_tree.column('Amount', width=150, anchor=tk.E)
+        self.report_tree.heading('#0', text='Group', anchor=tk.CENTER)
+        self.report_tree.heading('Sales', text='Sales', anchor=tk.CENTER)
+        self.report_tree.heading('Amount', text='Amount', anchor=tk.CENTER)
+        
+        y_scroll = ttk.Scrollbar(tree_frame,
+                               orient=tk.VERTICAL,
+                               command=self.report_tree.yview)
+        self.report_tree.configure(yscrollcommand=y_scroll.set)
+        
+        self.report_tree.grid(row=0, column=0, sticky='nsew')
+        y_scroll.grid(row=0, column=1, sticky='ns')
+        
+        tree_frame.grid_columnconfigure(0, weight=1)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        
+        # Buttons
+        button_frame = ttk.Frame(tab)
+        button_frame.pack(fill=tk.X, pady=10)
+        
+        self.create_button(button_frame, "Refresh X-Report", self.refresh_report)
+        self.create_button(button_frame, "Close Day (Z-Report)", self.close_day, 'Danger.TButton')
+        self.forecast_button = self.create_button(button_frame, "Replenishment Report...",
+                                                  self.export_replenishment_report)
+        
+        # Refresh whenever the tab is opened
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.refresh_report()
+
+    def create_bill_history_tab(self):
+        """Create the bill history tab with a date range search."""
+        tab = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(tab, text=" Bill History ")
+        
+        self.create_section(tab, "Bills by Date Range")
+        
+        # Date range picker (defaults to today so far)
+        range_frame = ttk.Frame(tab)
+        range_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        ttk.Label(range_frame, text="From:").pack(side=tk.LEFT)
+        self.bill_from_var = tk.StringVar(value=today.strftime('%Y-%m-%d %H:%M'))
+        ttk.Entry(range_frame, textvariable=self.bill_from_var, width=18).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(range_frame, text="To:").pack(side=tk.LEFT, padx=(10, 0))
+        self.bill_to_var = tk.StringVar(value=(today + timedelta(days=1)).strftime('%Y-%m-%d %H:%M'))
+        ttk.Entry(range_frame, textvariable=self.bill_to_var, width=18).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(range_frame,
+                 text="(YYYY-MM-DD HH:MM)",
+                 foreground=self.colors['gray']).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(range_frame,
+                  text="Search",
+                  command=self.search_bills,
+                  style='Primary.TButton').pack(side=tk.RIGHT)
+        
+        # Bill list
+        tree_frame = ttk.Frame(tab)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('Bill', 'Time', 'Cashier', 'Payment', 'Total')
+        self.bill_tree = ttk.Treeview(tree_frame,
+                                     columns=columns,
+                                     show='headings',
+                                     selectmode='browse')
+        self.bill_tree.column('Bill', width=80)
+        self.bill_tree.column('Time', width=180)
+        self.bill_tree.column('Cashier', width=150)
+        self.bill_tree.column('Payment', width=100)
+        self.bill_tree.column('Total', width=100, anchor=tk.E)
+        for col in columns:
+            self.bill_tree.heading(col, text=col, anchor=tk.CENTER)
+        
+        y_scroll = ttk.Scrollbar(tree_frame,
+                               orient=tk.VERTICAL,
+                               command=self.bill_tree.yview)
+        self.bill_tree.configure(yscrollcommand=y_scroll.set)
+        
+        self.bill_tree.grid(row=0, column=0, sticky='nsew')
+        y_scroll.grid(row=0, column=1, sticky='ns')
+        
+        tree_frame.grid_columnconfigure(0, weight=1)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        
+        # Range totals
+        self.bill_summary_var = tk.StringVar()
+        ttk.Label(tab,
+                 textvariable=self.bill_summary_var,
+                 font=('Segoe UI', 11, 'bold')).pack(fill=tk.X, pady=10)
+        
+        # Refunds: any bill by number, archived or not, or the selected one
+        refund_frame = ttk.Frame(tab)
+        refund_frame.pack(fill=tk.X)
+        
+        ttk.Label(refund_frame, text="Bill #:").pack(side=tk.LEFT)
+        self.refund_bill_var = tk.StringVar()
+        ttk.Entry(refund_frame, textvariable=self.refund_bill_var, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(refund_frame,
+                  text="Refund / Void...",
+                  command=self.open_refund,
+                  style='Primary.TButton').pack(side=tk.LEFT)
+        self.bill_tree.bind('<Double-1>', lambda event: self.open_refund())
+
     def create_settings_tab(self):
         """Create the settings tab."""
         tab = ttk.Frame(self.notebook, padding=10)
@@ -240,17 +468,64 @@ class AdminGUI(BaseGUI):
         change_btn = self.create_button(container, "Change Password", self.change_password)
         change_btn.configure(padding=[20, 10])
 
+    @timed(UI_REFRESH_SECONDS.labels('admin_products'))
     def refresh_product_list(self):
         """Refresh the product list in the treeview."""
+        query = self.product_query()
+        if query is None:
+            return
         for item in self.product_tree.get_children():
             self.product_tree.delete(item)
             
-        category = self.category_var.get()
-        products = self.admin.list_products(None if category == 'All' else category)
+        products = self.admin.query_products(query)
         
         for product in products:
             self.product_tree.insert('', tk.END, values=product)
+        self.product_count_var.set(f"{len(products)} product(s)")
+
+    def product_query(self) -> Optional[ProductQuery]:
+        """Build the product list query from the filters, or None if a bound is not a number."""
+        query = ProductQuery()
+        category = self.category_var.get()
+        if category and category != 'All':
+            query = query.in_category(category)
+        values = {key: var.get().strip() for key, var in self.product_filter_vars.items()}
+        if values['name']:
+            query = query.name_matches(values['name'])
+        try:
+            bounds = {key: (float(values[key]) if 'price' in key else int(values[key])) if values[key] else None
+                      for key in ('min_price', 'max_price', 'min_stock', 'max_stock')}
+        except ValueError:
+            self.show_error("Price bounds must be numbers and stock bounds whole numbers!")
+            return None
+        if bounds['min_price'] is not None or bounds['max_price'] is not None:
+            query = query.price_between(bounds['min_price'], bounds['max_price'])
+        if bounds['min_stock'] is not None or bounds['max_stock'] is not None:
+            query = query.stock_between(bounds['min_stock'], bounds['max_stock'])
+        return query
+
+    def clear_product_filters(self):
+        """Show every product again."""
+        self.category_filter_combo.set('All')
+        for var in self.product_filter_vars.values():
+            var.set('')
+        self.refresh_product_list()
+
+    @timed(UI_REFRESH_SECONDS.labels('admin_categories'))
+    def refresh_category_list(self):
+        """Refresh the category list and every category selector."""
+        for item in self.category_tree.get_children():
+            self.category_tree.delete(item)
+            
+        categories = self.admin.get_categories()
+        sizes = self.admin.category_sizes()
+        for category in categories:
+            self.category_tree.insert('', tk.END, values=(category, sizes.get(category, 0)))
+            
+        self.category_filter_combo.configure(values=['All'] + categories)
+        self.product_category_combo.configure(values=categories)
 
+    @timed(UI_REFRESH_SECONDS.labels('admin_cashiers'))
     def refresh_cashier_list(self):
         """Refresh the cashier list in the treeview."""
         for item in self.cashier_tree.get_children():
@@ -260,6 +535,225 @@ class AdminGUI(BaseGUI):
         for cashier in cashiers:
             self.cashier_tree.insert('', tk.END, values=(cashier,))
 
+    @timed(UI_REFRESH_SECONDS.labels('admin_report'))
+    def refresh_report(self):
+        """Show the running totals of the open business day."""
+        try:
+            report = self.admin.get_x_report()
+        except ValueError as e:
+            self.report_summary_var.set(f"Shift totals unavailable: {e}")
+            return
+        self.show_report(report)
+
+    def show_report(self, report: dict):
+        """Display a shift totals report in the reports tab."""
+        for item in self.report_tree.get_children():
+            self.report_tree.delete(item)
+            
+        self.report_summary_var.set(
+            f"Day #{report['z_number']} opened {report['opened_at']}   |   "
+            f"Sales: {report['sales']}   Items: {report['items']}   Net Total: ${report['total']:.2f}   "
+            f"Refunds: {report.get('refunds', 0)} ({report.get('items_refunded', 0)} items, "
+            f"${report.get('refunded', 0.0):.2f})")
+        
+        groups = [('By Payment Method', 'by_payment_method'),
+                  ('By Cashier', 'by_cashier'),
+                  ('Refunds By Cashier', 'refunds_by_cashier'),
+                  ('By Category', 'by_category')]
+        for title, key in groups:
+            parent = self.report_tree.insert('', tk.END, text=title, open=True)
+            for name, entry in sorted(report.get(key, {}).items()):
+                self.report_tree.insert(parent, tk.END, text=name,
+                                        values=(entry['sales'], f"${entry['total']:.2f}"))
+
+    def search_bills(self):
+        """Show the bills in the selected date range."""
+        try:
+            start = datetime.strptime(self.bill_from_var.get().strip(), '%Y-%m-%d %H:%M')
+            end = datetime.strptime(self.bill_to_var.get().strip(), '%Y-%m-%d %H:%M')
+        except ValueError:
+            self.show_error("Dates must look like 2024-01-31 14:00!")
+            return
+            
+        if end <= start:
+            self.show_error("The end of the range must be after the start!")
+            return
+            
+        for item in self.bill_tree.get_children():
+            self.bill_tree.delete(item)
+            
+        bills = self.admin.get_bills_between(start, end)
+        for bill in bills:
+            self.bill_tree.insert('', tk.END, values=(
+                bill['bill_number'],
+                bill['timestamp'],
+                bill['cashier'],
+                bill['payment_method'],
+                f"${bill['total']:.2f}"
+            ))
+            
+        total = sum(bill['total'] for bill in bills)
+        self.bill_summary_var.set(f"Bills: {len(bills)}   Revenue: ${total:.2f}")
+
+    def open_refund(self):
+        """Look up the bill in the refund box, or the selected one, and show what can be refunded."""
+        number = self.refund_bill_var.get().strip()
+        if not number and self.bill_tree.selection():
+            number = str(self.bill_tree.item(self.bill_tree.selection()[0], 'values')[0])
+        try:
+            bill_number = int(number)
+        except ValueError:
+            self.show_error("Please enter a bill number!")
+            return
+            
+        bill = self.admin.get_refundable_bill(bill_number)
+        if bill is None:
+            self.show_error(f"Bill #{bill_number} is not a sale that can be refunded!")
+            return
+        self.show_refund(bill)
+
+    def show_refund(self, bill: dict):
+        """List a bill's lines and void it or refund the selected quantities."""
+        bill_number = bill['bill_number']
+        window = tk.Toplevel(self.root)
+        window.title(f"Refund Bill #{bill_number}")
+        window.geometry("700x450")
+        
+        frame = ttk.Frame(window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame,
+                 text=f"Bill #{bill_number}   {bill['timestamp']}   {bill['cashier']}   "
+                      f"{bill['payment_method']}   Total: ${bill['total']:.2f}   "
+                      f"Refunded: ${bill['refunded']:.2f}",
+                 style='Header.TLabel').pack(fill=tk.X, pady=(0, 10))
+        
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('ID', 'Price', 'Sold', 'Refundable')
+        tree = ttk.Treeview(tree_frame, columns=columns, show='headings', selectmode='extended')
+        for col in columns:
+            tree.heading(col, text=col, anchor=tk.CENTER)
+            tree.column(col, width=120)
+        
+        y_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=y_scroll.set)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        sold = {}
+        prices = {}
+        for item in bill['items']:
+            sold[item['id']] = sold.get(item['id'], 0) + item['quantity']
+            prices.setdefault(item['id'], item['price'])
+        for product_id, quantity in sold.items():
+            tree.insert('', tk.END, iid=product_id, values=(
+                product_id, f"${prices[product_id]:.2f}", quantity, bill['remaining'].get(product_id, 0)))
+        
+        # Quantity to refund of each selected line; defaults to all that is left
+        quantity_frame = ttk.Frame(frame)
+        quantity_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Label(quantity_frame, text="Quantity (blank = all refundable):").pack(side=tk.LEFT)
+        quantity_var = tk.StringVar()
+        ttk.Entry(quantity_frame, textvariable=quantity_var, width=8).pack(side=tk.LEFT, padx=5)
+        
+        def finish(refund_number, error):
+            if refund_number is None:
+                self.show_error(f"Nothing was refunded: {error}")
+                return
+            window.destroy()
+            self.show_success(f"Refund saved as bill #{refund_number}.")
+            self.refresh_product_list()
+            self.refresh_report()
+        
+        def refund_selected():
+            selected = tree.selection()
+            if not selected:
+                self.show_error("Please select the lines to refund!")
+                return
+            quantities = {}
+            for product_id in selected:
+                quantity = bill['remaining'].get(product_id, 0)
+                if quantity_var.get().strip():
+                    try:
+                        quantity = int(quantity_var.get().strip())
+                    except ValueError:
+                        self.show_error("Quantity must be a whole number!")
+                        return
+                quantities[product_id] = quantity
+            finish(*self.admin.refund_bill(bill_number, quantities))
+        
+        def void():
+            if messagebox.askyesno("Void Bill",
+                                   f"Refund everything left of bill #{bill_number} and restock it?",
+                                   parent=window):
+                finish(*self.admin.void_bill(bill_number))
+        
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        self.create_button(button_frame, "Refund Selected", refund_selected, 'Success.TButton')
+        self.create_button(button_frame, "Void Bill", void, 'Danger.TButton')
+        self.create_button(button_frame, "Cancel", window.destroy)
+
+    def close_day(self):
+        """Close the business day after confirmation."""
+        if not messagebox.askyesno("Close Day",
+                                   "Save the Z-report and reset the shift totals?"):
+            return
+            
+        try:
+            report = self.admin.close_day()
+        except (OSError, ValueError):
+            self.show_error("Failed to close the day!")
+            return
+            
+        self.show_success(f"Day #{report['z_number']} closed.\n"
+                          f"Sales: {report['sales']}   Total: ${report['total']:.2f}")
+        self.refresh_report()
+
+    def export_replenishment_report(self):
+        """Forecast reorder quantities in the background and save them as CSV."""
+        path = filedialog.asksaveasfilename(title="Save Replenishment Report",
+                                            defaultextension=".csv",
+                                            initialfile=f"replenishment_{datetime.now():%Y%m%d}.csv",
+                                            filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+            
+        self.forecast_button.configure(state=tk.DISABLED, text="Forecasting...")
+        result = {}
+        
+        def worker():
+            try:
+                result['report'] = self.admin.export_replenishment_report(path)
+            except (OSError, RuntimeError) as e:
+                result['error'] = str(e)
+                
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.root.after(200, lambda: self.finish_replenishment_report(thread, result))
+
+    def finish_replenishment_report(self, thread: threading.Thread, result: dict):
+        """Report the saved replenishment report once the forecast is done."""
+        if thread.is_alive():
+            self.root.after(200, lambda: self.finish_replenishment_report(thread, result))
+            return
+            
+        self.forecast_button.configure(state=tk.NORMAL, text="Replenishment Report...")
+        if 'error' in result:
+            self.show_error(f"Forecast failed: {result['error']}")
+            return
+            
+        report = result['report']
+        self.show_success(f"{report['reorders']} of {report['products']} products need reordering "
+                          f"({report['units']} units).")
+
+    def on_tab_changed(self, event):
+        """Refresh the reports tab when it is selected."""
+        if self.notebook.tab(self.notebook.select(), 'text').strip() == 'Reports':
+            self.refresh_report()
+
     def on_product_select(self, event):
         """Handle product selection in the treeview."""
         selection = self.product_tree.selection()
@@ -277,6 +771,16 @@ class AdminGUI(BaseGUI):
         self.product_quantity_entry.delete(0, tk.END)
         self.product_quantity_entry.insert(0, values[4])
 
+    def on_category_select(self, event):
+        """Handle category selection in the treeview."""
+        selection = self.category_tree.selection()
+        if not selection:
+            return
+            
+        values = self.category_tree.item(selection[0])['values']
+        self.category_name_entry.delete(0, tk.END)
+        self.category_name_entry.insert(0, values[0])
+
     def on_cashier_select(self, event):
         """Handle cashier selection in the treeview."""
         selection = self.cashier_tree.selection()
@@ -301,6 +805,10 @@ class AdminGUI(BaseGUI):
                 self.show_error("Please fill in all fields!")
                 return
                 
+            if not valid_product_id(product_id):
+                self.show_error(f"Product ID cannot contain any of: {' '.join(ID_RESERVED)}")
+                return
+                
             if price < 0:
                 self.show_error("Price cannot be negative!")
                 return
@@ -312,6 +820,7 @@ class AdminGUI(BaseGUI):
             if self.admin.add_product(product_id, name, category, price, quantity):
                 self.show_success("Product saved successfully!")
                 self.refresh_product_list()
+                self.refresh_category_list()
                 self.clear_product_form()
             else:
                 self.show_error("Failed to save product!")
@@ -328,6 +837,7 @@ class AdminGUI(BaseGUI):
         if self.admin.remove_product(product_id):
             self.show_success("Product deleted successfully!")
             self.refresh_product_list()
+            self.refresh_category_list()
             self.clear_product_form()
         else:
             self.show_error("Failed to delete product!")
@@ -341,6 +851,264 @@ class AdminGUI(BaseGUI):
         self.product_quantity_entry.delete(0, tk.END)
         self.product_id_entry.focus()
 
+    def add_category(self):
+        """Add a new category."""
+        category = self.category_name_entry.get().strip()
+        if not category:
+            self.show_error("Please enter a category name!")
+            return
+            
+        if self.admin.add_category(category):
+            self.show_success("Category added successfully!")
+            self.refresh_category_list()
+            self.category_name_entry.delete(0, tk.END)
+        else:
+            self.show_error("Failed to add category! It may already exist.")
+
+    def delete_category(self):
+        """Delete a category."""
+        category = self.category_name_entry.get().strip()
+        if not category:
+            self.show_error("Please select a category to delete!")
+            return
+            
+        if self.admin.remove_category(category):
+            self.show_success("Category deleted successfully!")
+            self.refresh_category_list()
+            self.category_name_entry.delete(0, tk.END)
+        else:
+            self.show_error("Failed to delete category! Move or delete its products first.")
+
+    def import_products(self):
+        """Validate and import a bulk product file in the background."""
+        path = filedialog.askopenfilename(title="Import Products",
+                                          filetypes=[("Product files", "*.txt *.csv"), ("All files", "*.*")])
+        if not path:
+            return
+            
+        self.import_button.configure(state=tk.DISABLED, text="Importing...")
+        result = {}
+        
+        def worker():
+            try:
+                result['report'] = self.admin.import_products(path)
+            except Exception as e:
+                result['error'] = str(e)
+                
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.root.after(200, lambda: self.finish_import(thread, result))
+
+    def finish_import(self, thread: threading.Thread, result: dict):
+        """Show the import report once the background validation is done."""
+        if thread.is_alive():
+            self.root.after(200, lambda: self.finish_import(thread, result))
+            return
+            
+        self.import_button.configure(state=tk.NORMAL, text="Import Products...")
+        if 'error' in result:
+            self.show_error(f"Import failed: {result['error']}")
+            return
+            
+        report = result['report']
+        if report['committed']:
+            self.show_success(f"Imported {report['imported']} products.")
+            self.refresh_product_list()
+            self.refresh_category_list()
+        elif not report['errors']:
+            self.show_warning("The file contains no products.")
+        else:
+            self.show_import_errors(report['errors'])
+
+    def import_orders(self):
+        """Commit a file of online orders in the background."""
+        path = filedialog.askopenfilename(title="Import Orders",
+                                          filetypes=[("Order files", "*.txt *.csv"), ("All files", "*.*")])
+        if not path:
+            return
+            
+        self.orders_button.configure(state=tk.DISABLED, text="Importing...")
+        result = {}
+        
+        def worker():
+            try:
+                result['report'] = self.admin.import_orders(path)
+            except Exception as e:
+                result['error'] = str(e)
+                
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.root.after(200, lambda: self.finish_order_import(thread, result))
+
+    def finish_order_import(self, thread: threading.Thread, result: dict):
+        """Show which orders were committed and why the others were not."""
+        if thread.is_alive():
+            self.root.after(200, lambda: self.finish_order_import(thread, result))
+            return
+            
+        self.orders_button.configure(state=tk.NORMAL, text="Import Orders...")
+        if 'error' in result:
+            self.show_error(f"Import failed: {result['error']}")
+            return
+            
+        report = result['report']
+        summary = (f"Committed {len(report['committed'])} orders "
+                   f"({report['units']} units, ${report['revenue']:.2f}).")
+        if report['committed']:
+            self.refresh_product_list()
+        # Lines without an order ID belong to no order, so list them on their own
+        problems = [(f"Order {order_id}", reason) for order_id, reason in report['failed'].items()]
+        reported = {reason.split(':', 1)[0] for reason in report['failed'].values()}
+        problems += [(line_number, message) for line_number, message in report['errors']
+                     if f"line {line_number}" not in reported]
+        if problems:
+            self.show_import_errors(problems, f"{summary} {len(report['failed'])} order(s) were rejected.")
+        else:
+            self.show_success(summary)
+
+    def show_import_errors(self, errors: list, heading: Optional[str] = None):
+        """List the validation errors of a rejected import or count file.
+
+        Errors are (line number, message) pairs; a text label such as
+        "Order 1001" can stand in for the line number.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Import Errors")
+        window.geometry("700x400")
+        
+        frame = ttk.Frame(window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame,
+                 text=heading or f"Nothing was imported: {len(errors)} line(s) have errors.",
+                 style='Header.TLabel').pack(fill=tk.X, pady=(0, 10))
+        
+        text = tk.Text(frame, wrap=tk.NONE, font=('Consolas', 10))
+        y_scroll = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=text.yview)
+        text.configure(yscrollcommand=y_scroll.set)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(fill=tk.BOTH, expand=True)
+        
+        # Show the first errors only; a huge file could have millions
+        for line_number, message in errors[:1000]:
+            where = f"Line {line_number}" if isinstance(line_number, int) else line_number
+            text.insert(tk.END, f"{where}: {message}\n")
+        if len(errors) > 1000:
+            text.insert(tk.END, f"... and {len(errors) - 1000} more\n")
+        text.configure(state=tk.DISABLED)
+
+    def show_product_history(self):
+        """List the audited changes to the product in the form."""
+        product_id = self.product_id_entry.get().strip()
+        if not product_id:
+            self.show_error("Please select a product!")
+            return
+            
+        entries = self.admin.get_product_history(product_id)
+        window = tk.Toplevel(self.root)
+        window.title(f"History of {product_id}")
+        window.geometry("800x400")
+        
+        frame = ttk.Frame(window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame,
+                 text=f"{len(entries)} change(s) to {product_id}",
+                 style='Header.TLabel').pack(fill=tk.X, pady=(0, 10))
+        
+        text = tk.Text(frame, wrap=tk.NONE, font=('Consolas', 10))
+        y_scroll = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=text.yview)
+        text.configure(yscrollcommand=y_scroll.set)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(fill=tk.BOTH, expand=True)
+        
+        for entry in entries:
+            before = ','.join(str(value) for value in entry['before']) if entry['before'] else '-'
+            after = ','.join(str(value) for value in entry['after']) if entry['after'] else '-'
+            text.insert(tk.END, f"{entry['at']}  {entry['actor'] or '?'}  {entry['action']}\n"
+                                f"    before: {before}\n    after:  {after}\n")
+        text.configure(state=tk.DISABLED)
+
+    def stock_take(self):
+        """Reconcile a physical count file with system stock."""
+        path = filedialog.askopenfilename(title="Stock Take Count File",
+                                          filetypes=[("Count files", "*.txt *.csv"), ("All files", "*.*")])
+        if not path:
+            return
+            
+        try:
+            report = self.admin.reconcile_stock_take(path)
+        except OSError as e:
+            self.show_error(f"Cannot read the count file: {e}")
+            return
+            
+        if report['errors']:
+            self.show_import_errors(report['errors'],
+                                    f"The count file was not reconciled: {len(report['errors'])} line(s) have errors.")
+            return
+        if not report['lines']:
+            self.show_success(f"All {report['counted']} counted products match system stock.")
+            return
+        self.show_stock_take(report)
+
+    def show_stock_take(self, report: dict):
+        """List stock-take variances and apply the selected ones."""
+        window = tk.Toplevel(self.root)
+        window.title("Stock Take")
+        window.geometry("900x500")
+        
+        frame = ttk.Frame(window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        summary = (f"{len(report['lines'])} of {report['counted']} counted products differ. "
+                   f"Net: {report['net_quantity']:+d} units, ${report['net_value']:+.2f}. "
+                   f"Shrinkage: ${-report['shrinkage_value']:.2f}")
+        if report['unknown']:
+            summary += f"\n{len(report['unknown'])} counted ID(s) are not in the catalog: " \
+                       + ', '.join(report['unknown'][:10]) + (' ...' if len(report['unknown']) > 10 else '')
+        ttk.Label(frame, text=summary, style='Header.TLabel').pack(fill=tk.X, pady=(0, 10))
+        
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('ID', 'Name', 'System', 'Counted', 'Variance', 'Value')
+        tree = ttk.Treeview(tree_frame, columns=columns, show='headings', selectmode='extended')
+        for col in columns:
+            tree.heading(col, text=col, anchor=tk.CENTER)
+            tree.column(col, width=100)
+        tree.column('Name', width=250)
+        
+        y_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=y_scroll.set)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Largest losses first; every line starts out accepted
+        lines = {line['id']: line for line in sorted(report['lines'], key=lambda line: line['value'])}
+        for line in lines.values():
+            tree.insert('', tk.END, iid=line['id'], values=(
+                line['id'], line['name'], line['system'], line['counted'],
+                f"{line['variance']:+d}", f"${line['value']:+.2f}"))
+        tree.selection_set(list(lines))
+        
+        def apply_selected():
+            accepted = [lines[product_id] for product_id in tree.selection()]
+            if not accepted:
+                self.show_error("Please select the adjustments to apply!")
+                return
+            changed = self.admin.apply_stock_take(accepted)
+            if changed is None:
+                self.show_error("Failed to apply the stock take!")
+                return
+            window.destroy()
+            self.show_success(f"Adjusted the stock of {changed} products.")
+            self.refresh_product_list()
+            
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        self.create_button(button_frame, "Apply Selected", apply_selected, 'Success.TButton')
+        self.create_button(button_frame, "Cancel", window.destroy)
+
     def add_cashier(self):
         """Add a new cashier."""
         username = self.cashier_username_entry.get().strip()
@@ -3,13 +3,19 @@ from tkinter import ttk
 from typing import Optional, Callable
 from .base_gui import BaseGUI
 from models.cashier_model import Cashier
+from models.receipts import ReceiptSpooler
+from models.metrics import UI_REFRESH_SECONDS, timed
+from .thumbnails import TreeThumbnails
 
 class CashierGUI(BaseGUI):
-    def __init__(self, username: str, on_logout: Optional[Callable] = None):
+    def __init__(self, username: str, on_logout: Optional[Callable] = None,
+                 data_dir: Optional[str] = None):
         super().__init__("Cashier Panel")
         self.username = username
         self.on_logout = on_logout
-        self.cashier = Cashier()
+        self.cashier = Cashier(data_dir, username=username)
+        self.receipts = ReceiptSpooler.for_data_dir(self.cashier.data_dir)
+        self.thumbnails = TreeThumbnails(self.root, self.cashier.data_dir)
         
         # Create header with user info and logout
         self.create_header()
@@ -69,6 +75,9 @@ class CashierGUI(BaseGUI):
                                     values=categories,
                                     state='readonly',
                                     width=20)
+        # Pick up categories added by the admin since this window opened
+        category_combo.configure(postcommand=lambda: category_combo.configure(
+            values=['All'] + self.cashier.get_categories()))
         category_combo.pack(side=tk.LEFT, padx=5)
         category_combo.set('All')
         category_combo.bind('<<ComboboxSelected>>', lambda _: self.refresh_product_list())
@@ -110,6 +119,7 @@ class CashierGUI(BaseGUI):
         
         self.product_tree.configure(yscrollcommand=y_scroll.set,
                                   xscrollcommand=x_scroll.set)
+        self.thumbnails.attach(self.product_tree, y_scroll)
         
         # Pack scrollbars and tree
         self.product_tree.grid(row=0, column=0, sticky='nsew')
@@ -155,6 +165,7 @@ class CashierGUI(BaseGUI):
                                command=self.cart_tree.yview)
         
         self.cart_tree.configure(yscrollcommand=y_scroll.set)
+        self.thumbnails.attach(self.cart_tree, y_scroll)
         
         # Pack scrollbar and tree
         self.cart_tree.grid(row=0, column=0, sticky='nsew')
@@ -183,6 +194,16 @@ class CashierGUI(BaseGUI):
                           self.remove_from_cart,
                           'Danger.TButton').pack(side=tk.RIGHT)
         
+        # Promotions section
+        discount_frame = ttk.Frame(container)
+        discount_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        ttk.Label(discount_frame, text="Discounts:").pack(side=tk.LEFT)
+        self.discount_label = ttk.Label(discount_frame,
+                                      text="$0.00",
+                                      foreground=self.colors['success'])
+        self.discount_label.pack(side=tk.RIGHT)
+        
         # Total section
         total_frame = ttk.Frame(container)
         total_frame.pack(fill=tk.X, pady=10)
@@ -233,6 +254,7 @@ class CashierGUI(BaseGUI):
         # New sale button
         self.create_button(container, "New Sale", self.new_sale)
 
+    @timed(UI_REFRESH_SECONDS.labels('cashier_products'))
     def refresh_product_list(self):
         """Refresh the product list based on category and search filters."""
         for item in self.product_tree.get_children():
@@ -245,28 +267,50 @@ class CashierGUI(BaseGUI):
         
         for product in products:
             if search_term in product[1].lower():  # Search in product name
-                self.product_tree.insert('', tk.END, values=product)
+                # Show stock left after every open cart's holds
+                values = product[:4] + (self.cashier.get_available_stock(product),)
+                self.product_tree.insert('', tk.END, iid=product[0], values=values)
 
+    @timed(UI_REFRESH_SECONDS.labels('cashier_cart'))
     def refresh_cart(self):
         """Refresh the cart display."""
         for item in self.cart_tree.get_children():
             self.cart_tree.delete(item)
             
-        cart_items = self.cashier.get_cart_items()
-        total = 0.0
-        
-        for item in cart_items:
-            item_total = item[3] * item[4]  # price * quantity
-            total += item_total
-            self.cart_tree.insert('', tk.END, values=(
-                item[0],  # ID
-                item[1],  # Name
-                f"${item[3]:.2f}",  # Price
-                item[4],  # Quantity
-                f"${item_total:.2f}"  # Total
-            ))
+        for item in self.cashier.cart.items():
+            self.cart_tree.insert('', tk.END, iid=item['id'], values=self.cart_row(item))
+            
+        self.refresh_total()
+
+    @timed(UI_REFRESH_SECONDS.labels('cashier_cart_line'))
+    def refresh_cart_line(self, product_id: str):
+        """Update the cart display for one changed line, leaving the other rows alone."""
+        item = self.cashier.cart.line(product_id)
+        if item is None:
+            if self.cart_tree.exists(product_id):
+                self.cart_tree.delete(product_id)
+        elif self.cart_tree.exists(product_id):
+            self.cart_tree.item(product_id, values=self.cart_row(item))
+        else:
+            self.cart_tree.insert('', tk.END, iid=product_id, values=self.cart_row(item))
             
-        self.total_label.configure(text=f"${total:.2f}")
+        self.refresh_total()
+
+    def cart_row(self, item: dict) -> tuple:
+        """Format a cart line for the cart table."""
+        return (
+            item['id'],
+            item['name'],
+            f"${item['price']:.2f}",
+            item['quantity'],
+            f"${self.cashier.cart.line_total(item['id']):.2f}"
+        )
+
+    def refresh_total(self):
+        """Show the cart's running total after promotions."""
+        pricing = self.cashier.cart.pricing('cash')
+        self.discount_label.configure(text=f"-${pricing['discount']:.2f}")
+        self.total_label.configure(text=f"${pricing['total']:.2f}")
         self.calculate_change()
 
     def add_to_cart(self, event=None):
@@ -284,11 +328,10 @@ class CashierGUI(BaseGUI):
             self.show_error("Invalid quantity!")
             return
             
-        values = self.product_tree.item(selection[0])['values']
-        product_id = values[0]
+        product_id = selection[0]  # rows are keyed by product ID
         
         if self.cashier.add_to_cart(product_id, quantity):
-            self.refresh_cart()
+            self.refresh_cart_line(product_id)
             self.refresh_product_list()  # Refresh to update stock
         else:
             self.show_error("Failed to add item to cart!")
@@ -300,11 +343,10 @@ class CashierGUI(BaseGUI):
             self.show_error("Please select an item to remove!")
             return
             
-        values = self.cart_tree.item(selection[0])['values']
-        product_id = values[0]
+        product_id = selection[0]  # rows are keyed by product ID
         
         if self.cashier.remove_from_cart(product_id):
-            self.refresh_cart()
+            self.refresh_cart_line(product_id)
             self.refresh_product_list()  # Refresh to update stock
         else:
             self.show_error("Failed to remove item from cart!")
@@ -313,8 +355,7 @@ class CashierGUI(BaseGUI):
         """Calculate and display change amount."""
         try:
             amount_received = float(self.amount_received_var.get() or 0)
-            total = float(self.total_label.cget('text').replace('$', ''))
-            change = amount_received - total
+            change = amount_received - self.cashier.cart.total('cash')
             self.change_label.configure(
                 text=f"${change:.2f}",
                 foreground=self.colors['success'] if change >= 0 else self.colors['danger']
@@ -327,14 +368,13 @@ class CashierGUI(BaseGUI):
 
     def complete_sale(self):
         """Complete the sale transaction."""
-        cart_items = self.cashier.get_cart_items()
-        if not cart_items:
+        if not self.cashier.cart:
             self.show_error("Cart is empty!")
             return
             
+        total = self.cashier.cart.total('cash')
         try:
             amount_received = float(self.amount_received_var.get() or 0)
-            total = float(self.total_label.cget('text').replace('$', ''))
             if amount_received < total:
                 self.show_error("Insufficient payment amount!")
                 return
@@ -342,20 +382,14 @@ class CashierGUI(BaseGUI):
             self.show_error("Invalid payment amount!")
             return
             
-        # Convert cart items to the format expected by process_payment
-        items_for_sale = [
-            {
-                'id': item[0],
-                'name': item[1],
-                'price': item[3],
-                'quantity': item[4]
-            }
-            for item in cart_items
-        ]
-        
-        # Process sale
-        if self.cashier.process_sale(items_for_sale):
+        # Process sale straight from the cart's lines and total
+        if self.cashier.process_payment('cash'):
             change = amount_received - total
+            
+            # Receipt is rendered and printed in the background
+            self.receipts.submit(dict(self.cashier.last_sale,
+                                      amount_received=amount_received,
+                                      change=change))
             self.show_success(f"Sale completed successfully!\nChange: ${change:.2f}")
             self.new_sale()
         else:
@@ -371,6 +405,7 @@ class CashierGUI(BaseGUI):
 
     def logout(self):
         """Handle logout."""
+        self.cashier.clear_cart()  # Release stock held by the open cart
         if self.on_logout:
             self.on_logout()
         self.close() 
\ No newline at end of file
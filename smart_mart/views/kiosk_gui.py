@@ -0,0 +1,107 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Optional
+from .base_gui import BaseGUI
+from models.price_check import PriceCheck
+from models.metrics import UI_REFRESH_SECONDS, timed
+
+class KioskGUI(BaseGUI):
+    """Scan or search only: prices and availability, no login and no cart."""
+
+    def __init__(self, data_dir: Optional[str] = None):
+        super().__init__("Price Check")
+        self.price_check = PriceCheck(data_dir)
+        self._search_job = None
+        self._shown_version = -1  # catalog version of the results on screen
+
+        # Scan / search box
+        ttk.Label(self.main_container,
+                 text="Scan a product or type its name",
+                 style='Header.TLabel').pack(pady=(0, 10))
+        self.search_var = tk.StringVar()
+        self.search_var.trace('w', lambda *_: self.schedule_search())
+        self.search_entry = ttk.Entry(self.main_container,
+                                    textvariable=self.search_var,
+                                    font=('Segoe UI', 16))
+        self.search_entry.pack(fill=tk.X, pady=(0, 10))
+        self.search_entry.bind('<Return>', self.scan)
+        self.search_entry.bind('<Escape>', lambda _: self.search_var.set(''))
+        self.search_entry.focus_set()
+
+        # Scanned product
+        self.result_label = ttk.Label(self.main_container, text="",
+                                    font=('Segoe UI', 20, 'bold'))
+        self.result_label.pack(pady=10)
+
+        # Search results
+        tree_frame = ttk.Frame(self.main_container)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ('ID', 'Name', 'Category', 'Price', 'Availability')
+        self.result_tree = ttk.Treeview(tree_frame,
+                                      columns=columns,
+                                      show='headings',
+                                      selectmode='browse')
+        self.result_tree.column('ID', width=100)
+        self.result_tree.column('Name', width=300)
+        self.result_tree.column('Category', width=150)
+        self.result_tree.column('Price', width=100)
+        self.result_tree.column('Availability', width=150)
+        for col in columns:
+            self.result_tree.heading(col, text=col, anchor=tk.CENTER)
+
+        y_scroll = ttk.Scrollbar(tree_frame,
+                               orient=tk.VERTICAL,
+                               command=self.result_tree.yview)
+        self.result_tree.configure(yscrollcommand=y_scroll.set)
+        self.result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Pick up price and stock changes made by the tills and the admin
+        self.root.after(self.price_check.refresh_ms, self.poll_catalog)
+
+    def schedule_search(self):
+        """Search shortly after typing pauses, so a fast scanner doesn't search every keystroke."""
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(150, self.refresh_results)
+
+    def scan(self, event=None):
+        """Show the product whose ID was scanned or typed."""
+        self.search_entry.select_range(0, tk.END)  # the next scan replaces this one
+        if not self.show_scanned():
+            self.refresh_results()
+
+    def show_scanned(self) -> bool:
+        """Show the product whose ID is in the search box, if there is one, leaving the box alone."""
+        product = self.price_check.lookup(self.search_var.get())
+        if product:
+            self.result_label.configure(text=f"{product[1]}  ${product[3]:.2f}  ({self.availability(product)})")
+        else:
+            self.result_label.configure(text="")
+        return product is not None
+
+    @timed(UI_REFRESH_SECONDS.labels('kiosk_results'))
+    def refresh_results(self):
+        """Show the products matching the search box."""
+        self._search_job = None
+        self._shown_version = self.price_check.version()
+        for item in self.result_tree.get_children():
+            self.result_tree.delete(item)
+
+        for product in self.price_check.search(self.search_var.get()):
+            values = (product[0], product[1], product[2], f"${product[3]:.2f}", self.availability(product))
+            self.result_tree.insert('', tk.END, values=values)
+
+    def poll_catalog(self):
+        """Redraw the results when the catalog changed."""
+        if self.price_check.version() != self._shown_version:
+            # Only the results change, so a customer's typing isn't selected under them
+            if self.result_label.cget('text'):
+                self.show_scanned()
+            self.refresh_results()
+        self.root.after(self.price_check.refresh_ms, self.poll_catalog)
+
+    def availability(self, product) -> str:
+        """Describe a product's stock for customers."""
+        return f"In stock ({product[4]})" if product[4] > 0 else "Out of stock"
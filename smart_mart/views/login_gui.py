@@ -7,8 +7,10 @@ from models.cashier_model import Cashier
 
 class LoginGUI(BaseGUI):
     def __init__(self, on_admin_login: Optional[Callable[[str, str], None]] = None,
-                 on_cashier_login: Optional[Callable[[str, str], None]] = None):
+                 on_cashier_login: Optional[Callable[[str, str], None]] = None,
+                 data_dir: Optional[str] = None):
         super().__init__("Login")
+        self.data_dir = data_dir
         self.on_admin_login = on_admin_login
         self.on_cashier_login = on_cashier_login
         
@@ -106,7 +108,7 @@ class LoginGUI(BaseGUI):
             return
             
         if self.login_type.get() == "admin":
-            admin = Admin()
+            admin = Admin(self.data_dir)
             if admin.login(username, password):
                 if self.on_admin_login:
                     self.on_admin_login(username, password)
@@ -116,7 +118,7 @@ class LoginGUI(BaseGUI):
                 self.password_entry.delete(0, tk.END)
                 self.password_entry.focus()
         else:
-            cashier = Cashier()
+            cashier = Cashier(self.data_dir)
             if cashier.login(username, password):
                 if self.on_cashier_login:
                     self.on_cashier_login(username, password)
@@ -0,0 +1,82 @@
+import math
+import tkinter as tk
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from PIL import ImageTk
+from models.thumbnails import ThumbnailStore
+from models.settings import Settings
+
+class TreeThumbnails:
+    """Shows product thumbnails in the tree column of Treeviews whose item IDs are product IDs.
+
+    Only rows scrolled into view ask for a thumbnail. Decoding happens on
+    the ThumbnailStore workers; this side polls for finished thumbnails and
+    keeps the last ``thumbnail_cache`` Tk images in an LRU, so scrolling
+    back and forth reuses them and memory stays bounded.
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, root: tk.Tk, data_dir: str):
+        self.root = root
+        self.store = ThumbnailStore.for_data_dir(data_dir)
+        self.enabled = self.store.enabled
+        self.capacity = max(16, Settings(data_dir).get_int('thumbnail_cache', 512))
+        self._images: 'OrderedDict[str, object]' = OrderedDict()  # product ID: PhotoImage, or None without image
+        self._waiting: Dict[str, List[Tuple[object, str]]] = {}  # product ID: (tree, item) rows to update
+        self._visible_jobs: Dict[object, str] = {}  # tree: pending show_visible call
+        if self.enabled:
+            self.root.after(self.POLL_MS, self.poll)
+
+    def attach(self, tree, scrollbar):
+        """Add the thumbnail column to a tree and load thumbnails as it scrolls."""
+        if not self.enabled:
+            return
+        tree.configure(show='tree headings')
+        tree.column('#0', width=self.store.size + 20, stretch=False)
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            self.schedule_visible(tree)
+        tree.configure(yscrollcommand=on_scroll)
+
+    def schedule_visible(self, tree):
+        """Load the visible rows' thumbnails once scrolling or redrawing settles."""
+        if not self.enabled or tree in self._visible_jobs:
+            return
+        self._visible_jobs[tree] = self.root.after_idle(lambda: self.show_visible(tree))
+
+    def show_visible(self, tree):
+        """Show thumbnails on the rows currently scrolled into view."""
+        self._visible_jobs.pop(tree, None)
+        if not tree.winfo_exists():
+            return
+        # The tables are flat, so the scroll fractions map straight to rows
+        items = tree.get_children()
+        first, last = tree.yview()
+        for item in items[int(first * len(items)):math.ceil(last * len(items))]:
+            self.show(tree, item)
+
+    def show(self, tree, item: str):
+        """Show the thumbnail of one row, loading it in the background if needed."""
+        if item in self._images:
+            self._images.move_to_end(item)
+            tree.item(item, image=self._images[item] or '')
+            return
+        rows = self._waiting.setdefault(item, [])
+        if (tree, item) not in rows:
+            rows.append((tree, item))
+        self.store.request(item)
+
+    def poll(self):
+        """Turn finished thumbnails into Tk images and put them on the rows waiting for them."""
+        for product_id, image in self.store.completed():
+            photo = ImageTk.PhotoImage(image, master=self.root) if image is not None else None
+            self._images[product_id] = photo
+            self._images.move_to_end(product_id)
+            while len(self._images) > self.capacity:
+                self._images.popitem(last=False)  # rows still showing it keep their space, drawn empty
+            for tree, item in self._waiting.pop(product_id, []):
+                if photo is not None and tree.winfo_exists() and tree.exists(item):
+                    tree.item(item, image=photo)
+        self.root.after(self.POLL_MS, self.poll)